@@ -1,16 +1,52 @@
+import time
+
 from flask import Flask
 from pathlib import Path
 
 from .extensions import db, login_manager
-from .models import User
+from .user_cache import load_user_cached
+from .profiling import init_profiling
+from .cli import register_cli
+from .db_tuning import configure_engine_options, apply_sqlite_pragmas, enable_sqlite_foreign_keys
+from .write_queue import init_write_queue
+from .replicas import configure_replica_binds, init_replica_routing
+from .passwords import init_password_hasher
+from .live import init_live
+from .file_reaper import init_file_reaper
+from .analytics import init_analytics_refresh
+from .storage import init_storage
+from . import changes  # noqa: F401  registers the change-feed flush hook
 from config import Config
 
-def create_app():
+def create_app(config_overrides=None):
+    t_start = time.perf_counter()
+    timings = {}
+
+    def phase(name, since):
+        now = time.perf_counter()
+        timings[name] = round((now - since) * 1000.0, 2)
+        return now
+
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config_overrides:
+        app.config.update(config_overrides)
+    fast = bool(app.config.get("FAST_STARTUP"))
+    t = phase("config", t_start)
 
     # init extensions
+    configure_engine_options(app)
+    configure_replica_binds(app)
     db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(app, db.engines.values())
+        enable_sqlite_foreign_keys(db.engines.values())
+    init_write_queue(app)
+    init_password_hasher(app)
+    init_live(app)
+    init_storage(app)
+    init_file_reaper(app)
+    init_analytics_refresh(app)
     login_manager.init_app(app)
 
     login_manager.login_view = "auth.login"
@@ -18,12 +54,17 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # cached for USER_CACHE_TTL_SECONDS (see app/user_cache.py)
+        return load_user_cached(user_id)
+    t = phase("extensions", t)
 
     # ✅ Ensure upload folders exist
-    upload_root = Path(app.config["UPLOAD_FOLDER"])
-    (upload_root / app.config["SALON_UPLOAD_SUBDIR"]).mkdir(parents=True, exist_ok=True)
-    (upload_root / app.config["STAFF_UPLOAD_SUBDIR"]).mkdir(parents=True, exist_ok=True)
+    # (fast startup skips this: storage creates shard folders on first upload)
+    if not fast and app.config["STORAGE_BACKEND"] == "local":
+        upload_root = Path(app.config["UPLOAD_FOLDER"])
+        (upload_root / app.config["SALON_UPLOAD_SUBDIR"]).mkdir(parents=True, exist_ok=True)
+        (upload_root / app.config["STAFF_UPLOAD_SUBDIR"]).mkdir(parents=True, exist_ok=True)
+    t = phase("upload_dirs", t)
 
     # register blueprints
     from .auth.routes import auth_bp
@@ -34,8 +75,28 @@ def create_app():
     app.register_blueprint(main_bp)
     app.register_blueprint(owner_bp)
 
-    # create db tables (MVP)
+    # read replica routing (no-op unless DATABASE_REPLICA_URLS is set)
+    init_replica_routing(app)
+
+    # opt-in per-request profiler (no-op unless PROFILE_ENABLED)
+    init_profiling(app)
+
+    register_cli(app)
+    t = phase("blueprints", t)
+
+    # create / verify db tables (see app/schema.py)
+    from .schema import ensure_schema
     with app.app_context():
-        db.create_all()
+        schema_result = ensure_schema(fast=fast)
+    t = phase("schema", t)
+
+    timings["total"] = round((t - t_start) * 1000.0, 2)
+    app.extensions["stylio_startup"] = {
+        "mode": "fast" if fast else "full",
+        "schema": schema_result,
+        "timings_ms": timings,
+    }
+    if app.config.get("STARTUP_LOG_TIMINGS"):
+        print("Startup:", app.extensions["stylio_startup"], flush=True)
 
     return app
@@ -0,0 +1,497 @@
+"""
+Owner analytics: review trends, blocked hours / utilization per salon and
+staff member, service mix.
+
+History is never scanned at request time. Two daily rollup tables hold
+what the dashboard needs, and every dashboard query is a GROUP BY over at
+most one row per salon (or staff member) and day of the window:
+
+  salon_daily_stats  (salon_id, day) -> review_count, rating_sum
+  staff_daily_stats  (staff_id, day) -> blocked_hours, all_day
+                     hours blocked inside the salon's opening hours;
+                     all_day = no open hour left that day
+
+Both carry `week` (the Monday) so weekly series group in SQL on any
+database. Dashboard requests only read them. refresh_rollups() brings them
+up to date from two positions kept in rollup_state; a background thread in
+each process calls it every ANALYTICS_REFRESH_SECONDS (RollupRefresher
+below), and `flask refresh-analytics` does the same from cron:
+
+  "review"      last review id rolled up; reviews are append-only (they
+                only disappear with their salon, and the rollup rows
+                cascade with it), so new reviews are one GROUP BY of
+                id > position, added with ON CONFLICT increments
+  "change_log"  cursor into the change feed (app/changes.py): each
+                staff_availability row names a (staff, day) to recompute;
+                weekly_hours / special_day rows recompute the salon's staff,
+                since blocked hours are counted inside opening hours
+
+On SQLite writes are serialized, so ids commit in order. With concurrent
+writers (Postgres) a smaller id can commit after a larger one, and a
+position moved past it would skip that row for good. With
+ANALYTICS_SETTLE_SECONDS set, a position stops before the first row younger
+than that, as CHANGES_SETTLE_SECONDS does for the change feed.
+
+A refresh costs a few indexed reads when nothing changed. If the change
+feed was pruned past our cursor, or the state is missing, everything is
+rebuilt (also `flask refresh-analytics --rebuild`). Two refreshes can't apply the
+same delta twice: the positions move with a compare-and-set, and the
+loser raises RollupConflict and rolls back.
+
+There is no booking table yet, so "utilization" is blocked hours over open
+hours: the share of a staff member's opening hours not available to book.
+"""
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, case, delete, distinct, func, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from .availability import salon_day_masks, staff_day_block_masks
+from .extensions import db
+from .facets import CATEGORY_LABELS
+from .models import (
+    ChangeLog, Review, Service, Staff, StaffAvailability, StaffService,
+    SalonDailyStats, StaffDailyStats, RollupState
+)
+from .write_queue import WriteQueueBusy, run_write
+
+DEFAULT_WINDOW_DAYS = 90
+MAX_WINDOW_DAYS = 366
+REBUILD_BATCH_STAFF = 200
+INSERT_BATCH_ROWS = 500
+
+HOURS_ENTITIES = ("weekly_hours", "special_day")
+
+
+class RollupConflict(Exception):
+    """Another refresh moved the rollup positions first; this one must roll back."""
+
+
+def monday(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def _dialect_insert(session, model):
+    dialect = session.get_bind(mapper=model.__mapper__).dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(model.__table__)
+
+
+def _insert_batches(session, model, rows):
+    for i in range(0, len(rows), INSERT_BATCH_ROWS):
+        session.execute(insert(model), rows[i:i + INSERT_BATCH_ROWS])
+
+
+# =========================
+# REVIEWS
+# =========================
+def _review_days(session, after_id: int, upto_id: int) -> list:
+    """salon_daily_stats rows for reviews with after_id < id <= upto_id."""
+    day = func.date(Review.created_at, type_=SalonDailyStats.day.type)
+    rows = session.execute(
+        select(Review.salon_id, day, func.count(), func.sum(Review.rating))
+        .where(Review.id > after_id, Review.id <= upto_id, Review.created_at.isnot(None))
+        .group_by(Review.salon_id, day)
+    )
+    return [
+        {"salon_id": salon_id, "day": d, "week": monday(d), "review_count": n, "rating_sum": total}
+        for salon_id, d, n, total in rows
+    ]
+
+
+def _add_review_days(session, rows):
+    if not rows:
+        return
+    table = SalonDailyStats.__table__
+    stmt = _dialect_insert(session, SalonDailyStats)
+    if stmt is not None:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["salon_id", "day"],
+            set_={
+                "review_count": table.c.review_count + stmt.excluded.review_count,
+                "rating_sum": table.c.rating_sum + stmt.excluded.rating_sum,
+            },
+        )
+        for i in range(0, len(rows), INSERT_BATCH_ROWS):
+            session.execute(stmt, rows[i:i + INSERT_BATCH_ROWS])
+        return
+    for row in rows:
+        result = session.execute(
+            update(table)
+            .where(table.c.salon_id == row["salon_id"], table.c.day == row["day"])
+            .values(review_count=table.c.review_count + row["review_count"],
+                    rating_sum=table.c.rating_sum + row["rating_sum"])
+        )
+        if result.rowcount == 0:
+            session.execute(insert(table), [row])
+
+
+# =========================
+# STAFF DAYS
+# =========================
+def _staff_day_rows(session, staff_ids, days=None) -> list:
+    """
+    staff_daily_stats rows for these staff members, on `days` (or every day
+    they have blocks). Days without blocked open hours get no row.
+    """
+    staff_salon = dict(session.execute(select(Staff.id, Staff.salon_id).where(Staff.id.in_(staff_ids))).all())
+    if not staff_salon:
+        return []
+    if days is None:
+        days = session.scalars(
+            select(StaffAvailability.day).where(StaffAvailability.staff_id.in_(list(staff_salon))).distinct()
+        ).all()
+    blocks = staff_day_block_masks(list(staff_salon), days, session=session)
+    if not blocks:
+        return []
+
+    salon_ids = sorted(set(staff_salon.values()))
+    open_masks = salon_day_masks(salon_ids, salon_ids, {d for _, d in blocks}, session=session)
+
+    rows = []
+    for (staff_id, day), block in sorted(blocks.items()):
+        salon_id = staff_salon[staff_id]
+        open_mask = open_masks[(salon_id, day)]
+        hours = _popcount(block & open_mask)
+        if not hours:
+            continue
+        rows.append({
+            "staff_id": staff_id, "day": day, "salon_id": salon_id, "week": monday(day),
+            "blocked_hours": hours, "all_day": (block & open_mask) == open_mask,
+        })
+    return rows
+
+
+def _replace_staff_days(session, staff_ids, days=None):
+    staff_ids = sorted(set(staff_ids))
+    if not staff_ids:
+        return 0
+    stmt = delete(StaffDailyStats).where(StaffDailyStats.staff_id.in_(staff_ids))
+    if days is not None:
+        days = sorted(set(days))
+        stmt = stmt.where(StaffDailyStats.day.in_(days))
+    session.execute(stmt)
+    rows = _staff_day_rows(session, staff_ids, days)
+    _insert_batches(session, StaffDailyStats, rows)
+    return len(rows)
+
+
+# =========================
+# REFRESH
+# =========================
+def _settled_head(session, model, cutoff) -> int:
+    """Largest id with no row younger than cutoff at or below it (max id when cutoff is None)."""
+    if cutoff is not None:
+        first_young = session.scalar(select(func.min(model.id)).where(model.created_at > cutoff))
+        if first_young is not None:
+            return first_young - 1
+    return session.scalar(select(func.max(model.id))) or 0
+
+
+def _heads(session, settle_seconds: float = 0.0):
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds) if settle_seconds > 0 else None
+    return _settled_head(session, Review, cutoff), _settled_head(session, ChangeLog, cutoff)
+
+
+def rebuild_rollups(session, settle_seconds: float = 0.0) -> dict:
+    """Recomputes both rollup tables from the raw rows and resets the positions."""
+    review_head, change_head = _heads(session, settle_seconds)
+    session.execute(delete(SalonDailyStats))
+    session.execute(delete(StaffDailyStats))
+    session.execute(delete(RollupState))
+
+    review_rows = _review_days(session, 0, review_head)
+    _insert_batches(session, SalonDailyStats, review_rows)
+
+    staff_days = 0
+    last_id = 0
+    while True:
+        staff_ids = session.scalars(
+            select(Staff.id).where(Staff.id > last_id).order_by(Staff.id).limit(REBUILD_BATCH_STAFF)
+        ).all()
+        if not staff_ids:
+            break
+        last_id = staff_ids[-1]
+        rows = _staff_day_rows(session, staff_ids)
+        _insert_batches(session, StaffDailyStats, rows)
+        staff_days += len(rows)
+
+    session.execute(insert(RollupState), [
+        {"name": "review", "position": review_head},
+        {"name": "change_log", "position": change_head},
+    ])
+    return {"rebuilt": True, "review_days": len(review_rows), "staff_days": staff_days}
+
+
+def _advance(session, name: str, old: int, new: int):
+    if new == old:
+        return
+    result = session.execute(
+        update(RollupState).where(RollupState.name == name, RollupState.position == old).values(position=new)
+    )
+    if result.rowcount != 1:
+        raise RollupConflict(name)
+
+
+def refresh_rollups(session, settle_seconds: float = 0.0) -> dict:
+    """
+    Applies reviews and change-feed entries newer than the stored positions
+    and older than settle_seconds. Call inside a write transaction (run_write);
+    raises RollupConflict if a concurrent refresh got there first.
+    """
+    state = dict(session.execute(select(RollupState.name, RollupState.position)).all())
+    if "review" not in state or "change_log" not in state:
+        return rebuild_rollups(session, settle_seconds)
+
+    review_head, change_head = _heads(session, settle_seconds)
+    # positions never move back (a smaller settle window than the last run's)
+    review_head = max(review_head, state["review"])
+    change_head = max(change_head, state["change_log"])
+    oldest = session.scalar(select(func.min(ChangeLog.id)))
+    if change_head > state["change_log"] and oldest is not None and oldest > state["change_log"] + 1:
+        print(f"[analytics] change feed pruned past cursor {state['change_log']}; rebuilding", flush=True)
+        return rebuild_rollups(session, settle_seconds)
+
+    # claim the range first: a concurrent refresh fails here, before any delta is applied
+    _advance(session, "review", state["review"], review_head)
+    _advance(session, "change_log", state["change_log"], change_head)
+
+    review_rows = _review_days(session, state["review"], review_head) if review_head > state["review"] else []
+    _add_review_days(session, review_rows)
+
+    changed_days = {}   # staff_id -> {day}
+    rehoured = set()    # salon ids whose opening hours changed
+    if change_head > state["change_log"]:
+        rows = session.execute(
+            select(ChangeLog.entity, ChangeLog.entity_id, ChangeLog.salon_id)
+            .where(ChangeLog.id > state["change_log"], ChangeLog.id <= change_head,
+                   ChangeLog.entity.in_(("staff_availability",) + HOURS_ENTITIES))
+            .execution_options(yield_per=1000)
+        )
+        for entity, entity_id, salon_id in rows:
+            if entity in HOURS_ENTITIES:
+                rehoured.add(salon_id)
+                continue
+            staff_id, _, day = entity_id.partition(":")
+            changed_days.setdefault(int(staff_id), set()).add(date.fromisoformat(day))
+
+    staff_days = 0
+    if rehoured:
+        salon_staff = session.scalars(select(Staff.id).where(Staff.salon_id.in_(rehoured))).all()
+        staff_days += _replace_staff_days(session, salon_staff)
+        for staff_id in salon_staff:
+            changed_days.pop(staff_id, None)
+    if changed_days:
+        # staff x days is a superset of the changed pairs; recomputing it is still exact
+        staff_days += _replace_staff_days(session, changed_days, set().union(*changed_days.values()))
+
+    return {"rebuilt": False, "review_days": len(review_rows), "staff_days": staff_days,
+            "salons_rehoured": len(rehoured)}
+
+
+# =========================
+# BACKGROUND REFRESH
+# =========================
+class RollupRefresher:
+    """
+    One daemon thread per process running refresh_rollups() every `interval`
+    seconds through run_write. Started lazily (before_request) and re-created
+    after fork. With several workers each one ticks; the compare-and-set on
+    the positions lets one of them apply a delta and the others skip it.
+    """
+
+    def __init__(self, app, interval: float, settle_seconds: float = 0.0):
+        self.app = app
+        self.interval = interval
+        self.settle_seconds = settle_seconds
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name="stylio-analytics", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.app.app_context():
+                try:
+                    self.refresh()
+                finally:
+                    db.session.remove()
+
+    def refresh(self):
+        try:
+            return run_write(lambda session: refresh_rollups(session, self.settle_seconds))
+        except (RollupConflict, OperationalError, WriteQueueBusy) as e:
+            # another process is refreshing (or the writer is busy): the next tick catches up
+            db.session.rollback()
+            print(f"[analytics] refresh skipped: {e.__class__.__name__}", flush=True)
+        except Exception as e:
+            db.session.rollback()
+            print(f"[analytics] refresh failed: {e!r}", flush=True)
+        return None
+
+
+def init_analytics_refresh(app):
+    interval = float(app.config.get("ANALYTICS_REFRESH_SECONDS", 0))
+    if interval <= 0:
+        return
+    refresher = RollupRefresher(app, interval, float(app.config.get("ANALYTICS_SETTLE_SECONDS", 0)))
+    app.extensions["stylio_analytics_refresher"] = refresher
+    app.before_request(refresher.ensure_started)
+
+
+# =========================
+# DASHBOARD
+# =========================
+def parse_window(args, today: date = None) -> tuple:
+    """?days=N -> (first day, last day) ending today. ValueError for unusable values."""
+    raw = (args.get("days") or "").strip()
+    try:
+        days = int(raw) if raw else DEFAULT_WINDOW_DAYS
+    except ValueError:
+        raise ValueError("days must be a whole number")
+    if not 1 <= days <= MAX_WINDOW_DAYS:
+        raise ValueError(f"days must be between 1 and {MAX_WINDOW_DAYS}")
+    end = today or date.today()
+    return end - timedelta(days=days - 1), end
+
+
+def _weeks(start: date, end: date) -> list:
+    weeks, week = [], monday(start)
+    while week <= end:
+        weeks.append(week)
+        week += timedelta(days=7)
+    return weeks
+
+
+def _ratio(part, whole):
+    return round(part / whole, 3) if whole else None
+
+
+def owner_dashboard(session, salons, start: date, end: date) -> dict:
+    """
+    Numbers for `salons` ([(id, name)]) over [start, end]. Everything but the
+    opening hours comes from GROUP BYs over the rollups and the catalogue;
+    opening hours come from the hours tables (a few rows per salon).
+    """
+    salon_ids = [salon_id for salon_id, _ in salons]
+    weeks = _weeks(start, end)
+    in_window = lambda model: and_(model.salon_id.in_(salon_ids), model.day >= start, model.day <= end)
+
+    reviews = {}
+    for salon_id, week, n, total in session.execute(
+        select(SalonDailyStats.salon_id, SalonDailyStats.week,
+               func.sum(SalonDailyStats.review_count), func.sum(SalonDailyStats.rating_sum))
+        .where(in_window(SalonDailyStats))
+        .group_by(SalonDailyStats.salon_id, SalonDailyStats.week)
+    ):
+        reviews[(salon_id, week)] = (n, total)
+
+    blocked = {}
+    for salon_id, week, hours in session.execute(
+        select(StaffDailyStats.salon_id, StaffDailyStats.week, func.sum(StaffDailyStats.blocked_hours))
+        .where(in_window(StaffDailyStats))
+        .group_by(StaffDailyStats.salon_id, StaffDailyStats.week)
+    ):
+        blocked[(salon_id, week)] = hours
+
+    staff_blocked = {}
+    for staff_id, hours, days_off in session.execute(
+        select(StaffDailyStats.staff_id, func.sum(StaffDailyStats.blocked_hours),
+               func.sum(case((StaffDailyStats.all_day, 1), else_=0)))
+        .where(in_window(StaffDailyStats))
+        .group_by(StaffDailyStats.staff_id)
+    ):
+        staff_blocked[staff_id] = (hours, days_off)
+
+    staff_by_salon = {}
+    for staff_id, salon_id, name, profession, skills in session.execute(
+        select(Staff.id, Staff.salon_id, Staff.name, Staff.profession, func.count(StaffService.service_id))
+        .outerjoin(StaffService, StaffService.staff_id == Staff.id)
+        .where(Staff.salon_id.in_(salon_ids))
+        .group_by(Staff.id, Staff.salon_id, Staff.name, Staff.profession)
+        .order_by(Staff.id)
+    ):
+        staff_by_salon.setdefault(salon_id, []).append((staff_id, name, profession, skills))
+
+    mix = {}
+    for salon_id, category, services, avg_price, skilled in session.execute(
+        select(Service.salon_id, Service.category, func.count(distinct(Service.id)),
+               func.avg(Service.price), func.count(distinct(StaffService.staff_id)))
+        .outerjoin(StaffService, StaffService.service_id == Service.id)
+        .where(Service.salon_id.in_(salon_ids))
+        .group_by(Service.salon_id, Service.category)
+        .order_by(Service.salon_id, func.count(distinct(Service.id)).desc(), Service.category)
+    ):
+        mix.setdefault(salon_id, []).append({
+            "category": category, "label": CATEGORY_LABELS.get(category, category),
+            "services": services, "avg_price": round(float(avg_price or 0), 1), "staff": skilled,
+        })
+
+    window = [start + timedelta(days=d) for d in range((end - start).days + 1)]
+    open_masks = salon_day_masks(salon_ids, salon_ids, window, session=session)
+    open_hours = {}
+    for (salon_id, day), mask in open_masks.items():
+        key = (salon_id, monday(day))
+        open_hours[key] = open_hours.get(key, 0) + _popcount(mask)
+
+    out = []
+    for salon_id, name in salons:
+        staff = staff_by_salon.get(salon_id, [])
+        salon_open = sum(open_hours.get((salon_id, w), 0) for w in weeks)
+        review_n = sum(reviews.get((salon_id, w), (0, 0))[0] for w in weeks)
+        review_sum = sum(reviews.get((salon_id, w), (0, 0))[1] for w in weeks)
+        blocked_total = sum(blocked.get((salon_id, w), 0) for w in weeks)
+
+        weekly = []
+        for w in weeks:
+            n, total = reviews.get((salon_id, w), (0, 0))
+            capacity = open_hours.get((salon_id, w), 0) * len(staff)
+            weekly.append({
+                "week": w.isoformat(),
+                "reviews": n,
+                "average": round(total / n, 2) if n else None,
+                "blocked_hours": blocked.get((salon_id, w), 0),
+                "utilization": _ratio(blocked.get((salon_id, w), 0), capacity),
+            })
+
+        out.append({
+            "id": salon_id,
+            "name": name,
+            "reviews": {"count": review_n, "average": round(review_sum / review_n, 2) if review_n else None},
+            "open_hours": salon_open,
+            "blocked_hours": blocked_total,
+            "utilization": _ratio(blocked_total, salon_open * len(staff)),
+            "weekly": weekly,
+            "staff": [
+                {
+                    "id": staff_id, "name": staff_name, "profession": profession, "skills": skills,
+                    "blocked_hours": staff_blocked.get(staff_id, (0, 0))[0],
+                    "days_off": staff_blocked.get(staff_id, (0, 0))[1],
+                    "utilization": _ratio(staff_blocked.get(staff_id, (0, 0))[0], salon_open),
+                }
+                for staff_id, staff_name, profession, skills in staff
+            ],
+            "service_mix": mix.get(salon_id, []),
+        })
+
+    return {"from": start.isoformat(), "to": end.isoformat(), "weeks": [w.isoformat() for w in weeks], "salons": out}
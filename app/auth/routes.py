@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, login_required
 
 from ..extensions import db
 from ..models import User
+from ..passwords import PasswordHasherBusy, needs_rehash
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
@@ -28,7 +29,11 @@ def register():
             return redirect(url_for("auth.login"))
 
         user = User(full_name=full_name, email=email, role=role)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except PasswordHasherBusy:
+            flash("We're busy right now. Please try again in a moment.", "warning")
+            return redirect(url_for("auth.register"))
         db.session.add(user)
         db.session.commit()
 
@@ -46,10 +51,24 @@ def login():
         password = request.form.get("password", "")
 
         user = User.query.filter_by(email=email).first()
-        if not user or not user.check_password(password):
+        try:
+            ok = bool(user) and user.check_password(password)
+        except PasswordHasherBusy:
+            flash("Too many login attempts right now. Please try again in a moment.", "warning")
+            return redirect(url_for("auth.login"))
+
+        if not ok:
             flash("Invalid email or password.", "danger")
             return redirect(url_for("auth.login"))
 
+        # ✅ upgrade hashes made with old parameters (we know the password now)
+        if needs_rehash(user.password_hash):
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except PasswordHasherBusy:
+                pass  # not critical, try again next login
+
         login_user(user)
         flash("Logged in successfully.", "success")
         return redirect(url_for("main.home_page"))
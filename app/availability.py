@@ -0,0 +1,384 @@
+"""
+Slot availability as packed bitsets.
+
+The booking page offers hourly start times 06:00–23:00 (start inclusive, end
+exclusive against the salon's hours), so a day is SLOTS_PER_DAY bits. A
+search window of N days is packed into one Python int per salon (open slots)
+and per staff member (blocked slots), DAY_STRIDE bits per day; the extra
+guard bit is always clear so runs of free slots never cross midnight.
+
+Free slots for a staff member are then `salon_open & ~staff_blocked`, slots
+where a service of k hours can start are `free & free>>1 & ... & free>>(k-1)`
+and the earliest one is the lowest set bit: a handful of big-int operations
+per staff member, whatever the window size.
+
+There is no booking table yet, so booked slots aren't subtracted here.
+"""
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from sqlalchemy import select
+
+from .extensions import db
+from .models import (
+    Salon, Service, Staff, StaffService, StaffAvailability,
+    SalonWorkingHours, SalonSpecialHours
+)
+
+SLOT_TIMES = [f"{h:02d}:00" for h in range(6, 24)]
+SLOT_INDEX = {t: i for i, t in enumerate(SLOT_TIMES)}
+SLOTS_PER_DAY = len(SLOT_TIMES)
+DAY_STRIDE = SLOTS_PER_DAY + 1
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+DEFAULT_START = "09:00"
+DEFAULT_END = "19:00"
+
+MAX_SEARCH_DAYS = 14
+MAX_SEARCH_RESULTS = 50
+
+
+@lru_cache(maxsize=256)
+def hours_mask(start: str, end: str) -> int:
+    """Slots t with start <= t < end (same rule as the booking page)."""
+    mask = 0
+    for i, t in enumerate(SLOT_TIMES):
+        if start <= t < end:
+            mask |= 1 << i
+    return mask
+
+
+def slots_needed(duration_minutes) -> int:
+    return max(1, -(-int(duration_minutes or 60) // 60))
+
+
+def run_starts(mask: int, length: int) -> int:
+    """Bits where `length` consecutive set bits begin."""
+    out = mask
+    for k in range(1, length):
+        out &= mask >> k
+    return out
+
+
+def lowest_bit(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+
+def bit_to_slot(start_day: date, bit: int):
+    day_offset, slot = divmod(bit, DAY_STRIDE)
+    return start_day + timedelta(days=day_offset), SLOT_TIMES[slot]
+
+
+def past_slots_mask(now: datetime) -> int:
+    """Today's slots that already started."""
+    current = now.strftime("%H:%M")
+    mask = 0
+    for i, t in enumerate(SLOT_TIMES):
+        if t <= current:
+            mask |= 1 << i
+    return mask
+
+
+def salon_day_masks(salon_ids, salon_filter, days, session=None) -> dict:
+    """
+    (salon_id, day) -> open-slot mask for every salon in salon_ids and day in
+    days. salon_filter is a selectable of salon ids (or a list) used in the
+    IN clauses so large candidate sets don't turn into huge parameter lists.
+    """
+    session = session or db.session
+    days = sorted(set(days))
+    if not days:
+        return {}
+
+    weekly = {}
+    rows = session.execute(
+        select(
+            SalonWorkingHours.salon_id, SalonWorkingHours.weekday, SalonWorkingHours.is_closed,
+            SalonWorkingHours.start_time, SalonWorkingHours.end_time,
+        ).where(SalonWorkingHours.salon_id.in_(salon_filter))
+    )
+    for salon_id, wd, is_closed, start, end in rows:
+        weekly[(salon_id, int(wd))] = 0 if is_closed else hours_mask(start or DEFAULT_START, end or DEFAULT_END)
+
+    special = {}
+    rows = session.execute(
+        select(
+            SalonSpecialHours.salon_id, SalonSpecialHours.day, SalonSpecialHours.is_closed,
+            SalonSpecialHours.start_time, SalonSpecialHours.end_time,
+        ).where(
+            SalonSpecialHours.salon_id.in_(salon_filter),
+            SalonSpecialHours.day >= days[0],
+            SalonSpecialHours.day <= days[-1],
+        )
+    )
+    for salon_id, day, is_closed, start, end in rows:
+        special[(salon_id, day)] = 0 if is_closed else hours_mask(start or DEFAULT_START, end or DEFAULT_END)
+
+    default_mask = hours_mask(DEFAULT_START, DEFAULT_END)
+    masks = {}
+    for salon_id in salon_ids:
+        for day in days:
+            day_mask = special.get((salon_id, day))
+            if day_mask is None:
+                day_mask = weekly.get((salon_id, day.weekday()), default_mask)
+            masks[(salon_id, day)] = day_mask
+    return masks
+
+
+def staff_day_block_masks(staff_filter, days, session=None) -> dict:
+    """(staff_id, day) -> blocked-slot mask from StaffAvailability rows."""
+    session = session or db.session
+    days = sorted(set(days))
+    if not days:
+        return {}
+    wanted = set(days)
+    rows = session.execute(
+        select(StaffAvailability.staff_id, StaffAvailability.day, StaffAvailability.time).where(
+            StaffAvailability.staff_id.in_(staff_filter),
+            StaffAvailability.day >= days[0],
+            StaffAvailability.day <= days[-1],
+        )
+    )
+
+    masks = {}
+    for staff_id, day, t in rows:
+        if day not in wanted:
+            continue
+        if t is None or str(t).strip() == "":
+            bits = FULL_DAY
+        else:
+            slot = SLOT_INDEX.get(str(t).strip())
+            if slot is None:
+                continue
+            bits = 1 << slot
+        masks[(staff_id, day)] = masks.get((staff_id, day), 0) | bits
+    return masks
+
+
+def _window(start_day: date, days: int):
+    return [start_day + timedelta(days=d) for d in range(days)]
+
+
+def salon_window_masks(salon_ids, salon_filter, start_day: date, days: int) -> dict:
+    """salon_id -> packed open-slot mask for [start_day, start_day + days)."""
+    window = _window(start_day, days)
+    per_day = salon_day_masks(salon_ids, salon_filter, window)
+    masks = {}
+    for salon_id in salon_ids:
+        packed = 0
+        for d, day in enumerate(window):
+            packed |= per_day[(salon_id, day)] << (d * DAY_STRIDE)
+        masks[salon_id] = packed
+    return masks
+
+
+def staff_block_masks(staff_filter, start_day: date, days: int) -> dict:
+    """staff_id -> packed blocked-slot mask for [start_day, start_day + days)."""
+    masks = {}
+    for (staff_id, day), bits in staff_day_block_masks(staff_filter, _window(start_day, days)).items():
+        shift = (day - start_day).days * DAY_STRIDE
+        masks[staff_id] = masks.get(staff_id, 0) | (bits << shift)
+    return masks
+
+
+def contains_pattern(text: str) -> str:
+    """LIKE pattern for a literal substring; use with escape="\\"."""
+    text = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{text}%"
+
+
+def earliest_slots(service_query: str, start_day: date, days: int = 1, location: str = None,
+                   limit: int = 10, now: datetime = None) -> list:
+    """
+    Earliest bookable start per salon for services whose name matches
+    service_query (case-insensitive substring), optionally only salons whose
+    location matches `location`. Returns up to `limit` salons, earliest first.
+    """
+    now = now or datetime.now()
+
+    candidates = (
+        select(StaffService.staff_id, Service.id, Service.salon_id, Service.duration)
+        .join(Service, Service.id == StaffService.service_id)
+        .where(Service.name.ilike(contains_pattern(service_query), escape="\\"))
+    )
+    if location:
+        candidates = candidates.join(Salon, Salon.id == Service.salon_id).where(
+            Salon.location.ilike(contains_pattern(location), escape="\\")
+        )
+
+    rows = db.session.execute(candidates).all()
+    if not rows:
+        return []
+
+    matching = candidates.subquery()
+    salon_ids = {salon_id for _, _, salon_id, _ in rows}
+    salon_masks = salon_window_masks(salon_ids, select(matching.c.salon_id), start_day, days)
+    blocks = staff_block_masks(select(matching.c.staff_id), start_day, days)
+
+    if start_day == now.date():
+        past = past_slots_mask(now)
+        salon_masks = {sid: m & ~past for sid, m in salon_masks.items()}
+    elif start_day < now.date():
+        return []
+
+    # salon_id -> (bit, staff_id, service_id)
+    best = {}
+    for staff_id, service_id, salon_id, duration in rows:
+        free = salon_masks[salon_id] & ~blocks.get(staff_id, 0)
+        starts = run_starts(free, slots_needed(duration))
+        if not starts:
+            continue
+        hit = (lowest_bit(starts), staff_id, service_id)
+        if salon_id not in best or hit < best[salon_id]:
+            best[salon_id] = hit
+
+    top = sorted(best.items(), key=lambda kv: kv[1])[:limit]
+    if not top:
+        return []
+
+    salons = dict(db.session.execute(
+        select(Salon.id, Salon.name).where(Salon.id.in_([sid for sid, _ in top]))
+    ).all())
+    staff_names = dict(db.session.execute(
+        select(Staff.id, Staff.name).where(Staff.id.in_([hit[1] for _, hit in top]))
+    ).all())
+    services = {
+        r.id: r for r in db.session.execute(
+            select(Service.id, Service.name, Service.duration, Service.price)
+            .where(Service.id.in_([hit[2] for _, hit in top]))
+        )
+    }
+
+    results = []
+    for salon_id, (bit, staff_id, service_id) in top:
+        day, t = bit_to_slot(start_day, bit)
+        svc = services[service_id]
+        results.append({
+            "salon_id": salon_id,
+            "salon_name": salons.get(salon_id),
+            "staff_id": staff_id,
+            "staff_name": staff_names.get(staff_id),
+            "service_id": service_id,
+            "service_name": svc.name,
+            "duration": svc.duration,
+            "price": svc.price,
+            "date": day.isoformat(),
+            "time": t,
+        })
+    return results
+
+
+# =========================
+# BATCH CHECK
+# =========================
+MAX_CHECK_CANDIDATES = 500
+
+# verdict reason codes
+AVAILABLE = "available"
+INVALID = "invalid"
+UNKNOWN_STAFF = "unknown_staff"
+SERVICE_NOT_OFFERED = "service_not_offered"
+IN_THE_PAST = "in_the_past"
+SALON_CLOSED = "salon_closed"
+OUTSIDE_HOURS = "outside_hours"
+STAFF_OFF = "staff_off"
+STAFF_BLOCKED = "staff_blocked"
+NOT_ENOUGH_TIME = "not_enough_time"
+
+
+def _parse_candidate(raw):
+    """-> (staff_id, day, slot, service_id or None) or None if malformed."""
+    if not isinstance(raw, dict):
+        return None
+    try:
+        staff_id = int(raw["staff_id"])
+        day = datetime.strptime(str(raw["date"]), "%Y-%m-%d").date()
+        service_id = int(raw["service_id"]) if raw.get("service_id") not in (None, "") else None
+    except (KeyError, TypeError, ValueError):
+        return None
+    slot = SLOT_INDEX.get(str(raw.get("time", "")).strip())
+    if slot is None:
+        return None
+    return staff_id, day, slot, service_id
+
+
+def check_slots(candidates, now: datetime = None) -> list:
+    """
+    Verdicts for many (staff, date, time[, service]) candidates at once.
+
+    Resolved with one set-based query per table (staff, skills, weekly hours,
+    special days, blocks) for the whole batch, then bit tests per candidate.
+    With a service, every hour the service needs must be free.
+    Returns [{"available": bool, "reason": code}] in input order.
+    """
+    now = now or datetime.now()
+    parsed = [_parse_candidate(c) for c in candidates]
+    valid = [p for p in parsed if p]
+
+    staff_ids = {p[0] for p in valid}
+    days = {p[1] for p in valid}
+
+    staff_salon = dict(db.session.execute(
+        select(Staff.id, Staff.salon_id).where(Staff.id.in_(staff_ids))
+    ).all()) if staff_ids else {}
+
+    service_ids = {p[3] for p in valid if p[3] is not None}
+    skills, durations = set(), {}
+    if service_ids:
+        skills = set(db.session.execute(
+            select(StaffService.staff_id, StaffService.service_id).where(
+                StaffService.staff_id.in_(staff_ids),
+                StaffService.service_id.in_(service_ids),
+            )
+        ).all())
+        durations = dict(db.session.execute(
+            select(Service.id, Service.duration).where(Service.id.in_(service_ids))
+        ).all())
+
+    salon_ids = set(staff_salon.values())
+    open_masks = salon_day_masks(salon_ids, list(salon_ids), days) if salon_ids else {}
+    blocks = staff_day_block_masks(list(staff_salon), days) if staff_salon else {}
+
+    today = now.date()
+    past_today = past_slots_mask(now)
+
+    out = []
+    for p in parsed:
+        reason = _verdict(p, staff_salon, skills, durations, open_masks, blocks, today, past_today)
+        out.append({"available": reason == AVAILABLE, "reason": reason})
+    return out
+
+
+def _verdict(p, staff_salon, skills, durations, open_masks, blocks, today, past_today):
+    if p is None:
+        return INVALID
+    staff_id, day, slot, service_id = p
+    bit = 1 << slot
+
+    salon_id = staff_salon.get(staff_id)
+    if salon_id is None:
+        return UNKNOWN_STAFF
+    if service_id is not None and (staff_id, service_id) not in skills:
+        return SERVICE_NOT_OFFERED
+    if day < today or (day == today and past_today & bit):
+        return IN_THE_PAST
+
+    open_mask = open_masks[(salon_id, day)]
+    if not open_mask:
+        return SALON_CLOSED
+    if not open_mask & bit:
+        return OUTSIDE_HOURS
+
+    blocked = blocks.get((staff_id, day), 0)
+    if blocked == FULL_DAY:
+        return STAFF_OFF
+    if blocked & bit:
+        return STAFF_BLOCKED
+
+    if service_id is not None:
+        free = open_mask & ~blocked
+        if day == today:
+            free &= ~past_today
+        if not run_starts(free, slots_needed(durations.get(service_id))) & bit:
+            return NOT_ENOUGH_TIME
+    return AVAILABLE
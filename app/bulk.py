@@ -0,0 +1,511 @@
+"""
+Bulk import / export of salons (chain onboarding).
+
+A salon record carries everything the owner pages would otherwise post one
+form at a time:
+
+    {"name", "description", "location", "map_link",
+     "services": [{"key", "name", "duration", "price"}],
+     "staff": [{"name", "profession", "image", "services": [service keys]}],
+     "weekly_hours": [{"weekday": 0-6, "is_closed", "start", "end"}],
+     "special_days": [{"day": "YYYY-MM-DD", "is_closed", "start", "end"}]}
+
+A service's "key" defaults to its name; staff skills refer to services by
+key. Export writes each service's id as its key so salons with two services
+of the same name round-trip.
+
+Formats:
+  jsonl  one salon record per line
+  csv    one row per salon / service / staff / hours / special, with a
+         "record" column naming which, grouped by the "salon" column (any
+         label; rows of one salon must be consecutive). Staff skills are
+         keys separated by "|".
+
+Both directions stream. Import reads one record at a time and writes
+IMPORT_CHUNK_SALONS salons per transaction with one bulk INSERT per table,
+so memory is bounded by the chunk, not the file. Export pages through
+salons by id and loads each page's children with one query per table.
+Imported rows are written to the change log like any other write.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from .changes import record_rows, record_staff_skills
+from .extensions import db
+from .facets import category_for, refresh_salon_facets
+from .hours import ALLOWED_TIMES
+from .models import (
+    Salon, Service, Staff, StaffService,
+    SalonWorkingHours, SalonSpecialHours
+)
+from .write_queue import run_write
+
+IMPORT_CHUNK_SALONS = 50
+EXPORT_PAGE_SALONS = 200
+MAX_REPORTED_ERRORS = 100
+
+MAP_LINK_PREFIXES = (
+    "https://maps.app.goo.gl/",
+    "https://www.google.com/maps",
+    "https://goo.gl/maps",
+)
+
+CSV_COLUMNS = [
+    "salon", "record", "key", "name", "description", "location", "map_link",
+    "duration", "price", "profession", "image", "services",
+    "weekday", "day", "is_closed", "start", "end",
+]
+
+
+class ImportRecordError(ValueError):
+    pass
+
+
+# =========================
+# READERS
+# =========================
+def read_jsonl(lines):
+    """(line_no, record) per non-blank line."""
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, ImportRecordError(f"invalid JSON: {e}")
+            continue
+        yield line_no, record
+
+
+def read_csv(lines):
+    """(line_no, record) per salon, line_no being the salon's first row."""
+    reader = csv.DictReader(lines)
+    label, start_line, record = None, None, None
+
+    for row in reader:
+        row_label = (row.get("salon") or "").strip()
+        if record is not None and row_label != label:
+            yield start_line, record
+            record = None
+        if record is None:
+            label, start_line = row_label, reader.line_num
+            record = {"services": [], "staff": [], "weekly_hours": [], "special_days": []}
+
+        kind = (row.get("record") or "").strip()
+        if kind == "salon":
+            for field in ("name", "description", "location", "map_link"):
+                record[field] = row.get(field)
+        elif kind == "service":
+            record["services"].append({
+                "key": row.get("key"), "name": row.get("name"),
+                "duration": row.get("duration"), "price": row.get("price"),
+            })
+        elif kind == "staff":
+            skills = (row.get("services") or "").split("|")
+            record["staff"].append({
+                "name": row.get("name"), "profession": row.get("profession"), "image": row.get("image"),
+                "services": [s for s in skills if s.strip()],
+            })
+        elif kind == "hours":
+            record["weekly_hours"].append({
+                "weekday": row.get("weekday"), "is_closed": row.get("is_closed"),
+                "start": row.get("start"), "end": row.get("end"),
+            })
+        elif kind == "special":
+            record["special_days"].append({
+                "day": row.get("day"), "is_closed": row.get("is_closed"),
+                "start": row.get("start"), "end": row.get("end"),
+            })
+        else:
+            record.setdefault("_errors", []).append(f"row {reader.line_num}: unknown record type {kind!r}")
+
+    if record is not None:
+        yield start_line, record
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv}
+
+
+# =========================
+# VALIDATION
+# =========================
+def _text(value, field, max_len, required=False):
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise ImportRecordError(f"{field} is required")
+    if len(value) > max_len:
+        raise ImportRecordError(f"{field} is longer than {max_len} characters")
+    return value
+
+
+def _int(value, field, default, minimum):
+    if value is None or str(value).strip() == "":
+        return default
+    try:
+        value = int(str(value).strip())
+    except ValueError:
+        raise ImportRecordError(f"{field} must be a whole number")
+    if value < minimum:
+        raise ImportRecordError(f"{field} must be at least {minimum}")
+    return value
+
+
+def _bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _objects(value, field, item):
+    """A list of objects (or nothing); bad JSON shapes are record errors, not crashes."""
+    if value is None or value == "":
+        return []
+    if not isinstance(value, list):
+        raise ImportRecordError(f"{field} must be a list")
+    for n, entry in enumerate(value, start=1):
+        if not isinstance(entry, dict):
+            raise ImportRecordError(f"{item} {n} must be an object")
+    return value
+
+
+def _hours(entry, where):
+    if _bool(entry.get("is_closed")):
+        return True, None, None
+    start = _text(entry.get("start"), f"{where} start", 5)
+    end = _text(entry.get("end"), f"{where} end", 5)
+    if start not in ALLOWED_TIMES or end not in ALLOWED_TIMES:
+        raise ImportRecordError(f"{where}: times must be whole hours between 08:00 and 22:00")
+    if start >= end:
+        raise ImportRecordError(f"{where}: start must be before end")
+    return False, start, end
+
+
+def clean_record(record) -> dict:
+    """Validated, normalized salon record; raises ImportRecordError."""
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ImportRecordError("a salon record must be an object")
+    if record.get("_errors"):
+        raise ImportRecordError("; ".join(record["_errors"]))
+
+    map_link = _text(record.get("map_link"), "map_link", 500)
+    if map_link and not map_link.startswith(MAP_LINK_PREFIXES):
+        raise ImportRecordError("map_link must be a Google Maps link")
+
+    salon = {
+        "name": _text(record.get("name"), "name", 160, required=True),
+        "description": _text(record.get("description"), "description", 5000),
+        "location": _text(record.get("location"), "location", 200),
+        "map_link": map_link or None,
+        "services": [],
+        "staff": [],
+        "weekly_hours": [],
+        "special_days": [],
+    }
+
+    keys = set()
+    for n, s in enumerate(_objects(record.get("services"), "services", "service"), start=1):
+        name = _text(s.get("name"), f"service {n} name", 140, required=True)
+        key = _text(s.get("key"), f"service {n} key", 140) or name
+        if key in keys:
+            raise ImportRecordError(f"duplicate service key {key!r}")
+        keys.add(key)
+        salon["services"].append({
+            "key": key,
+            "name": name,
+            "duration": _int(s.get("duration"), f"service {n} duration", 60, 1),
+            "price": _int(s.get("price"), f"service {n} price", 0, 0),
+        })
+
+    for n, st in enumerate(_objects(record.get("staff"), "staff", "staff"), start=1):
+        skills = st.get("services") or []
+        if not isinstance(skills, list):
+            raise ImportRecordError(f"staff {n} services must be a list")
+        skills = [str(k).strip() for k in skills]
+        unknown = [k for k in skills if k not in keys]
+        if unknown:
+            raise ImportRecordError(f"staff {n} refers to unknown services {unknown}")
+        salon["staff"].append({
+            "name": _text(st.get("name"), f"staff {n} name", 140, required=True),
+            "profession": _text(st.get("profession"), f"staff {n} profession", 140),
+            "image": _text(st.get("image"), f"staff {n} image", 400) or None,
+            "services": list(dict.fromkeys(skills)),
+        })
+
+    weekdays = set()
+    for entry in _objects(record.get("weekly_hours"), "weekly_hours", "weekly hours entry"):
+        weekday = _int(entry.get("weekday"), "weekday", None, 0)
+        if weekday is None or weekday > 6:
+            raise ImportRecordError("weekday must be 0 (Mon) to 6 (Sun)")
+        if weekday in weekdays:
+            raise ImportRecordError(f"weekday {weekday} given twice")
+        weekdays.add(weekday)
+        closed, start, end = _hours(entry, f"weekday {weekday}")
+        salon["weekly_hours"].append({"weekday": weekday, "is_closed": closed, "start_time": start, "end_time": end})
+
+    days = set()
+    for entry in _objects(record.get("special_days"), "special_days", "special day entry"):
+        try:
+            day = datetime.strptime(str(entry.get("day") or "").strip(), "%Y-%m-%d").date()
+        except ValueError:
+            raise ImportRecordError("special day must be YYYY-MM-DD")
+        if day in days:
+            raise ImportRecordError(f"special day {day} given twice")
+        days.add(day)
+        closed, start, end = _hours(entry, f"special day {day}")
+        salon["special_days"].append({"day": day, "is_closed": closed, "start_time": start, "end_time": end})
+
+    return salon
+
+
+# =========================
+# IMPORT
+# =========================
+def _insert_returning_ids(session, model, rows):
+    if not rows:
+        return []
+    result = session.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return [r[0] for r in result]
+
+
+def _write_chunk(session, owner_user_id, salons):
+    """One transaction for a chunk of cleaned records. Safe to re-run after a rollback."""
+    salon_rows = [
+        {"owner_user_id": owner_user_id, "name": s["name"], "description": s["description"],
+         "location": s["location"], "map_link": s["map_link"]}
+        for s in salons
+    ]
+    for row, salon_id in zip(salon_rows, _insert_returning_ids(session, Salon, salon_rows)):
+        row["id"] = salon_id
+
+    service_rows, hours_rows, special_rows = [], [], []
+    for s, salon_row in zip(salons, salon_rows):
+        sid = salon_row["id"]
+        service_rows += [
+            {"salon_id": sid, "name": sv["name"], "duration": sv["duration"], "price": sv["price"],
+             "category": category_for(sv["name"])}
+            for sv in s["services"]
+        ]
+        hours_rows += [dict(h, salon_id=sid) for h in s["weekly_hours"]]
+        special_rows += [dict(d, salon_id=sid) for d in s["special_days"]]
+
+    for row, new_id in zip(service_rows, _insert_returning_ids(session, Service, service_rows)):
+        row["id"] = new_id
+
+    # service key -> id, per salon, in the same order the rows were built
+    service_ids = iter(r["id"] for r in service_rows)
+    staff_rows, staff_skills = [], []
+    for s, salon_row in zip(salons, salon_rows):
+        by_key = {sv["key"]: next(service_ids) for sv in s["services"]}
+        for st in s["staff"]:
+            staff_rows.append({
+                "salon_id": salon_row["id"], "name": st["name"],
+                "profession": st["profession"], "image": st["image"],
+            })
+            staff_skills.append([by_key[k] for k in st["services"]])
+
+    for row, new_id in zip(staff_rows, _insert_returning_ids(session, Staff, staff_rows)):
+        row["id"] = new_id
+
+    links = [
+        {"staff_id": row["id"], "service_id": service_id}
+        for row, skills in zip(staff_rows, staff_skills)
+        for service_id in skills
+    ]
+    if links:
+        session.execute(insert(StaffService), links)
+
+    for rows, model in ((hours_rows, SalonWorkingHours), (special_rows, SalonSpecialHours)):
+        for row, new_id in zip(rows, _insert_returning_ids(session, model, rows)):
+            row["id"] = new_id
+
+    refresh_salon_facets(session, [row["id"] for row in salon_rows])
+
+    # bulk inserts bypass the flush hook: log them the same way it would
+    record_rows(session, "salon", salon_rows)
+    record_rows(session, "service", service_rows)
+    record_rows(session, "staff", staff_rows)
+    record_rows(session, "weekly_hours", hours_rows)
+    record_rows(session, "special_day", special_rows)
+    for row, skills in zip(staff_rows, staff_skills):
+        if skills:
+            record_staff_skills(session, row["salon_id"], row["id"], skills)
+
+    return {
+        "salons": len(salon_rows),
+        "services": len(service_rows),
+        "staff": len(staff_rows),
+        "skills": len(links),
+        "weekly_hours": len(hours_rows),
+        "special_days": len(special_rows),
+    }
+
+
+def import_salons(lines, fmt: str, owner_user_id: int, chunk_size: int = IMPORT_CHUNK_SALONS) -> dict:
+    """
+    Imports every valid salon record from `lines` (any iterable of text
+    lines) for one owner. Invalid records are skipped and reported; each
+    chunk commits on its own, so a failure part-way keeps earlier chunks.
+    """
+    reader = READERS.get(fmt)
+    if reader is None:
+        raise ValueError(f"unknown format {fmt!r} (use jsonl or csv)")
+
+    totals = {"salons": 0, "services": 0, "staff": 0, "skills": 0,
+              "weekly_hours": 0, "special_days": 0, "skipped": 0, "errors": []}
+
+    def flush(chunk):
+        counts = run_write(lambda session: _write_chunk(session, owner_user_id, chunk))
+        for k, v in counts.items():
+            totals[k] += v
+
+    chunk = []
+    for line_no, record in reader(lines):
+        try:
+            chunk.append(clean_record(record))
+        except ImportRecordError as e:
+            totals["skipped"] += 1
+            if len(totals["errors"]) < MAX_REPORTED_ERRORS:
+                totals["errors"].append({"line": line_no, "error": str(e)})
+            continue
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+
+    return totals
+
+
+def open_text(stream):
+    """Binary upload / file -> text lines, tolerating a UTF-8 BOM."""
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+# =========================
+# EXPORT
+# =========================
+def _time_or_empty(value):
+    return value or ""
+
+
+def _export_page(salons):
+    """Salon rows -> full records, five queries for the whole page."""
+    ids = [s.id for s in salons]
+    records = {
+        s.id: {
+            "id": s.id, "name": s.name, "description": s.description or "",
+            "location": s.location or "", "map_link": s.map_link or "",
+            "services": [], "staff": [], "weekly_hours": [], "special_days": [],
+        }
+        for s in salons
+    }
+
+    for r in db.session.execute(
+        select(Service.id, Service.salon_id, Service.name, Service.duration, Service.price)
+        .where(Service.salon_id.in_(ids)).order_by(Service.id)
+    ):
+        records[r.salon_id]["services"].append(
+            {"key": str(r.id), "name": r.name, "duration": r.duration, "price": r.price}
+        )
+
+    skills = {}
+    for r in db.session.execute(
+        select(StaffService.staff_id, StaffService.service_id)
+        .join(Staff, Staff.id == StaffService.staff_id)
+        .where(Staff.salon_id.in_(ids)).order_by(StaffService.service_id)
+    ):
+        skills.setdefault(r.staff_id, []).append(str(r.service_id))
+
+    for r in db.session.execute(
+        select(Staff.id, Staff.salon_id, Staff.name, Staff.profession, Staff.image)
+        .where(Staff.salon_id.in_(ids)).order_by(Staff.id)
+    ):
+        records[r.salon_id]["staff"].append({
+            "name": r.name, "profession": r.profession or "", "image": r.image or "",
+            "services": skills.get(r.id, []),
+        })
+
+    for r in db.session.execute(
+        select(SalonWorkingHours).where(SalonWorkingHours.salon_id.in_(ids))
+        .order_by(SalonWorkingHours.salon_id, SalonWorkingHours.weekday)
+    ).scalars():
+        records[r.salon_id]["weekly_hours"].append({
+            "weekday": r.weekday, "is_closed": bool(r.is_closed),
+            "start": _time_or_empty(r.start_time), "end": _time_or_empty(r.end_time),
+        })
+
+    for r in db.session.execute(
+        select(SalonSpecialHours).where(SalonSpecialHours.salon_id.in_(ids))
+        .order_by(SalonSpecialHours.salon_id, SalonSpecialHours.day)
+    ).scalars():
+        records[r.salon_id]["special_days"].append({
+            "day": r.day.strftime("%Y-%m-%d"), "is_closed": bool(r.is_closed),
+            "start": _time_or_empty(r.start_time), "end": _time_or_empty(r.end_time),
+        })
+
+    return [records[i] for i in ids]
+
+
+def iter_salon_records(owner_user_id: int = None, page_size: int = EXPORT_PAGE_SALONS):
+    """Salon records in id order, one page in memory at a time."""
+    last_id = 0
+    while True:
+        stmt = (
+            select(Salon.id, Salon.name, Salon.description, Salon.location, Salon.map_link)
+            .where(Salon.id > last_id)
+            .order_by(Salon.id)
+            .limit(page_size)
+        )
+        if owner_user_id is not None:
+            stmt = stmt.where(Salon.owner_user_id == owner_user_id)
+        salons = db.session.execute(stmt).all()
+        if not salons:
+            return
+        yield from _export_page(salons)
+        last_id = salons[-1].id
+
+
+def _csv_line(values) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerow(values)
+    return buf.getvalue()
+
+
+def _csv_rows(record):
+    label = record["id"]
+
+    def row(kind, **values):
+        return [label if c == "salon" else kind if c == "record" else values.get(c, "") for c in CSV_COLUMNS]
+
+    yield row("salon", name=record["name"], description=record["description"],
+              location=record["location"], map_link=record["map_link"])
+    for s in record["services"]:
+        yield row("service", key=s["key"], name=s["name"], duration=s["duration"], price=s["price"])
+    for st in record["staff"]:
+        yield row("staff", name=st["name"], profession=st["profession"], image=st["image"],
+                  services="|".join(st["services"]))
+    for h in record["weekly_hours"]:
+        yield row("hours", weekday=h["weekday"], is_closed=int(h["is_closed"]), start=h["start"], end=h["end"])
+    for d in record["special_days"]:
+        yield row("special", day=d["day"], is_closed=int(d["is_closed"]), start=d["start"], end=d["end"])
+
+
+def iter_export(fmt: str, owner_user_id: int = None):
+    """Text chunks (one per salon) of the export file."""
+    if fmt not in READERS:
+        raise ValueError(f"unknown format {fmt!r} (use jsonl or csv)")
+
+    if fmt == "csv":
+        yield _csv_line(CSV_COLUMNS)
+    for record in iter_salon_records(owner_user_id):
+        if fmt == "jsonl":
+            yield json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+        else:
+            yield "".join(_csv_line(r) for r in _csv_rows(record))
@@ -0,0 +1,93 @@
+"""
+Staff <-> service skill matrix for one salon.
+
+Built from a single query over staff_services. Staff and services are given
+dense indexes and every staff member gets a bitset (plain Python int) of the
+services they can do, and every service a bitset of the staff who can do it,
+so both directions are a dict lookup + bit test. The booking page ships the
+staff bitsets to the browser as hex strings (see to_payload).
+"""
+from sqlalchemy import select
+
+from .extensions import db
+from .models import Service, Staff, StaffService
+
+
+def _bit_positions(bits: int):
+    pos = 0
+    while bits:
+        if bits & 1:
+            yield pos
+        bits >>= 1
+        pos += 1
+
+
+class SkillMatrix:
+    def __init__(self, staff_ids, service_ids, pairs):
+        self.staff_ids = list(staff_ids)
+        self.service_ids = list(service_ids)
+        self._staff_index = {sid: i for i, sid in enumerate(self.staff_ids)}
+        self._service_index = {sid: i for i, sid in enumerate(self.service_ids)}
+
+        self._staff_bits = [0] * len(self.staff_ids)      # bit j -> service_ids[j]
+        self._service_bits = [0] * len(self.service_ids)  # bit i -> staff_ids[i]
+        for staff_id, service_id in pairs:
+            i = self._staff_index.get(staff_id)
+            j = self._service_index.get(service_id)
+            if i is None or j is None:
+                continue
+            self._staff_bits[i] |= 1 << j
+            self._service_bits[j] |= 1 << i
+
+    @classmethod
+    def for_salon(cls, salon_id: int, staff_ids=None, service_ids=None):
+        """
+        Pass staff_ids / service_ids when the caller already has them loaded
+        (the booking page does), otherwise they are fetched too.
+        """
+        if staff_ids is None:
+            staff_ids = db.session.scalars(
+                select(Staff.id).where(Staff.salon_id == salon_id).order_by(Staff.id)
+            ).all()
+        if service_ids is None:
+            service_ids = db.session.scalars(
+                select(Service.id).where(Service.salon_id == salon_id).order_by(Service.id)
+            ).all()
+
+        pairs = db.session.execute(
+            select(StaffService.staff_id, StaffService.service_id)
+            .join(Staff, Staff.id == StaffService.staff_id)
+            .where(Staff.salon_id == salon_id)
+        ).all()
+        return cls(staff_ids, service_ids, pairs)
+
+    def can_do(self, staff_id: int, service_id: int) -> bool:
+        i = self._staff_index.get(staff_id)
+        j = self._service_index.get(service_id)
+        if i is None or j is None:
+            return False
+        return bool(self._staff_bits[i] >> j & 1)
+
+    def staff_bits_for_service(self, service_id: int) -> int:
+        j = self._service_index.get(service_id)
+        return 0 if j is None else self._service_bits[j]
+
+    def staff_for_service(self, service_id: int) -> list:
+        return [self.staff_ids[i] for i in _bit_positions(self.staff_bits_for_service(service_id))]
+
+    def services_for_staff(self, staff_id: int) -> list:
+        i = self._staff_index.get(staff_id)
+        if i is None:
+            return []
+        return [self.service_ids[j] for j in _bit_positions(self._staff_bits[i])]
+
+    def to_payload(self) -> dict:
+        """
+        {"staff": [ids], "services": [ids], "bits": ["hex", ...]} where bits[i]
+        is staff[i]'s service bitset. Hex strings keep it exact past 53 services.
+        """
+        return {
+            "staff": self.staff_ids,
+            "services": self.service_ids,
+            "bits": [format(b, "x") for b in self._staff_bits],
+        }
@@ -0,0 +1,172 @@
+"""
+Change feed: an append-only log of catalogue / schedule mutations so
+consumers (mobile cache, search indexer, partners) can sync incrementally.
+
+Rows are written in the same transaction as the change itself:
+  - ORM changes to TRACKED models are picked up in after_flush and inserted
+    with one Core INSERT on the flush's connection
+  - bulk statements the ORM doesn't see (query.delete(), Core insert) call
+    record_change() / record_rows() next to the statement. Staff availability and skills
+    are only recorded this way, as one aggregate row per staff/day and per
+    staff member, which is what consumers actually want to replace
+
+A change row: {cursor, entity, id, salon_id, op: upsert|delete, payload}.
+The payload is the row's column values (null for deletes). Deleting a
+salon or staff member also removes what hangs off it; consumers drop
+dependants themselves.
+
+On SQLite writes are serialized, so cursors commit in order. With
+concurrent writers (Postgres) a smaller id can commit after a larger one;
+CHANGES_SETTLE_SECONDS holds back rows younger than that.
+"""
+import json
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, func, insert, inspect, select
+
+from .extensions import db
+from .replicas import RoutingSession
+from .models import (
+    ChangeLog, Salon, Service, Staff, SalonPhoto,
+    SalonWorkingHours, SalonSpecialHours
+)
+
+TRACKED = {
+    Salon: "salon",
+    Service: "service",
+    Staff: "staff",
+    SalonWorkingHours: "weekly_hours",
+    SalonSpecialHours: "special_day",
+    SalonPhoto: "photo",
+}
+
+MAX_FEED_LIMIT = 10000
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _dumps(payload):
+    if payload is None:
+        return None
+    return json.dumps(payload, default=_json_default, separators=(",", ":"))
+
+
+def _row_payload(obj) -> dict:
+    # loaded values only: no lazy loads in the middle of a flush
+    state = inspect(obj)
+    return {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+
+
+def _change_row(entity, entity_id, salon_id, op, payload):
+    return {
+        "entity": entity,
+        "entity_id": str(entity_id),
+        "salon_id": salon_id,
+        "op": op,
+        "payload": _dumps(payload),
+    }
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _after_flush(session, flush_context):
+    rows = []
+    for obj in session.new:
+        entity = TRACKED.get(type(obj))
+        if entity:
+            rows.append(_change_row(entity, obj.id, _salon_id_of(obj), "upsert", _row_payload(obj)))
+    for obj in session.dirty:
+        entity = TRACKED.get(type(obj))
+        if entity and session.is_modified(obj, include_collections=False):
+            rows.append(_change_row(entity, obj.id, _salon_id_of(obj), "upsert", _row_payload(obj)))
+    for obj in session.deleted:
+        entity = TRACKED.get(type(obj))
+        if entity:
+            rows.append(_change_row(entity, obj.id, _salon_id_of(obj), "delete", None))
+
+    if rows:
+        session.connection().execute(insert(ChangeLog.__table__), rows)
+
+
+def _salon_id_of(obj):
+    return obj.id if isinstance(obj, Salon) else obj.salon_id
+
+
+def record_change(session, entity: str, entity_id, salon_id: int, op: str, payload: dict = None):
+    """For bulk statements the ORM doesn't track. Runs in the caller's transaction."""
+    session.execute(insert(ChangeLog.__table__), [_change_row(entity, entity_id, salon_id, op, payload)])
+
+
+def record_rows(session, entity: str, rows):
+    """One upsert per row of a bulk insert; rows are column dicts with their ids."""
+    if not rows:
+        return
+    session.execute(insert(ChangeLog.__table__), [
+        _change_row(entity, r["id"], r["id"] if entity == "salon" else r["salon_id"], "upsert", r)
+        for r in rows
+    ])
+
+
+def record_staff_day(session, salon_id: int, staff_id: int, day: date, times=None, all_day=False):
+    """Aggregate row for one staff member's blocks on one day (empty = cleared)."""
+    day_str = day.strftime("%Y-%m-%d")
+    if not all_day and not times:
+        record_change(session, "staff_availability", f"{staff_id}:{day_str}", salon_id, "delete")
+        return
+    record_change(session, "staff_availability", f"{staff_id}:{day_str}", salon_id, "upsert", {
+        "staff_id": staff_id, "day": day_str, "all_day": bool(all_day), "times": sorted(times or []),
+    })
+
+
+def record_staff_skills(session, salon_id: int, staff_id: int, service_ids):
+    record_change(session, "staff_skills", staff_id, salon_id, "upsert", {
+        "staff_id": staff_id, "service_ids": sorted(service_ids),
+    })
+
+
+def head_cursor() -> int:
+    return db.session.execute(select(func.max(ChangeLog.id))).scalar() or 0
+
+
+def oldest_cursor() -> int:
+    return db.session.execute(select(func.min(ChangeLog.id))).scalar() or 0
+
+
+def iter_changes(since: int, limit: int, salon_id: int = None, settle_seconds: float = 0.0):
+    """
+    NDJSON lines: one per change in cursor order, then a final
+    {"next_cursor": n, "more": bool} line to resume from.
+    """
+    stmt = (
+        select(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.salon_id,
+               ChangeLog.op, ChangeLog.payload, ChangeLog.created_at)
+        .where(ChangeLog.id > since)
+        .order_by(ChangeLog.id)
+        .limit(limit + 1)
+    )
+    if salon_id is not None:
+        stmt = stmt.where(ChangeLog.salon_id == salon_id)
+    if settle_seconds > 0:
+        stmt = stmt.where(ChangeLog.created_at <= datetime.utcnow() - timedelta(seconds=settle_seconds))
+
+    cursor, sent = since, 0
+    for row in db.session.execute(stmt.execution_options(yield_per=500)):
+        if sent == limit:
+            yield json.dumps({"next_cursor": cursor, "more": True}) + "\n"
+            return
+        cursor = row.id
+        sent += 1
+        yield json.dumps({
+            "cursor": row.id,
+            "entity": row.entity,
+            "id": row.entity_id,
+            "salon_id": row.salon_id,
+            "op": row.op,
+            "payload": json.loads(row.payload) if row.payload else None,
+            "at": row.created_at.isoformat() if row.created_at else None,
+        }, separators=(",", ":")) + "\n"
+
+    yield json.dumps({"next_cursor": cursor, "more": False}) + "\n"
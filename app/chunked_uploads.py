@@ -0,0 +1,229 @@
+"""
+Resumable chunked photo uploads.
+
+A single multipart POST is capped by MAX_CONTENT_LENGTH and lost on any
+network hiccup. Instead the client:
+
+  1. POST  .../uploads                    {"target", "staff_id", "filename", "size"}
+                                          -> {"upload_id", "chunk_size", "received": 0}
+  2. PUT   .../uploads/<id>?offset=N      raw bytes, at most chunk_size
+                                          -> {"received"}; 409 + {"received"} on a wrong offset
+     GET   .../uploads/<id>               -> {"received", ...}: where to resume after a failure
+  3. POST  .../uploads/<id>/finalize      the assembled file goes through save_image()
+
+Each upload is a directory under UPLOAD_CHUNK_DIR holding meta.json and
+data.part. Chunks are streamed from the request straight into data.part
+at their offset (constant memory per upload), under a file lock so two
+retries of the same chunk can't interleave. Bytes of an interrupted chunk
+stay: the client resumes from `received`, not from the chunk boundary.
+Uploads idle for UPLOAD_SESSION_TTL_HOURS are removed by expire_uploads()
+(opportunistically on new uploads, or `flask expire-uploads` from cron).
+"""
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+
+from flask import current_app
+from werkzeug.datastructures import FileStorage
+
+try:
+    import fcntl
+except ImportError:   # Windows: no advisory locks, offsets are still checked
+    fcntl = None
+
+UPLOAD_TARGETS = ("salon_photo", "staff_photo")
+UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+COPY_BUFFER = 64 * 1024
+EXPIRE_EVERY_SECONDS = 600
+
+_last_expire = 0.0
+
+
+class ChunkOffsetError(Exception):
+    """The chunk doesn't start where the stored data ends; `received` says where it should."""
+
+    def __init__(self, received: int):
+        super().__init__(f"expected offset {received}")
+        self.received = received
+
+
+def _root() -> str:
+    return current_app.config["UPLOAD_CHUNK_DIR"]
+
+
+def _upload_dir(upload_id: str) -> str:
+    return os.path.join(_root(), upload_id)
+
+
+def _ttl_seconds() -> float:
+    return current_app.config["UPLOAD_SESSION_TTL_HOURS"] * 3600.0
+
+
+def start_upload(user_id: int, target: str, salon_id: int, staff_id, filename: str, size: int) -> dict:
+    """Creates the upload directory. Raises ValueError for a bad size/target."""
+    if target not in UPLOAD_TARGETS:
+        raise ValueError("Unknown upload target.")
+    max_bytes = current_app.config["UPLOAD_MAX_BYTES"]
+    if size <= 0 or size > max_bytes:
+        raise ValueError(f"File size must be between 1 byte and {max_bytes // (1024 * 1024)}MB.")
+
+    _maybe_expire()
+
+    meta = {
+        "upload_id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "target": target,
+        "salon_id": salon_id,
+        "staff_id": staff_id,
+        "filename": filename,
+        "size": size,
+        "created_at": time.time(),
+    }
+    path = _upload_dir(meta["upload_id"])
+    os.makedirs(path)
+    open(os.path.join(path, "data.part"), "wb").close()
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, "meta.json"))
+    return meta
+
+
+def load_upload(upload_id: str, user_id: int):
+    """The upload's meta, or None if it doesn't exist, expired, or isn't this user's."""
+    if not UPLOAD_ID_RE.match(upload_id or ""):
+        return None
+    try:
+        with open(os.path.join(_upload_dir(upload_id), "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if meta.get("user_id") != user_id:
+        return None
+    if _last_activity(upload_id) < time.time() - _ttl_seconds():
+        return None
+    return meta
+
+
+def _part_path(meta) -> str:
+    return os.path.join(_upload_dir(meta["upload_id"]), "data.part")
+
+
+def _last_activity(upload_id: str) -> float:
+    path = _upload_dir(upload_id)
+    try:
+        return max(os.stat(os.path.join(path, name)).st_mtime for name in os.listdir(path))
+    except (FileNotFoundError, ValueError):
+        return 0.0
+
+
+def received_bytes(meta) -> int:
+    try:
+        return os.path.getsize(_part_path(meta))
+    except FileNotFoundError:
+        return 0
+
+
+def upload_status(meta) -> dict:
+    return {
+        "upload_id": meta["upload_id"],
+        "target": meta["target"],
+        "size": meta["size"],
+        "received": received_bytes(meta),
+        "chunk_size": current_app.config["UPLOAD_CHUNK_BYTES"],
+        "expires_at": int(_last_activity(meta["upload_id"]) + _ttl_seconds()),
+    }
+
+
+def append_chunk(meta, offset: int, stream, length: int) -> int:
+    """
+    Streams `length` bytes from `stream` into the upload at `offset`.
+    Returns the bytes received so far. Raises ChunkOffsetError if offset
+    isn't the current end, ValueError if the chunk is too big.
+    """
+    if length > current_app.config["UPLOAD_CHUNK_BYTES"]:
+        raise ValueError("Chunk too large.")
+    if offset + length > meta["size"]:
+        raise ValueError("Chunk goes past the declared file size.")
+
+    try:
+        f = open(_part_path(meta), "r+b")
+    except FileNotFoundError:
+        raise ChunkOffsetError(0)   # already finalized
+    with f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        received = os.fstat(f.fileno()).st_size
+        if offset != received:
+            raise ChunkOffsetError(received)
+        f.seek(received)
+        remaining = length
+        while remaining > 0:
+            buf = stream.read(min(COPY_BUFFER, remaining))
+            if not buf:
+                break
+            f.write(buf)
+            remaining -= len(buf)
+        return received + (length - remaining)
+
+
+def claim_upload(meta) -> FileStorage:
+    """
+    Takes the complete file out of the upload, so a repeated finalize can't
+    use it twice. The caller passes the result to save_image() and then
+    calls discard_upload(). Raises ValueError if bytes are missing.
+    """
+    received = received_bytes(meta)
+    if received != meta["size"]:
+        raise ValueError(f"Upload incomplete: {received} of {meta['size']} bytes received.")
+    done = os.path.join(_upload_dir(meta["upload_id"]), "data.done")
+    try:
+        os.rename(_part_path(meta), done)
+    except FileNotFoundError:
+        raise ValueError("Upload already finalized.")
+    return FileStorage(stream=open(done, "rb"), filename=meta["filename"])
+
+
+def discard_upload(upload_id: str, file_storage: FileStorage = None):
+    if file_storage is not None:
+        file_storage.close()
+    shutil.rmtree(_upload_dir(upload_id), ignore_errors=True)
+
+
+def expire_uploads(root: str, ttl_seconds: float, now: float = None) -> int:
+    """Removes uploads idle for longer than ttl_seconds. Returns how many."""
+    cutoff = (now or time.time()) - ttl_seconds
+    removed = 0
+    try:
+        it = os.scandir(root)
+    except FileNotFoundError:
+        return 0
+    with it:
+        for entry in it:
+            if not (entry.is_dir(follow_symlinks=False) and UPLOAD_ID_RE.match(entry.name)):
+                continue
+            try:
+                last = max(e.stat().st_mtime for e in os.scandir(entry.path))
+            except ValueError:
+                last = entry.stat().st_mtime   # empty directory
+            except FileNotFoundError:
+                continue
+            if last < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+    return removed
+
+
+def _maybe_expire():
+    # at most every EXPIRE_EVERY_SECONDS per process; cheap when nothing expired
+    global _last_expire
+    now = time.time()
+    if now - _last_expire < EXPIRE_EVERY_SECONDS:
+        return
+    _last_expire = now
+    removed = expire_uploads(_root(), _ttl_seconds(), now=now)
+    if removed:
+        print(f"[uploads] expired {removed} unfinished uploads", flush=True)
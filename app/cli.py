@@ -0,0 +1,197 @@
+"""
+Flask CLI commands.
+
+    flask --app run seed --salons 200
+    flask --app run sync-replicas
+    flask --app run prune-changes --days 30
+    flask --app run import-salons chain.jsonl --owner-email owner@example.com
+    flask --app run export-salons --format csv --out salons.csv
+    flask --app run gc-uploads --grace-hours 24 --dry-run
+    flask --app run migrate-uploads --batch-size 200
+    flask --app run image-meta --batch-size 200
+    flask --app run expire-uploads
+    flask --app run rebuild-facets
+    flask --app run rebuild-review-stats
+    flask --app run refresh-analytics [--rebuild]
+"""
+import json
+
+import click
+from flask import current_app
+
+
+def register_cli(app):
+
+    @app.cli.command("seed")
+    @click.option("--salons", default=50, show_default=True, help="Number of salons.")
+    @click.option("--owners", default=10, show_default=True, help="Number of owner accounts.")
+    @click.option("--customers", default=100, show_default=True, help="Number of customer accounts.")
+    @click.option("--services", default=12, show_default=True, help="Avg services per salon.")
+    @click.option("--staff", default=6, show_default=True, help="Avg staff per salon.")
+    @click.option("--skills", default=4, show_default=True, help="Avg services per staff member.")
+    @click.option("--photos", default=3, show_default=True, help="Avg photos per salon (max 5).")
+    @click.option("--reviews", default=30, show_default=True, help="Avg reviews per salon.")
+    @click.option("--special-days", default=4, show_default=True, help="Avg upcoming special days per salon.")
+    @click.option("--history-days", default=90, show_default=True, help="Days of availability/review history.")
+    @click.option("--block-rate", default=0.15, show_default=True, help="Chance a staff/day has blocks.")
+    @click.option("--photo-files/--no-photo-files", default=False, help="Also write tiny image files.")
+    @click.option("--seed", "rnd_seed", default=42, show_default=True, help="Random seed.")
+    def seed_command(rnd_seed, **kwargs):
+        """Fill the database with a synthetic dataset."""
+        from .seed import seed_database
+
+        counts = seed_database(seed=rnd_seed, **kwargs)
+        click.echo(json.dumps(counts, indent=2))
+
+    @app.cli.command("sync-replicas")
+    def sync_replicas_command():
+        """Copy the primary SQLite database into the SQLite replicas (local testing)."""
+        from .replicas import sync_sqlite_replicas
+
+        for path in sync_sqlite_replicas(current_app):
+            click.echo(f"synced {path}")
+
+    @app.cli.command("prune-changes")
+    @click.option("--days", default=30, show_default=True, help="Keep this many days of the change log.")
+    def prune_changes_command(days):
+        """Delete old change-log rows (consumers behind the cutoff get 410 and resync)."""
+        from datetime import datetime, timedelta
+
+        from sqlalchemy import delete, func, select
+
+        from .extensions import db
+        from .models import ChangeLog
+
+        head = db.session.execute(select(func.max(ChangeLog.id))).scalar()
+        if head is None:
+            click.echo("change log is empty")
+            return
+
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        # the newest row always stays, so the oldest cursor keeps moving forward
+        result = db.session.execute(
+            delete(ChangeLog).where(ChangeLog.created_at < cutoff, ChangeLog.id < head)
+        )
+        db.session.commit()
+        click.echo(f"deleted {result.rowcount} change rows older than {days} days")
+
+    @app.cli.command("import-salons")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--owner-email", required=True, help="Owner account the salons are created for.")
+    @click.option("--format", "fmt", type=click.Choice(["auto", "jsonl", "csv"]), default="auto", show_default=True)
+    @click.option("--chunk-size", default=50, show_default=True, help="Salons per transaction.")
+    def import_salons_command(path, owner_email, fmt, chunk_size):
+        """Import salons with services, staff, skills and hours from JSON Lines / CSV."""
+        from .bulk import import_salons
+        from .models import User
+
+        owner = User.query.filter_by(email=owner_email.strip().lower()).first()
+        if owner is None or owner.role != "owner":
+            raise click.ClickException(f"no owner account with email {owner_email}")
+        if fmt == "auto":
+            fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            result = import_salons(f, fmt, owner.id, chunk_size=max(1, chunk_size))
+        click.echo(json.dumps(result, indent=2))
+
+    @app.cli.command("export-salons")
+    @click.option("--owner-email", default=None, help="Only this owner's salons (default: all).")
+    @click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default="jsonl", show_default=True)
+    @click.option("--out", default="-", show_default=True, help="Output file, - for stdout.")
+    def export_salons_command(owner_email, fmt, out):
+        """Stream salons with services, staff, skills and hours as JSON Lines / CSV."""
+        from .bulk import iter_export
+        from .models import User
+
+        owner_user_id = None
+        if owner_email:
+            owner = User.query.filter_by(email=owner_email.strip().lower()).first()
+            if owner is None:
+                raise click.ClickException(f"no account with email {owner_email}")
+            owner_user_id = owner.id
+
+        with click.open_file(out, "w", encoding="utf-8") as f:
+            for chunk in iter_export(fmt, owner_user_id=owner_user_id):
+                f.write(chunk)
+
+    @app.cli.command("gc-uploads")
+    @click.option("--grace-hours", default=24.0, show_default=True, help="Never delete files younger than this.")
+    @click.option("--batch-size", default=1000, show_default=True, help="Files checked per database query.")
+    @click.option("--dry-run", is_flag=True, help="Only report what would be deleted.")
+    def gc_uploads_command(grace_hours, batch_size, dry_run):
+        """Delete upload files that no salon photo or staff member refers to."""
+        from .storage import UPLOAD_KINDS, get_storage
+        from .upload_gc import collect_garbage
+
+        report = collect_garbage(
+            get_storage(),
+            UPLOAD_KINDS,
+            grace_hours=grace_hours,
+            batch_size=max(1, batch_size),
+            dry_run=dry_run,
+        )
+        click.echo(json.dumps(report, indent=2))
+
+    @app.cli.command("migrate-uploads")
+    @click.option("--batch-size", default=200, show_default=True, help="Rows rewritten per transaction.")
+    def migrate_uploads_command(batch_size):
+        """Move legacy upload paths to sharded storage keys (resumable)."""
+        from .storage import get_storage, migrate_legacy_uploads
+
+        report = migrate_legacy_uploads(
+            get_storage(),
+            current_app.config["UPLOAD_FOLDER"],
+            batch_size=max(1, batch_size),
+        )
+        click.echo(json.dumps(report, indent=2))
+
+    @app.cli.command("image-meta")
+    @click.option("--batch-size", default=200, show_default=True, help="Rows updated per transaction.")
+    def image_meta_command(batch_size):
+        """Compute dimensions and placeholders for photos uploaded before they were stored."""
+        from .storage import backfill_image_meta, get_storage
+
+        report = backfill_image_meta(get_storage(), batch_size=max(1, batch_size))
+        click.echo(json.dumps(report, indent=2))
+
+    @app.cli.command("expire-uploads")
+    def expire_uploads_command():
+        """Remove chunked uploads idle for longer than UPLOAD_SESSION_TTL_HOURS."""
+        from .chunked_uploads import expire_uploads
+
+        cfg = current_app.config
+        removed = expire_uploads(cfg["UPLOAD_CHUNK_DIR"], cfg["UPLOAD_SESSION_TTL_HOURS"] * 3600.0)
+        click.echo(f"removed {removed} expired uploads")
+
+    @app.cli.command("rebuild-facets")
+    def rebuild_facets_command():
+        """Recompute the salon filter's facet tables from the services."""
+        from .extensions import db
+        from .facets import rebuild_facets
+
+        salons = rebuild_facets(db.session)
+        db.session.commit()
+        click.echo(f"rebuilt facets for {salons} salons")
+
+    @app.cli.command("rebuild-review-stats")
+    def rebuild_review_stats_command():
+        """Recompute every salon's rating histogram from the reviews."""
+        from .extensions import db
+        from .reviews import rebuild_review_stats
+
+        salons = rebuild_review_stats(db.session)
+        db.session.commit()
+        click.echo(f"rebuilt rating stats for {salons} salons")
+
+    @app.cli.command("refresh-analytics")
+    @click.option("--rebuild", is_flag=True, help="Recompute the rollups from scratch.")
+    def refresh_analytics_command(rebuild):
+        """Bring the owner analytics rollups up to date (from cron, or instead of the background refresh)."""
+        from .extensions import db
+        from .analytics import rebuild_rollups, refresh_rollups
+
+        settle = float(app.config.get("ANALYTICS_SETTLE_SECONDS", 0))
+        report = rebuild_rollups(db.session, settle) if rebuild else refresh_rollups(db.session, settle)
+        db.session.commit()
+        click.echo(json.dumps(report))
@@ -0,0 +1,90 @@
+"""
+Database engine tuning.
+
+SQLite (default store):
+  every new connection gets SQLITE_PRAGMAS, by default WAL journal (readers
+  don't block on writers), a busy_timeout instead of failing with
+  "database is locked", synchronous=NORMAL (safe with WAL), mmap and a
+  bigger page cache.
+
+Other databases (PostgreSQL/MySQL):
+  pool sizing from DB_POOL_* settings, unless SQLALCHEMY_ENGINE_OPTIONS is
+  set explicitly.
+
+Everything here can be switched off with SQLITE_TUNING=0 (used by the
+before/after benchmark), except PRAGMA foreign_keys=ON: SQLite leaves
+foreign keys unenforced by default, and the ON DELETE CASCADE clauses that
+salon / staff deletes rely on only run when it is on.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def engine_options_for(app, uri=None) -> dict:
+    """Engine options for `uri` (default: the primary) from DB_POOL_* / SQLITE_* config."""
+    cfg = app.config
+    url = make_url(uri or cfg["SQLALCHEMY_DATABASE_URI"])
+
+    if url.get_backend_name() == "sqlite":
+        if not cfg.get("SQLITE_TUNING"):
+            return {}
+        busy_ms = int(cfg["SQLITE_PRAGMAS"].get("busy_timeout", 5000))
+        # pysqlite's own busy handler, in seconds (kept in sync with the pragma)
+        return {"connect_args": {"timeout": busy_ms / 1000.0}}
+
+    return {
+        "pool_size": cfg["DB_POOL_SIZE"],
+        "max_overflow": cfg["DB_MAX_OVERFLOW"],
+        "pool_timeout": cfg["DB_POOL_TIMEOUT"],
+        "pool_recycle": cfg["DB_POOL_RECYCLE"],
+        "pool_pre_ping": cfg["DB_POOL_PRE_PING"],
+    }
+
+
+def configure_engine_options(app):
+    """Call before db.init_app(): fills SQLALCHEMY_ENGINE_OPTIONS if not set."""
+    if not app.config.get("SQLALCHEMY_ENGINE_OPTIONS"):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options_for(app)
+
+
+def _sqlite_pragma_listener(pragmas: dict):
+    statements = [f"PRAGMA {name}={value}" for name, value in pragmas.items()]
+
+    def on_connect(dbapi_conn, conn_record):
+        cur = dbapi_conn.cursor()
+        try:
+            for stmt in statements:
+                cur.execute(stmt)
+        finally:
+            cur.close()
+
+    return on_connect
+
+
+def apply_sqlite_pragmas(app, engines):
+    """Call after db.init_app() (inside app context) with db.engines.values()."""
+    if not app.config.get("SQLITE_TUNING"):
+        return
+    pragmas = app.config.get("SQLITE_PRAGMAS") or {}
+    if not pragmas:
+        return
+
+    listener = _sqlite_pragma_listener(pragmas)
+    for engine in engines:
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", listener)
+
+
+def _sqlite_foreign_keys_on(dbapi_conn, conn_record):
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cur.close()
+
+
+def enable_sqlite_foreign_keys(engines):
+    """Call after db.init_app() (inside app context). Always on, tuning or not."""
+    for engine in engines:
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", _sqlite_foreign_keys_on)
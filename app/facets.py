@@ -0,0 +1,316 @@
+"""
+Faceted salon filtering: service category / name, price and duration.
+
+Matching runs on Service through two covering indexes,
+(category, price, duration, salon_id) and (price, duration, salon_id):
+a salon matches when one of its services satisfies every condition.
+
+Facet counts (salons per category, per price bucket) are never computed
+with a GROUP BY over services at request time. They are kept in two small
+tables, maintained by refresh_salon_facets() in the same transaction as
+every service write:
+
+  salon_facet  (salon_id, category, price_bucket) -> service_count
+               what each salon offers; the previous state, for diffs
+  facet_count  (facet, value, scope) -> salon_count
+               facet "category" / "price"; scope "*" = all salons, or a
+               category: price buckets among that category's services
+
+A refresh diffs the salon's old and new (category, bucket) sets and adds
++1/-1 to the affected facet_count rows, so a service write costs a few
+row updates. rebuild_facets() recomputes everything (seed, migration,
+`flask rebuild-facets`).
+
+Facets follow the service filter only: price/duration ranges narrow the
+result list but not the counts, so every price bucket stays clickable.
+"""
+from collections import Counter
+
+from sqlalchemy import delete, insert, select, update
+
+from .availability import contains_pattern
+from .models import Service, SalonFacet, FacetCount
+
+# checked in order: "Men's haircut" is barber before it is hair
+CATEGORY_KEYWORDS = (
+    ("nails", ("manicure", "pedicure", "nail")),
+    ("barber", ("beard", "shave", "barber", "men's haircut")),
+    ("hair", ("hair", "colour", "color", "highlight", "blow dry", "keratin", "balayage", "perm", "scalp")),
+    ("brows_lashes", ("brow", "lash")),
+    ("makeup", ("makeup", "make-up")),
+    ("skin", ("facial", "peel", "skin")),
+    ("body", ("massage", "wax", "body", "spa")),
+)
+CATEGORY_LABELS = {
+    "nails": "Nails", "barber": "Barber", "hair": "Hair", "brows_lashes": "Brows & lashes",
+    "makeup": "Makeup", "skin": "Skin", "body": "Body", "other": "Other",
+}
+OTHER_CATEGORY = "other"
+
+# (label, low, high): low <= price < high
+PRICE_BUCKETS = (
+    ("0-25", 0, 25), ("25-50", 25, 50), ("50-100", 50, 100), ("100-200", 100, 200), ("200+", 200, None),
+)
+ALL_SCOPE = "*"
+
+MAX_FILTER_RESULTS = 100
+REBUILD_BATCH_SALONS = 500
+
+
+def category_for(name: str) -> str:
+    name = (name or "").lower()
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(k in name for k in keywords):
+            return category
+    return OTHER_CATEGORY
+
+
+def price_bucket(price) -> str:
+    price = price or 0
+    for label, low, high in PRICE_BUCKETS:
+        if price >= low and (high is None or price < high):
+            return label
+    return PRICE_BUCKETS[0][0]   # negative prices
+
+
+# =========================
+# MAINTENANCE
+# =========================
+def _facet_keys(pairs) -> set:
+    keys = set()
+    for category, bucket in pairs:
+        keys.add(("category", category, ALL_SCOPE))
+        keys.add(("price", bucket, ALL_SCOPE))
+        keys.add(("price", bucket, category))
+    return keys
+
+
+def _service_pairs(session, salon_ids) -> dict:
+    """salon_id -> Counter{(category, bucket): services} from the services themselves."""
+    out = {}
+    rows = session.execute(
+        select(Service.salon_id, Service.category, Service.price).where(Service.salon_id.in_(salon_ids))
+    )
+    for salon_id, category, price in rows:
+        out.setdefault(salon_id, Counter())[(category, price_bucket(price))] += 1
+    return out
+
+
+def _stored_pairs(session, salon_ids) -> dict:
+    out = {}
+    rows = session.execute(
+        select(SalonFacet.salon_id, SalonFacet.category, SalonFacet.price_bucket)
+        .where(SalonFacet.salon_id.in_(salon_ids))
+    )
+    for salon_id, category, bucket in rows:
+        out.setdefault(salon_id, set()).add((category, bucket))
+    return out
+
+
+def _add_counts(session, deltas: Counter):
+    rows = [
+        {"facet": facet, "value": value, "scope": scope, "salon_count": n}
+        for (facet, value, scope), n in sorted(deltas.items()) if n
+    ]
+    if not rows:
+        return
+    dialect = session.get_bind(mapper=FacetCount.__mapper__).dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(FacetCount.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["facet", "value", "scope"],
+            set_={"salon_count": FacetCount.__table__.c.salon_count + stmt.excluded.salon_count},
+        )
+        session.execute(stmt, rows)
+        return
+    for row in rows:
+        result = session.execute(
+            update(FacetCount)
+            .where(FacetCount.facet == row["facet"], FacetCount.value == row["value"],
+                   FacetCount.scope == row["scope"])
+            .values(salon_count=FacetCount.salon_count + row["salon_count"])
+        )
+        if result.rowcount == 0:
+            session.execute(insert(FacetCount), [row])
+
+
+def refresh_salon_facets(session, salon_ids, removing: bool = False):
+    """
+    Call in the transaction that changed these salons' services (after the
+    change is flushed). removing=True: the salons are about to be deleted.
+    """
+    salon_ids = sorted(set(salon_ids))
+    if not salon_ids:
+        return
+    new = {} if removing else _service_pairs(session, salon_ids)
+    old = _stored_pairs(session, salon_ids)
+
+    deltas = Counter()
+    for salon_id in salon_ids:
+        before = _facet_keys(old.get(salon_id, ()))
+        after = _facet_keys(new.get(salon_id, {}))
+        for key in after - before:
+            deltas[key] += 1
+        for key in before - after:
+            deltas[key] -= 1
+
+    session.execute(delete(SalonFacet).where(SalonFacet.salon_id.in_(salon_ids)))
+    rows = [
+        {"salon_id": salon_id, "category": category, "price_bucket": bucket, "service_count": n}
+        for salon_id, pairs in new.items()
+        for (category, bucket), n in pairs.items()
+    ]
+    if rows:
+        session.execute(insert(SalonFacet), rows)
+    _add_counts(session, deltas)
+
+
+def rebuild_facets(session) -> int:
+    """Recomputes both tables from Service. Returns the number of salons with services."""
+    session.execute(delete(SalonFacet))
+    session.execute(delete(FacetCount))
+
+    totals = Counter()
+    salons = 0
+    last_id = 0
+    while True:
+        salon_ids = session.scalars(
+            select(Service.salon_id).where(Service.salon_id > last_id)
+            .group_by(Service.salon_id).order_by(Service.salon_id).limit(REBUILD_BATCH_SALONS)
+        ).all()
+        if not salon_ids:
+            break
+        last_id = salon_ids[-1]
+        pairs = _service_pairs(session, salon_ids)
+        session.execute(insert(SalonFacet), [
+            {"salon_id": salon_id, "category": category, "price_bucket": bucket, "service_count": n}
+            for salon_id, p in pairs.items()
+            for (category, bucket), n in p.items()
+        ])
+        for p in pairs.values():
+            totals.update(_facet_keys(p))
+        salons += len(pairs)
+
+    _add_counts(session, totals)
+    return salons
+
+
+# =========================
+# QUERIES
+# =========================
+def parse_filter_args(args) -> dict:
+    """Query string -> filter dict. ValueError for unusable ranges."""
+    def number(name):
+        raw = (args.get(name) or "").strip()
+        if not raw:
+            return None
+        try:
+            value = int(raw)
+        except ValueError:
+            raise ValueError(f"{name} must be a whole number")
+        if value < 0:
+            raise ValueError(f"{name} can't be negative")
+        return value
+
+    f = {
+        "service": (args.get("service") or "").strip()[:140],
+        "price_min": number("price_min"), "price_max": number("price_max"),
+        "duration_min": number("duration_min"), "duration_max": number("duration_max"),
+    }
+    for lo, hi in (("price_min", "price_max"), ("duration_min", "duration_max")):
+        if f[lo] is not None and f[hi] is not None and f[lo] > f[hi]:
+            raise ValueError(f"{lo} is larger than {hi}")
+    return f
+
+
+def is_filtered(f: dict) -> bool:
+    return bool(f["service"]) or any(f[k] is not None for k in ("price_min", "price_max", "duration_min", "duration_max"))
+
+
+def service_category(f: dict):
+    """The category the service filter pins down, or None (free text / no filter)."""
+    text = f["service"].lower()
+    if not text:
+        return None
+    if text in CATEGORY_LABELS:
+        return text
+    category = category_for(text)
+    return None if category == OTHER_CATEGORY else category
+
+
+def _service_conditions(f: dict):
+    conds = []
+    text = f["service"].lower()
+    category = service_category(f)
+    if category:
+        conds.append(Service.category == category)   # leading column of the covering index
+    if text and text != category:
+        conds.append(Service.name.ilike(contains_pattern(text), escape="\\"))
+    if f["price_min"] is not None:
+        conds.append(Service.price >= f["price_min"])
+    if f["price_max"] is not None:
+        conds.append(Service.price <= f["price_max"])
+    if f["duration_min"] is not None:
+        conds.append(Service.duration >= f["duration_min"])
+    if f["duration_max"] is not None:
+        conds.append(Service.duration <= f["duration_max"])
+    return conds
+
+
+def matching_salon_ids(session, f: dict, after: int = 0, limit: int = None) -> list:
+    """Ids of salons with at least one service matching f, ascending, after `after`."""
+    stmt = (
+        select(Service.salon_id)
+        .where(Service.salon_id > after, *_service_conditions(f))
+        .group_by(Service.salon_id)
+        .order_by(Service.salon_id)
+    )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return session.scalars(stmt).all()
+
+
+def matching_services(session, f: dict, salon_ids) -> dict:
+    """salon_id -> [service dict] of the services that made each salon match."""
+    out = {}
+    if not salon_ids:
+        return out
+    rows = session.execute(
+        select(Service.id, Service.salon_id, Service.name, Service.price, Service.duration)
+        .where(Service.salon_id.in_(salon_ids), *_service_conditions(f))
+        .order_by(Service.salon_id, Service.price, Service.id)
+    )
+    for service_id, salon_id, name, price, duration in rows:
+        out.setdefault(salon_id, []).append(
+            {"id": service_id, "name": name, "price": price, "duration": duration}
+        )
+    return out
+
+
+def facet_counts(session, category=None) -> dict:
+    """
+    {"category": [...], "price": [...]} from facet_count: categories over all
+    salons, price buckets within `category` when given. Two indexed reads.
+    """
+    scope = category or ALL_SCOPE
+    rows = session.execute(
+        select(FacetCount.facet, FacetCount.value, FacetCount.salon_count)
+        .where(FacetCount.scope.in_({ALL_SCOPE, scope}))
+        .where((FacetCount.facet == "category") | (FacetCount.scope == scope))
+    )
+    counts = {(facet, value): n for facet, value, n in rows}
+
+    categories = [
+        {"value": c, "label": CATEGORY_LABELS[c], "count": counts.get(("category", c), 0)}
+        for c in CATEGORY_LABELS
+    ]
+    prices = [
+        {"value": label, "min": low, "max": None if high is None else high - 1,   # inclusive, like price_max
+         "count": counts.get(("price", label), 0)}
+        for label, low, high in PRICE_BUCKETS
+    ]
+    return {"category": categories, "price": prices, "scope": scope}
@@ -0,0 +1,98 @@
+"""
+Background removal of upload files whose rows were deleted.
+
+Routes delete the rows first (the database cascades the rest), commit, then
+hand the files' storage keys to remove_upload_files().
+A daemon thread per process removes them, so deleting a salon with many
+photos never waits on the filesystem.
+
+If the thread dies with files still queued (process killed), those files
+stay on disk unreferenced; nothing reads them. At normal interpreter exit
+the queue is drained first. With FILE_REAPER_ENABLED=0 files are removed
+inline, as before.
+"""
+import atexit
+import os
+import queue
+import threading
+
+from flask import current_app
+
+from .storage import get_storage, normalize_key
+
+REAPER_QUEUE_SIZE = 10000
+
+
+def remove_files(storage, keys):
+    for key in keys:
+        try:
+            storage.delete(key)
+        except (OSError, ValueError) as e:
+            print(f"[reaper] failed to delete {key}: {e}", flush=True)
+
+
+class FileReaper:
+    def __init__(self, storage):
+        self.storage = storage
+        self._queue = queue.Queue(maxsize=REAPER_QUEUE_SIZE)
+        self._start_lock = threading.Lock()
+        self._pid = None
+        atexit.register(self.drain)
+
+    def submit(self, paths) -> bool:
+        """Queue paths for removal. False when the queue is full (caller removes inline)."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(list(paths))
+            return True
+        except queue.Full:
+            return False
+
+    def _ensure_started(self):
+        # one thread per process, re-created after fork
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name="stylio-file-reaper", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            paths = self._queue.get()
+            try:
+                remove_files(self.storage, paths)
+            finally:
+                self._queue.task_done()
+
+    def drain(self):
+        while True:
+            try:
+                paths = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            remove_files(self.storage, paths)
+            self._queue.task_done()
+
+    def join(self):
+        """Block until everything queued so far is removed (CLI / tests)."""
+        self._queue.join()
+
+
+def init_file_reaper(app):
+    if not app.config.get("FILE_REAPER_ENABLED"):
+        return
+    app.extensions["stylio_file_reaper"] = FileReaper(app.extensions["stylio_storage"])
+
+
+def remove_upload_files(paths):
+    """Call after the delete committed. Legacy paths ("uploads/...") are accepted."""
+    keys = [k for k in (normalize_key(p) for p in paths) if k]
+    if not keys:
+        return
+
+    reaper = current_app.extensions.get("stylio_file_reaper")
+    if reaper is not None and reaper.submit(keys):
+        return
+    remove_files(get_storage(), keys)
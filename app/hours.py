@@ -0,0 +1,148 @@
+"""
+Salon weekly hours and special days: form parsing + set-based writes.
+
+Both tables have a natural key (salon_id + weekday, salon_id + day), so a
+whole schedule for any number of salons is written with INSERT ... ON
+CONFLICT DO UPDATE, a few hundred rows per statement, instead of a SELECT
+and an INSERT/UPDATE per row. RETURNING gives the written rows back for the
+change log (Core statements bypass the flush hook).
+
+Dialects without ON CONFLICT fall back to the per-row ORM upsert, which the
+flush hook logs by itself.
+"""
+from datetime import datetime
+
+from .changes import record_rows
+from .models import SalonWorkingHours, SalonSpecialHours
+
+# ✅ 08:00–22:00 selectable, same list as the hours forms
+TIME_CHOICES = [f"{h:02d}:00" for h in range(8, 23)]
+ALLOWED_TIMES = set(TIME_CHOICES)
+
+DEFAULT_START = "09:00"
+DEFAULT_END = "19:00"
+
+MAX_SCHEDULE_DAYS = 60
+UPSERT_BATCH_ROWS = 500
+
+
+def check_hours(is_closed: bool, start: str, end: str, what: str = "working"):
+    """(is_closed, start, end) with times cleared on closed days; ValueError if invalid."""
+    if is_closed:
+        return True, None, None
+    if start not in ALLOWED_TIMES or end not in ALLOWED_TIMES:
+        raise ValueError(f"Please select valid {what} times.")
+    # basic order check (string compare works for HH:MM)
+    if start >= end:
+        raise ValueError("Start time must be before end time.")
+    return False, start, end
+
+
+def parse_weekly_form(form) -> list:
+    """closed_<wd> / start_<wd> / end_<wd> fields -> [(wd, is_closed, start, end)] for 0..6."""
+    rows = []
+    for wd in range(7):
+        closed, start, end = check_hours(
+            form.get(f"closed_{wd}") == "on",
+            (form.get(f"start_{wd}") or "").strip(),
+            (form.get(f"end_{wd}") or "").strip(),
+        )
+        rows.append((wd, closed, start, end))
+    return rows
+
+
+def parse_days(values) -> list:
+    """Dates from repeated fields and/or comma / whitespace separated text, sorted, unique."""
+    days = set()
+    for value in values:
+        for part in (value or "").replace(",", " ").split():
+            try:
+                days.add(datetime.strptime(part, "%Y-%m-%d").date())
+            except ValueError:
+                raise ValueError(f"Invalid date: {part}")
+    if len(days) > MAX_SCHEDULE_DAYS:
+        raise ValueError(f"At most {MAX_SCHEDULE_DAYS} dates at a time.")
+    return sorted(days)
+
+
+def _dialect_insert(session, model):
+    dialect = session.get_bind(mapper=model.__mapper__).dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert
+
+
+def _upsert(session, model, rows, key_cols):
+    """Insert-or-update rows on key_cols. Returns the written rows, or None on the ORM fallback."""
+    if not rows:
+        return []
+    insert = _dialect_insert(session, model)
+
+    if insert is None:
+        for values in rows:
+            obj = session.query(model).filter_by(**{k: values[k] for k in key_cols}).first()
+            if obj is None:
+                obj = model(**{k: values[k] for k in key_cols})
+                session.add(obj)
+            for k, v in values.items():
+                setattr(obj, k, v)
+        return None
+
+    table = model.__table__
+    written = []
+    for i in range(0, len(rows), UPSERT_BATCH_ROWS):
+        stmt = insert(table).values(rows[i:i + UPSERT_BATCH_ROWS])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_cols,
+            set_={c: stmt.excluded[c] for c in ("is_closed", "start_time", "end_time")},
+        ).returning(*table.c)
+        written += [dict(r._mapping) for r in session.execute(stmt)]
+    return written
+
+
+def apply_weekly_hours(session, salon_ids, rows) -> int:
+    """Same 7-day template on every salon in salon_ids, in the caller's transaction."""
+    values = [
+        {"salon_id": sid, "weekday": wd, "is_closed": closed, "start_time": start, "end_time": end}
+        for sid in salon_ids
+        for wd, closed, start, end in rows
+    ]
+    written = _upsert(session, SalonWorkingHours, values, ["salon_id", "weekday"])
+    if written is not None:
+        record_rows(session, "weekly_hours", written)
+    return len(values)
+
+
+def apply_special_days(session, salon_ids, days, is_closed, start, end) -> int:
+    """Same hours (or closure) on each day for every salon in salon_ids."""
+    values = [
+        {"salon_id": sid, "day": day, "is_closed": is_closed, "start_time": start, "end_time": end}
+        for sid in salon_ids
+        for day in days
+    ]
+    written = _upsert(session, SalonSpecialHours, values, ["salon_id", "day"])
+    if written is not None:
+        record_rows(session, "special_day", written)
+    return len(values)
+
+
+def weekly_hours_event(rows) -> dict:
+    return {
+        "type": "weekly_hours",
+        "weekly_hours": {
+            wd: {"is_closed": closed, "start": start or DEFAULT_START, "end": end or DEFAULT_END}
+            for wd, closed, start, end in rows
+        },
+    }
+
+
+def special_day_event(days, is_closed, start, end) -> dict:
+    return {
+        "type": "special_day",
+        "days": [d.strftime("%Y-%m-%d") for d in days],
+        "hours": {"is_closed": is_closed, "start": start or DEFAULT_START, "end": end or DEFAULT_END},
+    }
@@ -0,0 +1,323 @@
+"""
+Live availability updates for open booking pages (Server-Sent Events).
+
+Owner routes publish small events on the salon's channel after their write
+commits; every open /book/<id> page holds an EventSource on
+/salon/<id>/live and patches its booking data in place.
+
+Events (the "type" is also the SSE event name):
+  staff_day     {"staff_id", "day", "all_day", "times"}  -> replaces that staff/day
+  weekly_hours  {"weekly_hours": {wd: {is_closed, start, end}}}
+  special_day   {"day" | "days": [...], "hours": {is_closed, start, end} | null}
+  skills        {"skills": SkillMatrix payload}
+
+Brokers:
+  LocalBroker  in-process fan-out to the streams of this worker only
+  SpoolBroker  cross-worker stand-in for a real broker: publish writes one
+               small file per event into LIVE_SPOOL_DIR, a poller thread in
+               every process picks up new files and fans them out locally.
+               Files older than LIVE_RETENTION_SECONDS are pruned.
+
+Both keep a short per-channel history so a reconnecting EventSource
+(Last-Event-ID) gets what it missed; if that is gone it is told to resync.
+"""
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+
+CHANNEL_HISTORY = 200
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def salon_channel(salon_id: int) -> str:
+    return f"salon:{salon_id}"
+
+
+class Subscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # slow consumer: the stream tells the page to resync instead
+            self.overflowed = True
+
+    def get(self, timeout: float):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = {}      # channel -> set(Subscription)
+        self._history = {}   # channel -> deque((event_id, event))
+        self._seq = itertools.count()
+
+    def _next_id(self) -> str:
+        # sortable across processes: ns timestamp, pid, per-process sequence
+        return f"{time.time_ns():020d}-{os.getpid()}-{next(self._seq):06d}"
+
+    def publish(self, channel: str, event: dict) -> str:
+        event_id = self._next_id()
+        self._deliver(channel, event_id, event)
+        return event_id
+
+    def _remember(self, channel, event_id, event):
+        self._history.setdefault(channel, deque(maxlen=CHANNEL_HISTORY)).append((event_id, event))
+
+    def _deliver(self, channel, event_id, event):
+        with self._lock:
+            self._remember(channel, event_id, event)
+            subs = list(self._subs.get(channel, ()))
+        for sub in subs:
+            sub.deliver((event_id, event))
+
+    def subscribe(self, channel: str) -> Subscription:
+        sub = Subscription(self, channel)
+        with self._lock:
+            self._subs.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subs.get(sub.channel)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.channel]
+
+    def since(self, channel: str, last_event_id: str):
+        """
+        Events after last_event_id, or None if it's older than the history
+        we still hold (the client must resync).
+        """
+        if self._expired(last_event_id):
+            return None
+        with self._lock:
+            history = list(self._history.get(channel, ()))
+        if len(history) == CHANNEL_HISTORY and history[0][0] > last_event_id:
+            return None
+        return [(eid, ev) for eid, ev in history if eid > last_event_id]
+
+    def _expired(self, event_id: str) -> bool:
+        return False
+
+
+class SpoolBroker(LocalBroker):
+    def __init__(self, spool_dir: str, poll_interval: float = 0.25, retention: float = 120.0):
+        super().__init__()
+        self.spool_dir = spool_dir
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._start_lock = threading.Lock()
+        self._pid = None
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def publish(self, channel: str, event: dict) -> str:
+        event_id = self._next_id()
+        body = json.dumps({"channel": channel, "event": event}, separators=(",", ":"))
+        # write + rename so pollers never see a half-written file
+        tmp = os.path.join(self.spool_dir, f".{event_id}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(body)
+        os.replace(tmp, os.path.join(self.spool_dir, f"{event_id}.json"))
+        return event_id
+
+    def subscribe(self, channel: str) -> Subscription:
+        self._ensure_started()
+        return super().subscribe(channel)
+
+    def _ensure_started(self):
+        # one poller per process, re-created after fork
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # what is already spooled becomes history, so a page that reconnects
+            # to this worker still gets events another worker published
+            names = sorted(self._list())
+            with self._lock:
+                for name in names:
+                    data = self._read(name)
+                    if data:
+                        self._remember(data["channel"], name[:-len(".json")], data["event"])
+            thread = threading.Thread(target=self._run, args=(set(names),), name="stylio-live", daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+
+    def _list(self):
+        try:
+            with os.scandir(self.spool_dir) as it:
+                return [e.name for e in it if e.name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+
+    def _run(self, seen):
+        last_prune = 0.0
+        while True:
+            time.sleep(self.poll_interval)
+            names = set(self._list())
+            # a set, not a cursor: files from other processes can land out of order
+            for name in sorted(names - seen):
+                data = self._read(name)
+                if data:
+                    self._deliver(data["channel"], name[:-len(".json")], data["event"])
+            seen = names
+
+            now = time.time()
+            if now - last_prune >= self.retention / 4:
+                self._prune(now)
+                last_prune = now
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.spool_dir, name), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _expired(self, event_id: str) -> bool:
+        try:
+            published = int(event_id.split("-", 1)[0]) / 1e9
+        except ValueError:
+            return True
+        return published < time.time() - self.retention
+
+    def _prune(self, now):
+        cutoff_ns = int((now - self.retention) * 1e9)
+        for name in self._list():
+            try:
+                if int(name.split("-", 1)[0]) < cutoff_ns:
+                    os.remove(os.path.join(self.spool_dir, name))
+            except (ValueError, OSError):
+                continue
+
+
+class StreamLimiter:
+    """At most `max_streams` open streams per process."""
+
+    def __init__(self, max_streams: int):
+        self._sem = threading.BoundedSemaphore(max_streams)
+
+    def try_acquire(self) -> bool:
+        return self._sem.acquire(blocking=False)
+
+    def release(self):
+        self._sem.release()
+
+
+def init_live(app):
+    if not app.config.get("LIVE_UPDATES_ENABLED"):
+        return
+
+    if app.config.get("LIVE_BROKER", "spool") == "local":
+        broker = LocalBroker()
+    else:
+        broker = SpoolBroker(
+            app.config["LIVE_SPOOL_DIR"],
+            poll_interval=float(app.config.get("LIVE_POLL_INTERVAL_MS", 250)) / 1000.0,
+            retention=float(app.config.get("LIVE_RETENTION_SECONDS", 120)),
+        )
+
+    app.extensions["stylio_live"] = {
+        "broker": broker,
+        "limiter": StreamLimiter(int(app.config.get("LIVE_MAX_STREAMS", 2))),
+    }
+
+
+def live_enabled() -> bool:
+    return "stylio_live" in current_app.extensions
+
+
+def publish_salon(salon_id: int, event: dict):
+    """Publish after the write committed. No-op when live updates are off."""
+    live = current_app.extensions.get("stylio_live")
+    if live is None:
+        return None
+    try:
+        return live["broker"].publish(salon_channel(salon_id), event)
+    except OSError as e:
+        # a missed push only means a stale page; never fail the owner's write
+        print(f"[live] publish failed for salon {salon_id}: {e}", flush=True)
+        return None
+
+
+def _sse(event_id, event) -> str:
+    data = json.dumps(event, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event.get('type', 'message')}\ndata: {data}\n\n"
+
+
+def busy_stream():
+    """
+    Answer for a worker at LIVE_MAX_STREAMS: a 200 stream that only sets the
+    reconnect delay and ends. EventSource gives up for good on a non-200, but
+    after this it retries later, keeping its Last-Event-ID.
+    """
+    retry_ms = int(float(current_app.config.get("LIVE_BUSY_RETRY_SECONDS", 30)) * 1000)
+    return f"retry: {retry_ms}\nevent: busy\ndata: {{}}\n\n"
+
+
+def open_stream(salon_id: int, last_event_id: str = None):
+    """
+    Generator of SSE frames for one salon, or None when this process is at
+    LIVE_MAX_STREAMS. Doesn't need the request context once created.
+    """
+    live = current_app.extensions["stylio_live"]
+    cfg = current_app.config
+    keepalive = float(cfg.get("LIVE_KEEPALIVE_SECONDS", 15))
+    max_seconds = float(cfg.get("LIVE_MAX_STREAM_SECONDS", 300))
+
+    limiter = live["limiter"]
+    if not limiter.try_acquire():
+        return None
+
+    broker = live["broker"]
+    channel = salon_channel(salon_id)
+    sub = broker.subscribe(channel)
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            if last_event_id:
+                missed = broker.since(channel, last_event_id)
+                if missed is None:
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                for event_id, event in missed:
+                    yield _sse(event_id, event)
+
+            # streams end on their own so a worker thread is never held forever;
+            # EventSource reconnects with Last-Event-ID and misses nothing
+            deadline = time.monotonic() + max_seconds
+            while time.monotonic() < deadline:
+                item = sub.get(timeout=min(keepalive, max(0.0, deadline - time.monotonic())))
+                if sub.overflowed:
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                if item is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(*item)
+        finally:
+            sub.close()
+            limiter.release()
+
+    return generate()
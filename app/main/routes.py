@@ -1,13 +1,37 @@
-from flask import Blueprint, render_template, request, jsonify
+import hmac
+import mimetypes
+import os
+
+from flask import (
+    Blueprint, Response, render_template, request, jsonify, url_for, abort,
+    current_app, send_file, stream_with_context
+)
 from flask_login import login_required, current_user
 
 from datetime import date, datetime
 
+from sqlalchemy.orm import selectinload
+
 from ..extensions import db
+from ..capabilities import SkillMatrix
+from ..live import live_enabled, open_stream, busy_stream
+from ..scheduler import plan_visit
+from ..changes import iter_changes, head_cursor, oldest_cursor, MAX_FEED_LIMIT
+from ..availability import (
+    earliest_slots, check_slots,
+    MAX_SEARCH_DAYS, MAX_SEARCH_RESULTS, MAX_CHECK_CANDIDATES
+)
+from ..write_queue import run_write
+from ..storage import get_storage
+from ..facets import (
+    parse_filter_args, is_filtered, service_category, matching_salon_ids,
+    matching_services, facet_counts, MAX_FILTER_RESULTS
+)
+from ..reviews import record_review, parse_review_args, list_reviews, rating_summary
 
 from ..models import (
     Salon, Service, Staff, StaffService,
-    SalonPhoto, StaffAvailability,
+    SalonPhoto, StaffAvailability, Review,
     SalonWorkingHours, SalonSpecialHours
 )
 
@@ -17,7 +41,23 @@ main_bp = Blueprint("main", __name__)
 
 @main_bp.route("/")
 def home_page():
-    salons = Salon.query.all()
+    # ✅ optional filter: ?service=manicure&price_max=50&duration_max=60 (see app/facets.py)
+    filter_error = None
+    try:
+        salon_filter = parse_filter_args(request.args)
+    except ValueError as e:
+        filter_error = str(e)
+        salon_filter = parse_filter_args({})
+
+    if is_filtered(salon_filter):
+        ids = matching_salon_ids(db.session, salon_filter)
+        salons = (
+            Salon.query.options(selectinload(Salon.rating_stats))
+            .filter(Salon.id.in_(ids)).order_by(Salon.id).all()
+        ) if ids else []
+    else:
+        salons = Salon.query.options(selectinload(Salon.rating_stats)).all()
+    facets = facet_counts(db.session, service_category(salon_filter))
 
     # Build compact hours lines per salon for cards
     salon_hours_lines = {}
@@ -117,14 +157,61 @@ def home_page():
     return render_template(
         "index/index.html",
         salons=salons,
+        salon_filter=salon_filter,
+        filter_error=filter_error,
+        facets=facets,
         salon_hours_lines=salon_hours_lines,
         salon_special_lines=salon_special_lines
     )
 
 
+@main_bp.route("/salons/filter")
+def filter_salons():
+    """
+    GET /salons/filter?service=manicure&price_max=50&duration_max=60[&after=<salon id>&limit=20]
+    Salons with at least one service matching every condition (ranges are
+    inclusive), paged by salon id, plus facet counts read from facet_count.
+    """
+    try:
+        salon_filter = parse_filter_args(request.args)
+    except ValueError as e:
+        return jsonify({"ok": False, "message": str(e)}), 400
+
+    limit = min(max(request.args.get("limit", 20, type=int) or 20, 1), MAX_FILTER_RESULTS)
+    after = max(request.args.get("after", 0, type=int) or 0, 0)
+
+    ids = matching_salon_ids(db.session, salon_filter, after=after, limit=limit + 1)
+    more = len(ids) > limit
+    ids = ids[:limit]
+
+    salons = Salon.query.filter(Salon.id.in_(ids)).order_by(Salon.id).all() if ids else []
+    services = matching_services(db.session, salon_filter, ids)
+
+    return jsonify({
+        "ok": True,
+        "salons": [
+            {
+                "id": salon.id,
+                "name": salon.name,
+                "location": salon.location,
+                "url": url_for("main.book_a_visit", id=salon.id),
+                "services": services.get(salon.id, []),
+            }
+            for salon in salons
+        ],
+        "next_after": ids[-1] if more else None,
+        "facets": facet_counts(db.session, service_category(salon_filter)),
+    }), 200
+
+
 @main_bp.route("/book/<int:id>", methods=["GET", "POST"])
 def book_a_visit(id):
-    salon = Salon.query.get_or_404(id)
+    salon = (
+        Salon.query
+        .options(selectinload(Salon.services), selectinload(Salon.staff), selectinload(Salon.photos))
+        .filter_by(id=id)
+        .first_or_404()
+    )
 
     if request.method == "POST":
         data = request.form.to_dict()
@@ -132,10 +219,12 @@ def book_a_visit(id):
         print("BOOKING RECEIVED:", data, flush=True)
         return jsonify({"ok": True, "message": "Booking received"}), 200
 
-    # staff.id -> [service_id,...]
-    staff_service_ids = {}
-    for st in salon.staff:
-        staff_service_ids[st.id] = [link.service_id for link in st.service_links]
+    # ✅ who can do what: one query, shipped as per-staff bitsets
+    skills = SkillMatrix.for_salon(
+        salon.id,
+        staff_ids=[st.id for st in salon.staff],
+        service_ids=[sv.id for sv in salon.services],
+    )
 
     # ✅ weekly_hours dict: wd -> {is_closed,start,end}
     weekly_rows = SalonWorkingHours.query.filter_by(salon_id=salon.id).all()
@@ -278,7 +367,9 @@ def book_a_visit(id):
     return render_template(
         "book_a_visit/book_a_visit.html",
         salon=salon,
-        staff_service_ids=staff_service_ids,
+        skills=skills.to_payload(),
+        live_url=url_for("main.salon_live", salon_id=salon.id) if live_enabled() else None,
+        check_url=url_for("main.check_availability"),
 
         # ✅ data for your booking JS
         weekly_hours=weekly_hours,
@@ -292,7 +383,7 @@ def book_a_visit(id):
 
 
 @main_bp.route("/salon/<int:salon_id>/review", methods=["POST"])
-
+@login_required
 def add_review(salon_id):
     salon = Salon.query.get_or_404(salon_id)
 
@@ -302,17 +393,209 @@ def add_review(salon_id):
     if rating < 1 or rating > 5:
         return jsonify({"ok": False, "message": "Rating must be 1 to 5"}), 400
 
-    r = Review(
-        salon_id=salon.id,
-        user_id=current_user.id,
-        rating=rating,
-        comment=comment
-    )
-    db.session.add(r)
-    db.session.commit()
+    salon_id = salon.id
+    user_id = current_user.id
+
+    def write(session):
+        session.add(Review(
+            salon_id=salon_id,
+            user_id=user_id,
+            rating=rating,
+            comment=comment,
+            created_at=datetime.utcnow()
+        ))
+        # ✅ histogram row bumped in the same transaction (app/reviews.py)
+        record_review(session, salon_id, rating)
+
+    run_write(write)
+    summary = rating_summary(db.session, salon_id)
 
     return jsonify({
         "ok": True,
-        "average_review": salon.average_review,
-        "review_count": salon.review_count
+        "average_review": summary["average"],
+        "review_count": summary["review_count"]
     }), 200
+
+
+@main_bp.route("/salon/<int:salon_id>/reviews")
+def salon_reviews(salon_id):
+    """
+    GET /salon/12/reviews?rating=5&limit=20&before=<next_cursor>
+    Newest first, keyset-paginated; histogram from the stored aggregate.
+    """
+    if db.session.get(Salon, salon_id) is None:
+        abort(404)
+    try:
+        args = parse_review_args(request.args)
+    except ValueError as e:
+        return jsonify({"ok": False, "message": str(e)}), 400
+
+    reviews, next_cursor = list_reviews(
+        db.session, salon_id, rating=args["rating"], before=args["before"], limit=args["limit"]
+    )
+    return jsonify({
+        "ok": True,
+        "reviews": reviews,
+        "next_cursor": next_cursor,
+        **rating_summary(db.session, salon_id),
+    }), 200
+
+
+# =========================
+# SEARCH
+# =========================
+@main_bp.route("/search/earliest")
+def search_earliest():
+    """
+    GET /search/earliest?service=haircut&from=2026-03-01&days=3&location=tbilisi&limit=10
+    Earliest free slot per salon for a service, across all salons.
+    """
+    service_query = (request.args.get("service") or "").strip()
+    if not service_query:
+        return jsonify({"ok": False, "message": "service is required"}), 400
+
+    from_raw = (request.args.get("from") or "").strip()
+    try:
+        start_day = datetime.strptime(from_raw, "%Y-%m-%d").date() if from_raw else date.today()
+    except ValueError:
+        return jsonify({"ok": False, "message": "from must be YYYY-MM-DD"}), 400
+
+    days = min(max(request.args.get("days", 1, type=int) or 1, 1), MAX_SEARCH_DAYS)
+    limit = min(max(request.args.get("limit", 10, type=int) or 10, 1), MAX_SEARCH_RESULTS)
+    location = (request.args.get("location") or "").strip() or None
+
+    results = earliest_slots(service_query, start_day, days=days, location=location, limit=limit)
+    for r in results:
+        r["book_url"] = url_for("main.book_a_visit", id=r["salon_id"])
+
+    return jsonify({"ok": True, "from": start_day.isoformat(), "days": days, "results": results}), 200
+
+
+@main_bp.route("/availability/check", methods=["POST"])
+def check_availability():
+    """
+    POST {"candidates": [{"staff_id": 3, "date": "2026-03-01", "time": "10:00", "service_id": 7}, ...]}
+    -> {"ok": true, "results": [{"available": bool, "reason": "..."}, ...]} in the same order.
+    """
+    payload = request.get_json(silent=True) or {}
+    candidates = payload.get("candidates")
+    if not isinstance(candidates, list):
+        return jsonify({"ok": False, "message": "candidates must be a list"}), 400
+    if len(candidates) > MAX_CHECK_CANDIDATES:
+        return jsonify({"ok": False, "message": f"at most {MAX_CHECK_CANDIDATES} candidates per request"}), 400
+
+    return jsonify({"ok": True, "results": check_slots(candidates)}), 200
+
+
+# =========================
+# LIVE UPDATES (SSE)
+# =========================
+@main_bp.route("/salon/<int:salon_id>/live")
+def salon_live(salon_id):
+    if not live_enabled():
+        abort(404)
+    Salon.query.get_or_404(salon_id)
+
+    stream = open_stream(salon_id, request.headers.get("Last-Event-ID"))
+    if stream is None:
+        # too many open streams in this worker: 200 + retry hint, the client comes back later
+        stream = busy_stream()
+
+    return Response(stream, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+@main_bp.route("/book/<int:id>/plan")
+def plan_multi_service_visit(id):
+    """
+    GET /book/<id>/plan?services=3,7&date=2026-03-01&limit=5&max_gap=60
+    Back-to-back plans for several services in one visit, least waiting first.
+    """
+    salon = Salon.query.get_or_404(id)
+
+    try:
+        service_ids = [int(x) for x in (request.args.get("services") or "").split(",") if x.strip()]
+    except ValueError:
+        return jsonify({"ok": False, "message": "services must be a comma separated list of ids"}), 400
+
+    date_raw = (request.args.get("date") or "").strip()
+    try:
+        day = datetime.strptime(date_raw, "%Y-%m-%d").date() if date_raw else date.today()
+    except ValueError:
+        return jsonify({"ok": False, "message": "date must be YYYY-MM-DD"}), 400
+
+    limit = min(max(request.args.get("limit", 5, type=int) or 5, 1), 20)
+    max_gap = min(max(request.args.get("max_gap", 60, type=int) or 0, 0), 240)
+
+    try:
+        plan = plan_visit(salon.id, day, service_ids, limit=limit, max_gap=max_gap)
+    except ValueError as e:
+        return jsonify({"ok": False, "message": str(e)}), 400
+
+    return jsonify({"ok": True, "date": day.isoformat(), **plan}), 200
+
+
+# =========================
+# CHANGE FEED
+# =========================
+def _change_feed_check():
+    """404 while no CHANGES_TOKEN is configured (the feed carries internal ids), 401 on a wrong token."""
+    token = current_app.config.get("CHANGES_TOKEN") or ""
+    if not token:
+        abort(404)
+    sent = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(sent, f"Bearer {token}"):
+        abort(401)
+
+
+@main_bp.route("/changes")
+def change_feed():
+    """
+    GET /changes?since=<cursor>&limit=1000[&salon_id=N]
+    NDJSON in cursor order; the last line is {"next_cursor", "more"}.
+    410 when `since` is older than the retained log: resync from /changes/head.
+    """
+    _change_feed_check()
+
+    since = max(request.args.get("since", 0, type=int) or 0, 0)
+    limit = min(max(request.args.get("limit", 1000, type=int) or 1000, 1), MAX_FEED_LIMIT)
+    salon_id = request.args.get("salon_id", type=int)
+
+    oldest = oldest_cursor()
+    if oldest and since < oldest - 1:
+        return jsonify({"ok": False, "message": "cursor too old, resync", "head": head_cursor()}), 410
+
+    lines = iter_changes(since, limit, salon_id=salon_id,
+                         settle_seconds=current_app.config.get("CHANGES_SETTLE_SECONDS", 0.0))
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+
+@main_bp.route("/changes/head")
+def change_feed_head():
+    """Current cursor: take it, download the catalogue, then follow /changes?since=<it>."""
+    _change_feed_check()
+    return jsonify({"ok": True, "cursor": head_cursor()}), 200
+
+
+# =========================
+# MEDIA (uploads outside static/)
+# =========================
+MEDIA_MAX_AGE = 365 * 24 * 3600   # keys are never reused, so files never change
+
+
+@main_bp.route("/media/<path:key>")
+def media(key):
+    storage = get_storage()
+    try:
+        local_path = storage.local_path(key)
+        if local_path is not None:
+            if not os.path.isfile(local_path):
+                abort(404)
+            return send_file(local_path, max_age=MEDIA_MAX_AGE)
+        f = storage.open(key)
+    except (ValueError, FileNotFoundError):
+        abort(404)
+    mimetype = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    return send_file(f, mimetype=mimetype, max_age=MEDIA_MAX_AGE)
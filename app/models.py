@@ -1,11 +1,11 @@
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.sql import func
 from sqlalchemy.orm import validates
 
 from sqlalchemy import UniqueConstraint
 
 from .extensions import db
+from .passwords import hash_password, verify_password
 
 
 class User(db.Model, UserMixin):
@@ -20,10 +20,10 @@ class User(db.Model, UserMixin):
     salons = db.relationship("Salon", backref="owner", lazy=True, cascade="all, delete-orphan")
 
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
 
 class Salon(db.Model):
@@ -35,15 +35,17 @@ class Salon(db.Model):
     location = db.Column(db.String(200), nullable=True)
     map_link = db.Column(db.String(500), nullable=True)
 
-    services = db.relationship("Service", backref="salon", cascade="all, delete-orphan", lazy=True)
-    staff = db.relationship("Staff", backref="salon", cascade="all, delete-orphan", lazy=True)
-    reviews = db.relationship("Review", backref="salon", cascade="all, delete-orphan", lazy=True)
+    services = db.relationship("Service", backref="salon", cascade="all, delete-orphan", passive_deletes=True, lazy=True)
+    staff = db.relationship("Staff", backref="salon", cascade="all, delete-orphan", passive_deletes=True, lazy=True)
+    reviews = db.relationship("Review", backref="salon", cascade="all, delete-orphan", passive_deletes=True, lazy=True)
+    rating_stats = db.relationship("SalonRatingStats", uselist=False, viewonly=True, lazy=True)
 
     # ✅ NEW: salon photos (up to 5 enforced in routes)
     photos = db.relationship(
         "SalonPhoto",
         backref="salon",
         cascade="all, delete-orphan",
+        passive_deletes=True,
         lazy=True,
         order_by="SalonPhoto.is_main.desc(), SalonPhoto.id.asc()"
     )
@@ -51,25 +53,25 @@ class Salon(db.Model):
     working_hours = db.relationship(
         "SalonWorkingHours",
         cascade="all, delete-orphan",
+        passive_deletes=True,
         lazy=True
     )
 
     special_hours = db.relationship(
         "SalonSpecialHours",
         cascade="all, delete-orphan",
+        passive_deletes=True,
         lazy=True
     )
 
+    # ✅ from the stored aggregate (app/reviews.py), not by loading every review
     @property
     def review_count(self):
-        return len(self.reviews) if self.reviews else 0
+        return self.rating_stats.review_count if self.rating_stats else 0
 
     @property
     def average_review(self):
-        if not self.reviews:
-            return 0
-        total = sum(r.rating for r in self.reviews)
-        return round(total / len(self.reviews), 1)
+        return self.rating_stats.average if self.rating_stats else 0
 
     @property
     def main_photo(self):
@@ -85,7 +87,7 @@ class SalonWorkingHours(db.Model):
     __tablename__ = "salon_working_hours"
 
     id = db.Column(db.Integer, primary_key=True)
-    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id"), nullable=False)
+    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id", ondelete="CASCADE"), nullable=False)
 
     # 0=Mon ... 6=Sun
     weekday = db.Column(db.Integer, nullable=False)
@@ -105,7 +107,7 @@ class SalonSpecialHours(db.Model):
     __tablename__ = "salon_special_hours"
 
     id = db.Column(db.Integer, primary_key=True)
-    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id"), nullable=False)
+    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id", ondelete="CASCADE"), nullable=False)
 
     day = db.Column(db.Date, nullable=False)
 
@@ -120,11 +122,17 @@ class SalonSpecialHours(db.Model):
 
 class SalonPhoto(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id"), nullable=False)
+    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id", ondelete="CASCADE"), nullable=False)
+
+    # storage key (see app/storage.py)
+    # e.g. "salons/3f/a2/3fa2....webp"
+    file_path = db.Column(db.String(500), nullable=False, index=True)
 
-    # stored relative to: static/uploads/
-    # e.g. "salons/123/abcd.webp"
-    file_path = db.Column(db.String(500), nullable=False)
+    # computed once at upload (utils_uploads.image_meta): reserves layout and
+    # shows a blurred inline preview while the real image loads
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    lqip = db.Column(db.Text, nullable=True)  # "data:image/webp;base64,..."
 
     is_main = db.Column(db.Boolean, nullable=False, default=False)
     created_at = db.Column(db.DateTime, server_default=func.now())
@@ -139,40 +147,132 @@ class SalonPhoto(db.Model):
 
 class Review(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id"), nullable=False)
+    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id", ondelete="CASCADE"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
 
     rating = db.Column(db.Integer, nullable=False)  # 1..5
     comment = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, server_default=func.now())
 
+    # review listing (app/reviews.py): newest first, keyset on (created_at, id)
+    __table_args__ = (
+        db.Index("ix_review_salon_created", "salon_id", "created_at", "id"),
+        db.Index("ix_review_salon_rating_created", "salon_id", "rating", "created_at", "id"),
+    )
+
+
+class SalonRatingStats(db.Model):
+    """Per-salon rating histogram; maintained by app/reviews.py next to every review write."""
+    __tablename__ = "salon_rating_stats"
+
+    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id", ondelete="CASCADE"), primary_key=True)
+    count_1 = db.Column(db.Integer, nullable=False, default=0)
+    count_2 = db.Column(db.Integer, nullable=False, default=0)
+    count_3 = db.Column(db.Integer, nullable=False, default=0)
+    count_4 = db.Column(db.Integer, nullable=False, default=0)
+    count_5 = db.Column(db.Integer, nullable=False, default=0)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def average(self):
+        if not self.review_count:
+            return 0
+        return round(self.rating_sum / self.review_count, 1)
+
 
 class Service(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id"), nullable=False)
+    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id", ondelete="CASCADE"), nullable=False, index=True)
 
     name = db.Column(db.String(140), nullable=False)
     duration = db.Column(db.Integer, nullable=False, default=60)
     price = db.Column(db.Integer, nullable=False, default=0)
 
-    staff_links = db.relationship("StaffService", backref="service", cascade="all, delete-orphan", lazy=True)
+    # ✅ facet category from the name (facets.category_for), set wherever services are written
+    category = db.Column(db.String(40), nullable=False, default="other", server_default="other")
+
+    # salon filter (app/facets.py): both cover the whole match, no table lookups
+    __table_args__ = (
+        db.Index("ix_service_category_price", "category", "price", "duration", "salon_id"),
+        db.Index("ix_service_price_duration", "price", "duration", "salon_id"),
+    )
+
+    staff_links = db.relationship("StaffService", backref="service", cascade="all, delete-orphan", passive_deletes=True, lazy=True)
+
+
+class SalonFacet(db.Model):
+    """What a salon offers, per (category, price bucket); maintained by app/facets.py."""
+    __tablename__ = "salon_facet"
+
+    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id", ondelete="CASCADE"), primary_key=True)
+    category = db.Column(db.String(40), primary_key=True)
+    price_bucket = db.Column(db.String(16), primary_key=True)
+    service_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class FacetCount(db.Model):
+    """Salons per facet value: facet "category" / "price", scope "*" or a category."""
+    __tablename__ = "facet_count"
+
+    facet = db.Column(db.String(16), primary_key=True)
+    value = db.Column(db.String(40), primary_key=True)
+    scope = db.Column(db.String(40), primary_key=True)
+    salon_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SalonDailyStats(db.Model):
+    """Reviews per salon and day; rollup maintained by app/analytics.py."""
+    __tablename__ = "salon_daily_stats"
+
+    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id", ondelete="CASCADE"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    week = db.Column(db.Date, nullable=False)   # Monday of `day`, for GROUP BY week
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+
+
+class StaffDailyStats(db.Model):
+    """Blocked hours (within opening hours) per staff member and day; see app/analytics.py."""
+    __tablename__ = "staff_daily_stats"
+    __table_args__ = (
+        db.Index("ix_staff_daily_stats_salon_day", "salon_id", "day"),
+    )
+
+    staff_id = db.Column(db.Integer, db.ForeignKey("staff.id", ondelete="CASCADE"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id", ondelete="CASCADE"), nullable=False)
+    week = db.Column(db.Date, nullable=False)
+    blocked_hours = db.Column(db.Integer, nullable=False, default=0)
+    all_day = db.Column(db.Boolean, nullable=False, default=False)
+
+
+class RollupState(db.Model):
+    """How far each rollup source has been consumed: last review id / change_log cursor."""
+    __tablename__ = "rollup_state"
+
+    name = db.Column(db.String(40), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
 
 
 class Staff(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id"), nullable=False)
+    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id", ondelete="CASCADE"), nullable=False)
 
     name = db.Column(db.String(140), nullable=False)
     profession = db.Column(db.String(140), nullable=True)
 
     # ✅ NEW: uploaded photo path (recommended)
-    # relative to static/uploads/, e.g. "staff/55/photo.webp"
-    photo_path = db.Column(db.String(500), nullable=True)
+    # storage key (see app/storage.py), e.g. "staff/9c/01/9c01....webp"
+    photo_path = db.Column(db.String(500), nullable=True, index=True)
+    photo_width = db.Column(db.Integer, nullable=True)
+    photo_height = db.Column(db.Integer, nullable=True)
+    photo_lqip = db.Column(db.Text, nullable=True)
 
     # (optional) keep old field if you used it for external URLs
     image = db.Column(db.String(400), nullable=True)
 
-    service_links = db.relationship("StaffService", backref="staff", cascade="all, delete-orphan", lazy=True)
+    service_links = db.relationship("StaffService", backref="staff", cascade="all, delete-orphan", passive_deletes=True, lazy=True)
 
     @property
     def display_image(self):
@@ -181,13 +281,13 @@ class Staff(db.Model):
 
 
 class StaffService(db.Model):
-    staff_id = db.Column(db.Integer, db.ForeignKey("staff.id"), primary_key=True)
-    service_id = db.Column(db.Integer, db.ForeignKey("service.id"), primary_key=True)
+    staff_id = db.Column(db.Integer, db.ForeignKey("staff.id", ondelete="CASCADE"), primary_key=True)
+    service_id = db.Column(db.Integer, db.ForeignKey("service.id", ondelete="CASCADE"), primary_key=True)
 
 class StaffAvailability(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
-    staff_id = db.Column(db.Integer, db.ForeignKey("staff.id"), nullable=False, index=True)
+    staff_id = db.Column(db.Integer, db.ForeignKey("staff.id", ondelete="CASCADE"), nullable=False, index=True)
 
     # required day
     day = db.Column(db.Date, nullable=False, index=True)
@@ -197,8 +297,27 @@ class StaffAvailability(db.Model):
 
     created_at = db.Column(db.DateTime, server_default=func.now())
 
-    staff = db.relationship("Staff", backref=db.backref("availability", cascade="all, delete-orphan", lazy=True))
+    staff = db.relationship("Staff", backref=db.backref("availability", cascade="all, delete-orphan", passive_deletes=True, lazy=True))
 
     @property
     def is_all_day(self):
         return self.time is None or str(self.time).strip() == ""
+
+
+class ChangeLog(db.Model):
+    """
+    Append-only change feed (see app/changes.py). `id` is the consumer cursor;
+    AUTOINCREMENT so ids are never reused, even after pruning.
+    """
+    __tablename__ = "change_log"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    entity = db.Column(db.String(40), nullable=False)      # "salon", "service", "staff_availability", ...
+    entity_id = db.Column(db.String(64), nullable=False)   # pk, or "staff_id:day" for aggregates
+    salon_id = db.Column(db.Integer, nullable=True, index=True)
+    op = db.Column(db.String(10), nullable=False)           # "upsert" / "delete"
+    payload = db.Column(db.Text, nullable=True)             # JSON of the row (null for deletes)
+
+    created_at = db.Column(db.DateTime, server_default=func.now())
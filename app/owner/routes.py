@@ -1,15 +1,35 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, flash, abort, current_app,
+    Response, jsonify, stream_with_context
+)
 from flask_login import login_required, current_user
 
 from ..extensions import db
+from ..write_queue import run_write
+from ..live import publish_salon
+from ..capabilities import SkillMatrix
+from ..bulk import MAP_LINK_PREFIXES, import_salons, iter_export, open_text
+from ..hours import (
+    TIME_CHOICES, check_hours, parse_weekly_form, parse_days,
+    apply_weekly_hours, apply_special_days, weekly_hours_event, special_day_event
+)
+from ..changes import record_staff_day, record_staff_skills
+from ..facets import category_for, refresh_salon_facets
+from ..analytics import DEFAULT_WINDOW_DAYS, parse_window, owner_dashboard
 from ..models import (
     Salon, Service, Staff, StaffService,
     SalonPhoto, StaffAvailability,
     SalonWorkingHours, SalonSpecialHours
 )
 
-from ..utils_uploads import allowed_file, save_image, safe_delete_file
+from ..utils_uploads import allowed_file, save_image
+from ..file_reaper import remove_upload_files
+from ..chunked_uploads import (
+    ChunkOffsetError, start_upload, load_upload, upload_status,
+    append_chunk, claim_upload, discard_upload
+)
 from datetime import datetime, date
+from sqlalchemy.orm import selectinload
 
 owner_bp = Blueprint("owner", __name__, url_prefix="/owner")
 
@@ -22,11 +42,37 @@ def owner_required():
 
 
 def owner_salon_or_404(salon_id: int) -> Salon:
-    salon = Salon.query.get_or_404(salon_id)
+    salon = db.session.get(Salon, salon_id)
+    if salon is None:
+        abort(404)
     if salon.owner_user_id != current_user.id:
         abort(403)
     return salon
 
+
+def owner_salon_item_or_404(salon_id: int, model, item_id: int):
+    """
+    Salon + one of its rows (Staff / Service / SalonPhoto) in a single query.
+    404 if either is missing, 403 if the salon isn't yours or the row belongs
+    to another salon.
+    """
+    row = (
+        db.session.query(Salon, model)
+        .outerjoin(model, model.id == item_id)
+        .filter(Salon.id == salon_id)
+        .first()
+    )
+    if row is None:
+        abort(404)
+    salon, item = row
+    if salon.owner_user_id != current_user.id:
+        abort(403)
+    if item is None:
+        abort(404)
+    if item.salon_id != salon.id:
+        abort(403)
+    return salon, item
+
 def get_salon_hours_for_date(salon_id: int, day):
     """
     Returns dict: {"is_closed": bool, "start": "HH:MM"|None, "end": "HH:MM"|None}
@@ -62,7 +108,7 @@ def get_salon_hours_for_date(salon_id: int, day):
 @login_required
 def manage_businesses():
     owner_required()
-    salons = Salon.query.filter_by(owner_user_id=current_user.id).all()
+    salons = Salon.query.options(selectinload(Salon.rating_stats)).filter_by(owner_user_id=current_user.id).all()
 
     salon_hours_lines = {}
     salon_special_lines = {}
@@ -178,12 +224,7 @@ def create_salon():
 
         # ✅ Optional: allowlist Google Maps links
         if map_link:
-            allowed_prefixes = (
-                "https://maps.app.goo.gl/",
-                "https://www.google.com/maps",
-                "https://goo.gl/maps",
-            )
-            if not map_link.startswith(allowed_prefixes):
+            if not map_link.startswith(MAP_LINK_PREFIXES):
                 flash("Please paste a valid Google Maps link.", "danger")
                 return redirect(url_for("owner.create_salon"))
 
@@ -203,6 +244,114 @@ def create_salon():
     return render_template("manage_businesses/salon_form.html", mode="create", salon=None)
 
 
+# =========================
+# BULK IMPORT / EXPORT (chain onboarding)
+# =========================
+@owner_bp.route("/manage-businesses/import", methods=["POST"])
+@login_required
+def import_salons_upload():
+    owner_required()
+
+    file = request.files.get("file")
+    fmt = (request.form.get("format") or "").strip().lower()
+    if not file or not file.filename:
+        flash("Choose a JSON Lines or CSV file to import.", "danger")
+        return redirect(url_for("owner.manage_businesses"))
+    if not fmt:
+        fmt = "csv" if file.filename.lower().endswith(".csv") else "jsonl"
+    if fmt not in ("jsonl", "csv"):
+        flash("Import format must be jsonl or csv.", "danger")
+        return redirect(url_for("owner.manage_businesses"))
+
+    # the upload is read line by line; werkzeug spools big files to disk
+    result = import_salons(open_text(file.stream), fmt, current_user.id)
+
+    flash(
+        f"Imported {result['salons']} salons ({result['services']} services, "
+        f"{result['staff']} staff).",
+        "success" if result["salons"] else "warning"
+    )
+    if result["skipped"]:
+        first = result["errors"][0]
+        flash(
+            f"Skipped {result['skipped']} invalid records (line {first['line']}: {first['error']}).",
+            "danger"
+        )
+    return redirect(url_for("owner.manage_businesses"))
+
+
+@owner_bp.route("/manage-businesses/export")
+@login_required
+def export_salons():
+    owner_required()
+
+    fmt = (request.args.get("format") or "jsonl").strip().lower()
+    if fmt not in ("jsonl", "csv"):
+        abort(400)
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(
+        stream_with_context(iter_export(fmt, owner_user_id=current_user.id)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=salons.{fmt}"},
+    )
+
+
+# =========================
+# ANALYTICS
+# =========================
+def owner_analytics():
+    """
+    (dashboard dict, None) or (None, error message) for ?days=N[&salon_id=X].
+    Read-only: the rollups are refreshed in the background (see app/analytics.py).
+    """
+    try:
+        start, end = parse_window(request.args)
+    except ValueError as e:
+        return None, str(e)
+
+    query = db.session.query(Salon.id, Salon.name).filter(Salon.owner_user_id == current_user.id)
+    salon_id = request.args.get("salon_id", type=int)
+    if salon_id is not None:
+        owner_salon_or_404(salon_id)
+        query = query.filter(Salon.id == salon_id)
+    salons = [tuple(row) for row in query.order_by(Salon.name).all()]
+    return owner_dashboard(db.session, salons, start, end), None
+
+
+@owner_bp.route("/manage-businesses/analytics")
+@login_required
+def analytics():
+    owner_required()
+    data, error = owner_analytics()
+    if error:
+        flash(error, "danger")
+        return redirect(url_for("owner.analytics"))
+    salons = (
+        db.session.query(Salon.id, Salon.name)
+        .filter(Salon.owner_user_id == current_user.id)
+        .order_by(Salon.name)
+        .all()
+    )
+    return render_template(
+        "manage_businesses/analytics.html",
+        data=data,
+        salons=salons,
+        days=request.args.get("days", DEFAULT_WINDOW_DAYS, type=int),
+        salon_id=request.args.get("salon_id", type=int),
+    )
+
+
+@owner_bp.route("/manage-businesses/analytics.json")
+@login_required
+def analytics_json():
+    owner_required()
+    data, error = owner_analytics()
+    if error:
+        return jsonify({"ok": False, "message": error}), 400
+    return jsonify({"ok": True, **data}), 200
+
+
 @owner_bp.route("/manage-businesses/salon/<int:salon_id>/edit", methods=["GET", "POST"])
 @login_required
 def edit_salon(salon_id):
@@ -295,6 +444,33 @@ def edit_salon(salon_id):
     )
 
 
+@owner_bp.route("/manage-businesses/salon/<int:salon_id>/delete", methods=["POST"])
+@login_required
+def delete_salon(salon_id):
+    owner_required()
+    owner_salon_or_404(salon_id)
+
+    # only the paths: photo rows themselves go with the salon's ON DELETE CASCADE
+    paths = db.session.scalars(db.select(SalonPhoto.file_path).where(SalonPhoto.salon_id == salon_id)).all()
+    paths += db.session.scalars(
+        db.select(Staff.photo_path).where(Staff.salon_id == salon_id, Staff.photo_path.isnot(None))
+    ).all()
+
+    def write(session):
+        # ✅ relationships are passive_deletes: one DELETE, the database removes
+        # services, staff, skills, availability, reviews, photos and hours
+        salon = session.get(Salon, salon_id)
+        if salon is not None:
+            refresh_salon_facets(session, [salon_id], removing=True)
+            session.delete(salon)
+
+    run_write(write)
+    remove_upload_files(paths)
+
+    flash("Salon deleted.", "success")
+    return redirect(url_for("owner.manage_businesses"))
+
+
 # =========================
 # SALON WORKING HOURS (WEEKLY)
 # =========================
@@ -304,42 +480,17 @@ def save_salon_weekly_hours(salon_id):
     owner_required()
     salon = owner_salon_or_404(salon_id)
 
-    # ✅ 08:00–22:00 selectable (you can expand further if you want)
-    allowed_times = {
-        "08:00","09:00","10:00","11:00","12:00","13:00","14:00","15:00",
-        "16:00","17:00","18:00","19:00","20:00","21:00","22:00"
-    }
-
-    for wd in range(7):
-        closed = request.form.get(f"closed_{wd}") == "on"
-        start = (request.form.get(f"start_{wd}") or "").strip()
-        end = (request.form.get(f"end_{wd}") or "").strip()
-
-        if not closed:
-            if start not in allowed_times or end not in allowed_times:
-                flash("Please select valid working times.", "danger")
-                return redirect(url_for("owner.edit_salon", salon_id=salon.id))
-
-            # basic order check (string compare works for HH:MM)
-            if start >= end:
-                flash("Start time must be before end time.", "danger")
-                return redirect(url_for("owner.edit_salon", salon_id=salon.id))
-        else:
-            start = None
-            end = None
-
-        row = SalonWorkingHours.query.filter_by(salon_id=salon.id, weekday=wd).first()
-        if not row:
-            row = SalonWorkingHours(salon_id=salon.id, weekday=wd)
-            db.session.add(row)
-
-        row.is_closed = closed
-        row.start_time = start
-        row.end_time = end
+    try:
+        rows = parse_weekly_form(request.form)
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("owner.edit_salon", salon_id=salon.id))
 
-    db.session.commit()
+    # ✅ one INSERT ... ON CONFLICT for all 7 days
+    run_write(lambda session: apply_weekly_hours(session, [salon_id], rows))
+    publish_salon(salon_id, weekly_hours_event(rows))
     flash("Weekly working hours saved.", "success")
-    return redirect(url_for("owner.edit_salon", salon_id=salon.id))
+    return redirect(url_for("owner.edit_salon", salon_id=salon_id))
 
 
 # =========================
@@ -366,34 +517,16 @@ def set_salon_special_day(salon_id):
         flash("Invalid date.", "danger")
         return redirect(url_for("owner.edit_salon", salon_id=salon.id))
 
-    allowed_times = {
-        "08:00","09:00","10:00","11:00","12:00","13:00","14:00","15:00",
-        "16:00","17:00","18:00","19:00","20:00","21:00","22:00"
-    }
-
-    if is_closed:
-        start = None
-        end = None
-    else:
-        if start not in allowed_times or end not in allowed_times:
-            flash("Please select valid special hours.", "danger")
-            return redirect(url_for("owner.edit_salon", salon_id=salon.id))
-        if start >= end:
-            flash("Special day start time must be before end time.", "danger")
-            return redirect(url_for("owner.edit_salon", salon_id=salon.id))
-
-    row = SalonSpecialHours.query.filter_by(salon_id=salon.id, day=day).first()
-    if not row:
-        row = SalonSpecialHours(salon_id=salon.id, day=day)
-        db.session.add(row)
-
-    row.is_closed = is_closed
-    row.start_time = start
-    row.end_time = end
+    try:
+        is_closed, start, end = check_hours(is_closed, start, end, what="special")
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("owner.edit_salon", salon_id=salon.id))
 
-    db.session.commit()
+    run_write(lambda session: apply_special_days(session, [salon_id], [day], is_closed, start, end))
+    publish_salon(salon_id, special_day_event([day], is_closed, start, end))
     flash("Special day saved.", "success")
-    return redirect(url_for("owner.edit_salon", salon_id=salon.id))
+    return redirect(url_for("owner.edit_salon", salon_id=salon_id))
 
 
 @owner_bp.route("/manage-businesses/salon/<int:salon_id>/hours/special/<int:special_id>/delete", methods=["POST"])
@@ -403,14 +536,81 @@ def delete_salon_special_day(salon_id, special_id):
     salon = owner_salon_or_404(salon_id)
 
     row = SalonSpecialHours.query.filter_by(id=special_id, salon_id=salon.id).first_or_404()
+    day_str = row.day.strftime("%Y-%m-%d")
     db.session.delete(row)
     db.session.commit()
+    publish_salon(salon_id, {"type": "special_day", "day": day_str, "hours": None})
 
     flash("Special day deleted.", "success")
     return redirect(url_for("owner.edit_salon", salon_id=salon.id))
 
 
 
+# =========================
+# MULTI-SALON SCHEDULE (weekly template / special days for many salons)
+# =========================
+@owner_bp.route("/manage-businesses/schedule", methods=["GET", "POST"])
+@login_required
+def apply_schedule():
+    owner_required()
+
+    salons = (
+        db.session.query(Salon.id, Salon.name, Salon.location)
+        .filter(Salon.owner_user_id == current_user.id)
+        .order_by(Salon.name)
+        .all()
+    )
+
+    if request.method == "POST":
+        own_ids = {s.id for s in salons}
+        salon_ids = sorted({int(x) for x in request.form.getlist("salon_ids") if x.isdigit()} & own_ids)
+        mode = request.form.get("mode")
+
+        if not salon_ids:
+            flash("Select at least one salon.", "danger")
+            return redirect(url_for("owner.apply_schedule"))
+
+        try:
+            if mode == "weekly":
+                rows = parse_weekly_form(request.form)
+            elif mode == "special":
+                days = parse_days(request.form.getlist("days"))
+                if not days:
+                    raise ValueError("Please enter at least one date.")
+                is_closed, start, end = check_hours(
+                    request.form.get("is_closed") == "on",
+                    (request.form.get("start") or "").strip(),
+                    (request.form.get("end") or "").strip(),
+                    what="special",
+                )
+            else:
+                abort(400)
+        except ValueError as e:
+            flash(str(e), "danger")
+            return redirect(url_for("owner.apply_schedule"))
+
+        # ✅ every salon in one transaction, then one live event per salon
+        if mode == "weekly":
+            run_write(lambda session: apply_weekly_hours(session, salon_ids, rows))
+            event = weekly_hours_event(rows)
+            for sid in salon_ids:
+                publish_salon(sid, event)
+            flash(f"Weekly hours applied to {len(salon_ids)} salons.", "success")
+        else:
+            run_write(lambda session: apply_special_days(session, salon_ids, days, is_closed, start, end))
+            event = special_day_event(days, is_closed, start, end)
+            for sid in salon_ids:
+                publish_salon(sid, event)
+            flash(f"{len(days)} special days applied to {len(salon_ids)} salons.", "success")
+
+        return redirect(url_for("owner.manage_businesses"))
+
+    return render_template(
+        "manage_businesses/schedule.html",
+        salons=salons,
+        times=TIME_CHOICES,
+    )
+
 # =========================
 # STAFF UNAVAILABILITY (multi-time per day)
 # =========================
@@ -418,9 +618,7 @@ def delete_salon_special_day(salon_id, special_id):
 @login_required
 def set_staff_unavailability(salon_id, staff_id):
     owner_required()
-    salon = owner_salon_or_404(salon_id)
-
-    staff = Staff.query.filter_by(id=staff_id, salon_id=salon.id).first_or_404()
+    salon, staff = owner_salon_item_or_404(salon_id, Staff, staff_id)
 
     day_str = (request.form.get("day") or "").strip()
     times = request.form.getlist("times")  # multi-select; can be empty => all day
@@ -471,18 +669,29 @@ def set_staff_unavailability(salon_id, staff_id):
             flash(f"Selected time {t} is outside salon working hours ({start}–{end}).", "danger")
             return redirect(url_for("owner.edit_salon", salon_id=salon.id))
 
-    # ✅ Replace mode: wipe that day entries then insert new ones
-    StaffAvailability.query.filter_by(staff_id=staff.id, day=day).delete()
-    db.session.commit()
+    # ✅ Replace mode: wipe that day entries then insert new ones (one transaction)
+    staff_id = staff.id
 
-    # Empty list => All day block
-    if len(unique_times) == 0:
-        db.session.add(StaffAvailability(staff_id=staff.id, day=day, time=None))
-    else:
-        for t in unique_times:
-            db.session.add(StaffAvailability(staff_id=staff.id, day=day, time=t))
+    def write(session):
+        session.query(StaffAvailability).filter_by(staff_id=staff_id, day=day).delete()
 
-    db.session.commit()
+        # Empty list => All day block
+        if len(unique_times) == 0:
+            session.add(StaffAvailability(staff_id=staff_id, day=day, time=None))
+        else:
+            for t in unique_times:
+                session.add(StaffAvailability(staff_id=staff_id, day=day, time=t))
+
+        record_staff_day(session, salon_id, staff_id, day, unique_times, all_day=not unique_times)
+
+    run_write(write)
+    publish_salon(salon_id, {
+        "type": "staff_day",
+        "staff_id": staff_id,
+        "day": day.strftime("%Y-%m-%d"),
+        "all_day": not unique_times,
+        "times": unique_times,
+    })
     flash("Unavailability saved.", "success")
     return redirect(url_for("owner.edit_salon", salon_id=salon.id))
 
@@ -491,9 +700,7 @@ def set_staff_unavailability(salon_id, staff_id):
 @login_required
 def clear_staff_unavailability_day(salon_id, staff_id, day_str):
     owner_required()
-    salon = owner_salon_or_404(salon_id)
-
-    staff = Staff.query.filter_by(id=staff_id, salon_id=salon.id).first_or_404()
+    salon, staff = owner_salon_item_or_404(salon_id, Staff, staff_id)
 
     try:
         day = datetime.strptime(day_str, "%Y-%m-%d").date()
@@ -501,8 +708,20 @@ def clear_staff_unavailability_day(salon_id, staff_id, day_str):
         flash("Invalid date.", "danger")
         return redirect(url_for("owner.edit_salon", salon_id=salon.id))
 
-    StaffAvailability.query.filter_by(staff_id=staff.id, day=day).delete()
-    db.session.commit()
+    staff_id = staff.id
+
+    def write(session):
+        session.query(StaffAvailability).filter_by(staff_id=staff_id, day=day).delete()
+        record_staff_day(session, salon_id, staff_id, day)
+
+    run_write(write)
+    publish_salon(salon_id, {
+        "type": "staff_day",
+        "staff_id": staff_id,
+        "day": day.strftime("%Y-%m-%d"),
+        "all_day": False,
+        "times": [],
+    })
 
     flash("Unavailability cleared for that day.", "success")
     return redirect(url_for("owner.edit_salon", salon_id=salon.id))
@@ -525,8 +744,10 @@ def add_service(salon_id):
         flash("Service name required.", "danger")
         return redirect(url_for("owner.edit_salon", salon_id=salon.id))
 
-    s = Service(salon_id=salon.id, name=name, duration=duration, price=price)
+    s = Service(salon_id=salon.id, name=name, duration=duration, price=price, category=category_for(name))
     db.session.add(s)
+    db.session.flush()
+    refresh_salon_facets(db.session, [salon.id])
     db.session.commit()
     flash("Service added.", "success")
     return redirect(url_for("owner.edit_salon", salon_id=salon.id))
@@ -536,13 +757,11 @@ def add_service(salon_id):
 @login_required
 def delete_service(salon_id, service_id):
     owner_required()
-    salon = owner_salon_or_404(salon_id)
-
-    service = Service.query.get_or_404(service_id)
-    if service.salon_id != salon.id:
-        abort(403)
+    salon, service = owner_salon_item_or_404(salon_id, Service, service_id)
 
     db.session.delete(service)
+    db.session.flush()
+    refresh_salon_facets(db.session, [salon.id])
     db.session.commit()
     flash("Service deleted.", "success")
     return redirect(url_for("owner.edit_salon", salon_id=salon.id))
@@ -576,23 +795,14 @@ def add_staff(salon_id):
 @login_required
 def delete_staff(salon_id, staff_id):
     owner_required()
-    salon = owner_salon_or_404(salon_id)
-
-    staff = Staff.query.get_or_404(staff_id)
-    if staff.salon_id != salon.id:
-        abort(403)
-
-    if staff.photo_path:
-        try:
-            safe_delete_file(
-                base_dir=current_app.config["UPLOAD_FOLDER"],
-                rel_path=staff.photo_path.replace("uploads/", "", 1)
-            )
-        except Exception as e:
-            print("Failed to delete staff photo file:", e, flush=True)
+    salon, staff = owner_salon_item_or_404(salon_id, Staff, staff_id)
 
+    photo_path = staff.photo_path
+    # skills and availability rows go with the staff row (ON DELETE CASCADE)
     db.session.delete(staff)
     db.session.commit()
+    if photo_path:
+        remove_upload_files([photo_path])
 
     flash("Staff deleted.", "success")
     return redirect(url_for("owner.edit_salon", salon_id=salon.id))
@@ -602,29 +812,46 @@ def delete_staff(salon_id, staff_id):
 @login_required
 def staff_skills(salon_id, staff_id):
     owner_required()
-    salon = owner_salon_or_404(salon_id)
-
-    staff = Staff.query.get_or_404(staff_id)
-    if staff.salon_id != salon.id:
-        abort(403)
+    salon, staff = owner_salon_item_or_404(salon_id, Staff, staff_id)
 
     services = Service.query.filter_by(salon_id=salon.id).all()
 
     if request.method == "POST":
-        selected_service_ids = request.form.getlist("service_ids")
-
-        StaffService.query.filter_by(staff_id=staff.id).delete()
-        db.session.commit()
-
-        for sid in selected_service_ids:
-            db.session.add(StaffService(staff_id=staff.id, service_id=int(sid)))
-
-        db.session.commit()
+        # only this salon's services can be linked
+        salon_service_ids = {s.id for s in services}
+        wanted = {int(x) for x in request.form.getlist("service_ids") if x.isdigit()} & salon_service_ids
+        staff_id = staff.id
+
+        def _apply(session):
+            # ✅ diff against what's stored: touch only the links that changed, one transaction
+            current = set(session.scalars(
+                db.select(StaffService.service_id).where(StaffService.staff_id == staff_id)
+            ))
+            removed = current - wanted
+            added = wanted - current
+            if removed:
+                session.execute(
+                    db.delete(StaffService).where(
+                        StaffService.staff_id == staff_id,
+                        StaffService.service_id.in_(removed),
+                    )
+                )
+            if added:
+                session.execute(
+                    db.insert(StaffService),
+                    [{"staff_id": staff_id, "service_id": sid} for sid in sorted(added)],
+                )
+            if removed or added:
+                record_staff_skills(session, salon_id, staff_id, wanted)
+
+        run_write(_apply)
+        publish_salon(salon_id, {"type": "skills", "skills": SkillMatrix.for_salon(salon_id).to_payload()})
         flash("Staff skills updated.", "success")
         return redirect(url_for("owner.edit_salon", salon_id=salon.id))
 
-    current_links = StaffService.query.filter_by(staff_id=staff.id).all()
-    selected_ids = {l.service_id for l in current_links}
+    selected_ids = set(db.session.scalars(
+        db.select(StaffService.service_id).where(StaffService.staff_id == staff.id)
+    ))
 
     return render_template(
         "manage_businesses/staff_skills.html",
@@ -658,41 +885,44 @@ def upload_salon_photo(salon_id):
         flash("Max 5 photos per salon.", "warning")
         return redirect(url_for("owner.edit_salon", salon_id=salon.id))
 
-    rel_path = save_image(
-        file_storage=file,
-        base_dir=current_app.config["UPLOAD_FOLDER"],
-        subdir=current_app.config["SALON_UPLOAD_SUBDIR"],
-        max_side=1600,
-        quality=80
-    )
+    store_salon_photo(salon.id, file, is_main=(existing_count == 0))
+
+    flash("Photo uploaded.", "success")
+    return redirect(url_for("owner.edit_salon", salon_id=salon.id))
+
+
+def make_main_photo(salon_id: int, photo: SalonPhoto):
+    """
+    Marks `photo` as the salon's only main photo. Goes through the ORM (at most
+    5 rows) so the change feed records every photo that loses the flag.
+    """
+    for other in SalonPhoto.query.filter(SalonPhoto.salon_id == salon_id, SalonPhoto.is_main.is_(True)):
+        if other is not photo:
+            other.is_main = False
+    photo.is_main = True
+
 
-    is_main = (existing_count == 0)
+def store_salon_photo(salon_id: int, file, is_main: bool) -> SalonPhoto:
+    """save_image() + SalonPhoto row; shared by the form upload and chunked finalize."""
+    key, meta = save_image(file_storage=file, kind="salons", max_side=1600, quality=80)
 
-    p = SalonPhoto(salon_id=salon.id, file_path=rel_path, is_main=is_main)
+    p = SalonPhoto(salon_id=salon_id, file_path=key, is_main=is_main, **meta)
     db.session.add(p)
 
     if is_main:
-        SalonPhoto.query.filter_by(salon_id=salon.id).update({"is_main": False})
-        p.is_main = True
+        make_main_photo(salon_id, p)
 
     db.session.commit()
-
-    flash("Photo uploaded.", "success")
-    return redirect(url_for("owner.edit_salon", salon_id=salon.id))
+    return p
 
 
 @owner_bp.route("/manage-businesses/salon/<int:salon_id>/photos/<int:photo_id>/main", methods=["POST"])
 @login_required
 def set_main_salon_photo(salon_id, photo_id):
     owner_required()
-    salon = owner_salon_or_404(salon_id)
-
-    photo = SalonPhoto.query.get_or_404(photo_id)
-    if photo.salon_id != salon.id:
-        abort(403)
+    salon, photo = owner_salon_item_or_404(salon_id, SalonPhoto, photo_id)
 
-    SalonPhoto.query.filter_by(salon_id=salon.id).update({"is_main": False})
-    photo.is_main = True
+    make_main_photo(salon.id, photo)
     db.session.commit()
 
     flash("Main photo updated.", "success")
@@ -703,11 +933,7 @@ def set_main_salon_photo(salon_id, photo_id):
 @login_required
 def delete_salon_photo(salon_id, photo_id):
     owner_required()
-    salon = owner_salon_or_404(salon_id)
-
-    photo = SalonPhoto.query.get_or_404(photo_id)
-    if photo.salon_id != salon.id:
-        abort(403)
+    salon, photo = owner_salon_item_or_404(salon_id, SalonPhoto, photo_id)
 
     rel_path = photo.file_path
     was_main = photo.is_main
@@ -715,13 +941,12 @@ def delete_salon_photo(salon_id, photo_id):
     db.session.delete(photo)
     db.session.commit()
 
-    safe_delete_file(current_app.config["UPLOAD_FOLDER"], rel_path)
+    remove_upload_files([rel_path])
 
     if was_main:
         next_photo = SalonPhoto.query.filter_by(salon_id=salon.id).order_by(SalonPhoto.id.asc()).first()
         if next_photo:
-            SalonPhoto.query.filter_by(salon_id=salon.id).update({"is_main": False})
-            next_photo.is_main = True
+            make_main_photo(salon.id, next_photo)
             db.session.commit()
 
     flash("Photo deleted.", "success")
@@ -735,11 +960,7 @@ def delete_salon_photo(salon_id, photo_id):
 @login_required
 def upload_staff_photo(salon_id, staff_id):
     owner_required()
-    salon = owner_salon_or_404(salon_id)
-
-    staff = Staff.query.get_or_404(staff_id)
-    if staff.salon_id != salon.id:
-        abort(403)
+    salon, staff = owner_salon_item_or_404(salon_id, Staff, staff_id)
 
     file = request.files.get("photo")
     if not file or not file.filename:
@@ -750,49 +971,152 @@ def upload_staff_photo(salon_id, staff_id):
         flash("Allowed formats: jpg, jpeg, png, webp.", "danger")
         return redirect(url_for("owner.edit_salon", salon_id=salon.id))
 
-    if staff.photo_path:
-        safe_delete_file(current_app.config["UPLOAD_FOLDER"], staff.photo_path.replace("uploads/", "", 1))
-
-    rel_path = save_image(
-        file_storage=file,
-        base_dir=current_app.config["UPLOAD_FOLDER"],
-        subdir=current_app.config["STAFF_UPLOAD_SUBDIR"],
-        max_side=1200,
-        quality=80
-    )
-
-    if rel_path.startswith("staff/") or rel_path.startswith("salons/"):
-        staff.photo_path = f"uploads/{rel_path}"
-    elif rel_path.startswith("uploads/"):
-        staff.photo_path = rel_path
-    elif rel_path.startswith("/static/"):
-        staff.photo_path = rel_path.replace("/static/", "", 1)
-    else:
-        staff.photo_path = f"uploads/{rel_path.lstrip('/')}"
-
-    db.session.commit()
+    store_staff_photo(staff, file)
     flash("Staff photo uploaded.", "success")
     print("Saved staff.photo_path =", staff.photo_path, flush=True)
 
     return redirect(url_for("owner.edit_salon", salon_id=salon.id))
 
 
+def store_staff_photo(staff: Staff, file):
+    """save_image() + replace the staff photo (old file reaped after commit)."""
+    old_photo_path = staff.photo_path
+
+    key, meta = save_image(file_storage=file, kind="staff", max_side=1200, quality=80)
+    staff.photo_path = key
+    staff.photo_width, staff.photo_height, staff.photo_lqip = meta["width"], meta["height"], meta["lqip"]
+
+    db.session.commit()
+    if old_photo_path:
+        remove_upload_files([old_photo_path])
+
+
 @owner_bp.route("/manage-businesses/salon/<int:salon_id>/staff/<int:staff_id>/photo/delete", methods=["POST"])
 @login_required
 def delete_staff_photo(salon_id, staff_id):
     owner_required()
-    salon = owner_salon_or_404(salon_id)
-
-    staff = Staff.query.get_or_404(staff_id)
-    if staff.salon_id != salon.id:
-        abort(403)
+    salon, staff = owner_salon_item_or_404(salon_id, Staff, staff_id)
 
     if staff.photo_path:
-        rel = staff.photo_path.replace("uploads/", "", 1)
-        safe_delete_file(current_app.config["UPLOAD_FOLDER"], rel)
-
+        old_photo_path = staff.photo_path
         staff.photo_path = None
+        staff.photo_width = staff.photo_height = staff.photo_lqip = None
         db.session.commit()
+        remove_upload_files([old_photo_path])
 
     flash("Staff photo deleted.", "success")
     return redirect(url_for("owner.edit_salon", salon_id=salon.id))
+
+
+# =========================
+# CHUNKED PHOTO UPLOADS (see app/chunked_uploads.py)
+# =========================
+def owner_upload_or_404(upload_id: str) -> dict:
+    meta = load_upload(upload_id, current_user.id)
+    if meta is None:
+        abort(404)
+    return meta
+
+
+@owner_bp.route("/manage-businesses/salon/<int:salon_id>/uploads", methods=["POST"])
+@login_required
+def start_chunked_upload(salon_id):
+    owner_required()
+    salon = owner_salon_or_404(salon_id)
+
+    data = request.get_json(silent=True) or {}
+    target = data.get("target")
+    filename = str(data.get("filename") or "").strip()
+    try:
+        size = int(data.get("size") or 0)
+        staff_id = int(data.get("staff_id") or 0)
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "message": "size and staff_id must be numbers."}), 400
+
+    if not allowed_file(filename):
+        return jsonify({"ok": False, "message": "Allowed formats: jpg, jpeg, png, webp."}), 400
+
+    if target == "staff_photo":
+        owner_salon_item_or_404(salon_id, Staff, staff_id)
+    else:
+        staff_id = None
+    if target == "salon_photo" and SalonPhoto.query.filter_by(salon_id=salon.id).count() >= 5:
+        return jsonify({"ok": False, "message": "Max 5 photos per salon."}), 400
+
+    try:
+        meta = start_upload(current_user.id, target, salon.id, staff_id, filename, size)
+    except ValueError as e:
+        return jsonify({"ok": False, "message": str(e)}), 400
+
+    return jsonify({"ok": True, **upload_status(meta)}), 200
+
+
+@owner_bp.route("/manage-businesses/uploads/<upload_id>", methods=["GET"])
+@login_required
+def chunked_upload_status(upload_id):
+    owner_required()
+    meta = owner_upload_or_404(upload_id)
+    return jsonify({"ok": True, **upload_status(meta)}), 200
+
+
+@owner_bp.route("/manage-businesses/uploads/<upload_id>", methods=["PUT"])
+@login_required
+def append_upload_chunk(upload_id):
+    owner_required()
+    meta = owner_upload_or_404(upload_id)
+
+    offset = request.args.get("offset", type=int)
+    length = request.content_length
+    if offset is None or length is None:
+        return jsonify({"ok": False, "message": "offset and Content-Length are required."}), 400
+
+    try:
+        received = append_chunk(meta, offset, request.stream, length)
+    except ChunkOffsetError as e:
+        return jsonify({"ok": False, "message": "Wrong offset, resume from received.", "received": e.received}), 409
+    except ValueError as e:
+        return jsonify({"ok": False, "message": str(e)}), 400
+
+    return jsonify({"ok": True, "received": received, "size": meta["size"]}), 200
+
+
+@owner_bp.route("/manage-businesses/uploads/<upload_id>", methods=["DELETE"])
+@login_required
+def cancel_chunked_upload(upload_id):
+    owner_required()
+    meta = owner_upload_or_404(upload_id)
+    discard_upload(meta["upload_id"])
+    return jsonify({"ok": True}), 200
+
+
+@owner_bp.route("/manage-businesses/uploads/<upload_id>/finalize", methods=["POST"])
+@login_required
+def finalize_chunked_upload(upload_id):
+    owner_required()
+    meta = owner_upload_or_404(upload_id)
+    salon_id = meta["salon_id"]
+
+    # ownership is checked again: the salon or staff member may be gone by now
+    if meta["target"] == "staff_photo":
+        _, staff = owner_salon_item_or_404(salon_id, Staff, meta["staff_id"])
+    else:
+        owner_salon_or_404(salon_id)
+        existing_count = SalonPhoto.query.filter_by(salon_id=salon_id).count()
+        if existing_count >= 5:
+            discard_upload(meta["upload_id"])
+            return jsonify({"ok": False, "message": "Max 5 photos per salon."}), 400
+
+    try:
+        file = claim_upload(meta)
+    except ValueError as e:
+        return jsonify({"ok": False, "message": str(e)}), 409
+
+    try:
+        if meta["target"] == "staff_photo":
+            store_staff_photo(staff, file)
+        else:
+            store_salon_photo(salon_id, file, is_main=(existing_count == 0))
+    finally:
+        discard_upload(meta["upload_id"], file)
+
+    return jsonify({"ok": True, "redirect": url_for("owner.edit_salon", salon_id=salon_id)}), 200
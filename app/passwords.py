@@ -0,0 +1,116 @@
+"""
+Password hashing.
+
+- Parameters come from config: PASSWORD_HASH_METHOD (Werkzeug method string,
+  e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000") and PASSWORD_SALT_LENGTH.
+- needs_rehash() tells whether a stored hash was made with other parameters;
+  auth.login upgrades it transparently after a successful login.
+- Hashing/verification runs on a small per-process pool (PASSWORD_HASH_WORKERS)
+  with a bounded backlog (PASSWORD_HASH_MAX_PENDING). A login burst can keep at
+  most that many CPU-heavy hashes in flight; beyond it we raise PasswordHasherBusy
+  instead of starving the threads serving other routes. A hash still queued
+  after PASSWORD_HASH_TIMEOUT is cancelled (its slot freed) and also raises
+  PasswordHasherBusy.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "scrypt:32768:8:1"
+DEFAULT_SALT_LENGTH = 16
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hash operations queued; caller should ask the user to retry."""
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # created lazily and per process (executor threads don't survive fork)
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pw-hash")
+                    self._pid = os.getpid()
+        return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            fut = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        try:
+            return fut.result(timeout=self.timeout)
+        except FutureTimeout:
+            # still queued: cancelled, never runs. Already running: it finishes and frees its slot.
+            fut.cancel()
+            raise PasswordHasherBusy()
+
+
+def _config(key, default):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+
+def _hasher():
+    return current_app.extensions.get("stylio_password_hasher") if has_app_context() else None
+
+
+def hash_password(password: str) -> str:
+    method = _config("PASSWORD_HASH_METHOD", DEFAULT_METHOD)
+    salt_length = _config("PASSWORD_SALT_LENGTH", DEFAULT_SALT_LENGTH)
+    hasher = _hasher()
+    if hasher is None:
+        return generate_password_hash(password, method, salt_length)
+    return hasher.run(generate_password_hash, password, method, salt_length)
+
+
+def verify_password(pw_hash: str, password: str) -> bool:
+    hasher = _hasher()
+    if hasher is None:
+        return check_password_hash(pw_hash, password)
+    return hasher.run(check_password_hash, pw_hash, password)
+
+
+@lru_cache(maxsize=8)
+def _stored_method(method: str) -> str:
+    # Werkzeug fills in defaults (e.g. "pbkdf2:sha256" -> "pbkdf2:sha256:600000"),
+    # so compare against what it actually writes
+    return generate_password_hash("probe", method=method, salt_length=1).split("$", 1)[0]
+
+
+def needs_rehash(pw_hash: str) -> bool:
+    parts = (pw_hash or "").split("$")
+    if len(parts) != 3:
+        return True
+    method, salt, _ = parts
+    return (
+        method != _stored_method(_config("PASSWORD_HASH_METHOD", DEFAULT_METHOD))
+        or len(salt) != _config("PASSWORD_SALT_LENGTH", DEFAULT_SALT_LENGTH)
+    )
+
+
+def init_password_hasher(app):
+    workers = int(app.config.get("PASSWORD_HASH_WORKERS", 0))
+    if workers <= 0:
+        return
+    app.extensions["stylio_password_hasher"] = PasswordHasher(
+        workers=workers,
+        max_pending=int(app.config.get("PASSWORD_HASH_MAX_PENDING", 16)),
+        timeout=float(app.config.get("PASSWORD_HASH_TIMEOUT", 10.0)),
+    )
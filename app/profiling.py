@@ -0,0 +1,143 @@
+"""
+Opt-in per-request profiling.
+
+When PROFILE_ENABLED is on, a request is captured with cProfile if either:
+  - it sends PROFILE_HEADER with the secret PROFILE_TOKEN, or
+  - it is picked by PROFILE_SAMPLE_RATE (optionally only for PROFILE_SAMPLE_ENDPOINTS).
+
+Each capture writes two files into PROFILE_DIR:
+  <id>.prof  -> pstats dump (open with `python -m pstats` or snakeviz)
+  <id>.json  -> route, salon id, timing and status metadata
+
+Captures are hard-capped per minute and only one request is profiled at a time,
+so this is safe to leave enabled in production.
+"""
+import cProfile
+import hmac
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import g, request
+
+
+class CaptureLimiter:
+    """Sliding one-minute window: at most `max_per_minute` captures."""
+
+    def __init__(self, max_per_minute: int):
+        self.max_per_minute = max_per_minute
+        self._stamps = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._stamps and now - self._stamps[0] >= 60:
+                self._stamps.popleft()
+            if len(self._stamps) >= self.max_per_minute:
+                return False
+            self._stamps.append(now)
+            return True
+
+
+def _trigger_for_request(cfg):
+    """Returns 'header' / 'sample' if this request should be profiled, else None."""
+    token = cfg.get("PROFILE_TOKEN") or ""
+    sent = request.headers.get(cfg["PROFILE_HEADER"])
+    if token and sent and hmac.compare_digest(sent, token):
+        return "header"
+
+    rate = cfg.get("PROFILE_SAMPLE_RATE") or 0.0
+    if rate > 0:
+        endpoints = cfg.get("PROFILE_SAMPLE_ENDPOINTS") or set()
+        if endpoints and request.endpoint not in endpoints:
+            return None
+        if random.random() < rate:
+            return "sample"
+
+    return None
+
+
+def init_profiling(app):
+    """Registers the profiling hooks. No-op unless PROFILE_ENABLED is set."""
+    if not app.config.get("PROFILE_ENABLED"):
+        return
+
+    out_dir = app.config["PROFILE_DIR"]
+    limiter = CaptureLimiter(int(app.config.get("PROFILE_MAX_PER_MINUTE", 6)))
+
+    # cProfile cannot run two profilers at once -> one capture at a time
+    active = threading.Lock()
+
+    def _finish(status_code):
+        prof = g.pop("_profiler", None)
+        if prof is None:
+            return None
+
+        prof.disable()
+        duration_ms = (time.perf_counter() - g.pop("_profile_started")) * 1000.0
+        trigger = g.pop("_profile_trigger", None)
+        active.release()
+
+        view_args = request.view_args or {}
+        salon_id = view_args.get("salon_id", view_args.get("id"))
+
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        capture_id = f"{stamp}_{request.endpoint or 'unknown'}_{salon_id or 'na'}"
+
+        meta = {
+            "id": capture_id,
+            "endpoint": request.endpoint,
+            "method": request.method,
+            "path": request.path,
+            "salon_id": salon_id,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "trigger": trigger,
+            "pid": os.getpid(),
+            "captured_at": datetime.utcnow().isoformat() + "Z",
+        }
+
+        try:
+            os.makedirs(out_dir, exist_ok=True)
+            prof.dump_stats(os.path.join(out_dir, f"{capture_id}.prof"))
+            with open(os.path.join(out_dir, f"{capture_id}.json"), "w", encoding="utf-8") as fh:
+                json.dump(meta, fh, indent=2)
+        except Exception as e:
+            print("Failed to write profile capture:", e, flush=True)
+            return None
+
+        return capture_id
+
+    @app.before_request
+    def _profile_start():
+        trigger = _trigger_for_request(app.config)
+        if not trigger:
+            return
+        if not active.acquire(blocking=False):
+            return
+        if not limiter.try_acquire():
+            active.release()
+            return
+
+        g._profile_trigger = trigger
+        g._profile_started = time.perf_counter()
+        g._profiler = cProfile.Profile()
+        g._profiler.enable()
+
+    @app.after_request
+    def _profile_stop(response):
+        capture_id = _finish(response.status_code)
+        if capture_id:
+            response.headers["X-Stylio-Profile-Id"] = capture_id
+        return response
+
+    @app.teardown_request
+    def _profile_abort(exc):
+        # after_request is skipped when the view raised -> still save the capture
+        if "_profiler" in g:
+            _finish(500)
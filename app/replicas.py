@@ -0,0 +1,111 @@
+"""
+Read-replica routing.
+
+Replicas are configured as extra binds (DATABASE_REPLICA_URLS, comma separated ->
+binds "replica_0", "replica_1", ...). For each request we decide once:
+
+- GET/HEAD requests (not in REPLICA_EXCLUDED_ENDPOINTS) read from a randomly
+  picked replica
+- everything else, and all writes/flushes, use the primary
+- once a request writes, its later reads go to the primary too
+- after a successful write request the user is "sticky" to the primary for
+  REPLICA_STICKY_SECONDS (stored in the session cookie), so an owner who just
+  saved changes sees them on the next page even if replicas lag
+
+Code outside a request (CLI, writer thread, startup) always uses the primary.
+
+For local testing point DATABASE_REPLICA_URLS at a second SQLite file and copy
+the primary into it with `flask sync-replicas`.
+"""
+import random
+import sqlite3
+import time
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+from .db_tuning import engine_options_for
+
+STICKY_SESSION_KEY = "_db_primary_until"
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends a request's SELECTs to its replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not has_request_context():
+            return engine
+
+        if self._flushing or not getattr(clause, "is_select", False):
+            g._db_wrote = True
+            return engine
+
+        replica_key = g.get("_db_replica")
+        if replica_key and not g.get("_db_wrote") and engine is self._db.engines.get(None):
+            return self._db.engines[replica_key]
+        return engine
+
+
+def replica_bind_keys(app):
+    return [f"replica_{i}" for i in range(len(app.config.get("SQLALCHEMY_REPLICA_URLS") or []))]
+
+
+def configure_replica_binds(app):
+    """Call before db.init_app(): adds one bind per replica URL."""
+    urls = app.config.get("SQLALCHEMY_REPLICA_URLS") or []
+    if not urls:
+        return
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    for key, url in zip(replica_bind_keys(app), urls):
+        binds[key] = {"url": url, **engine_options_for(app, url)}
+    app.config["SQLALCHEMY_BINDS"] = binds
+
+
+def init_replica_routing(app):
+    keys = replica_bind_keys(app)
+    if not keys:
+        return
+
+    excluded = set(app.config.get("REPLICA_EXCLUDED_ENDPOINTS") or ())
+    sticky_seconds = float(app.config.get("REPLICA_STICKY_SECONDS", 10))
+
+    @app.before_request
+    def _choose_db_route():
+        if request.method not in ("GET", "HEAD") or request.endpoint in excluded:
+            return
+        if session.get(STICKY_SESSION_KEY, 0) > time.time():
+            return
+        g._db_replica = random.choice(keys)
+
+    @app.after_request
+    def _mark_primary_sticky(response):
+        wrote = g.get("_db_wrote") or request.method not in ("GET", "HEAD", "OPTIONS")
+        if wrote and response.status_code < 400:
+            session[STICKY_SESSION_KEY] = time.time() + sticky_seconds
+        return response
+
+
+def sync_sqlite_replicas(app):
+    """Copies the primary SQLite DB into every SQLite replica (online backup API)."""
+    primary = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    if primary.get_backend_name() != "sqlite":
+        raise RuntimeError("sync-replicas only supports SQLite; use your database's replication instead.")
+
+    copied = []
+    src = sqlite3.connect(primary.database)
+    try:
+        for url in app.config.get("SQLALCHEMY_REPLICA_URLS") or []:
+            replica = make_url(url)
+            if replica.get_backend_name() != "sqlite":
+                continue
+            dst = sqlite3.connect(replica.database)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+            copied.append(replica.database)
+    finally:
+        src.close()
+    return copied
@@ -0,0 +1,155 @@
+"""
+Review listing and rating histograms.
+
+Listing is keyset-paginated, newest first, on (created_at, id) through
+two indexes:
+
+  ix_review_salon_created         (salon_id, created_at, id)
+  ix_review_salon_rating_created  (salon_id, rating, created_at, id)   ?rating=N
+
+A page is one index range scan of limit+1 entries, whatever the page
+number: the cursor is the id of the last review shown, and the next page
+starts strictly after that review's (created_at, id). The comparison reads
+created_at from the cursor row inside the query, so rows stored with
+either datetime format (server default vs. Python value) page correctly.
+
+Counts and averages are never computed from the review table at request
+time. salon_rating_stats keeps one row per salon (count per star, total,
+rating sum), bumped by record_review() in the transaction that inserts
+the review. rebuild_review_stats() recomputes it (seed, migration,
+`flask rebuild-review-stats`).
+"""
+from sqlalchemy import case, delete, func, insert, select, tuple_, update
+
+from .models import Review, SalonRatingStats, User
+
+RATINGS = (1, 2, 3, 4, 5)
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+# =========================
+# MAINTENANCE
+# =========================
+def _stats_row(salon_id: int, rating: int) -> dict:
+    row = {f"count_{r}": int(r == rating) for r in RATINGS}
+    row.update(salon_id=salon_id, review_count=1, rating_sum=rating)
+    return row
+
+
+def record_review(session, salon_id: int, rating: int):
+    """Adds one review to the salon's stats. Call in the transaction that inserts it."""
+    row = _stats_row(salon_id, rating)
+    table = SalonRatingStats.__table__
+    dialect = session.get_bind(mapper=SalonRatingStats.__mapper__).dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        counters = [k for k in row if k != "salon_id"]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["salon_id"],
+            set_={k: table.c[k] + stmt.excluded[k] for k in counters},
+        )
+        session.execute(stmt, [row])
+        return
+    result = session.execute(
+        update(table)
+        .where(table.c.salon_id == salon_id)
+        .values({k: table.c[k] + v for k, v in row.items() if k != "salon_id"})
+    )
+    if result.rowcount == 0:
+        session.execute(insert(table), [row])
+
+
+def rebuild_review_stats(session) -> int:
+    """Recomputes salon_rating_stats from Review in one INSERT ... SELECT. Returns salons with reviews."""
+    session.execute(delete(SalonRatingStats))
+    columns = [func.sum(case((Review.rating == r, 1), else_=0)) for r in RATINGS]
+    stmt = select(Review.salon_id, *columns, func.count(), func.sum(Review.rating)).group_by(Review.salon_id)
+    session.execute(
+        insert(SalonRatingStats).from_select(
+            ["salon_id", *(f"count_{r}" for r in RATINGS), "review_count", "rating_sum"], stmt
+        )
+    )
+    return session.scalar(select(func.count()).select_from(SalonRatingStats)) or 0
+
+
+# =========================
+# QUERIES
+# =========================
+def parse_review_args(args) -> dict:
+    """Query string -> {rating, limit, before}. ValueError for unusable values."""
+    def whole(name):
+        raw = (args.get(name) or "").strip()
+        if not raw:
+            return None
+        try:
+            return int(raw)
+        except ValueError:
+            raise ValueError(f"{name} must be a whole number")
+
+    rating = whole("rating")
+    if rating is not None and rating not in RATINGS:
+        raise ValueError("rating must be 1 to 5")
+    before = whole("before")
+    if before is not None and before < 1:
+        raise ValueError("before is not a valid cursor")
+    limit = whole("limit")
+    limit = DEFAULT_PAGE_SIZE if limit is None else min(max(limit, 1), MAX_PAGE_SIZE)
+    return {"rating": rating, "limit": limit, "before": before}
+
+
+def list_reviews(session, salon_id: int, rating=None, before=None, limit: int = DEFAULT_PAGE_SIZE):
+    """
+    One page of the salon's reviews, newest first. Returns (reviews, next_cursor);
+    next_cursor is None on the last page. A cursor that isn't one of this
+    salon's reviews yields an empty page.
+    """
+    conds = [Review.salon_id == salon_id]
+    if rating is not None:
+        conds.append(Review.rating == rating)   # second column of the rating index
+    if before is not None:
+        cursor_created = (
+            select(Review.created_at)
+            .where(Review.id == before, Review.salon_id == salon_id)
+            .scalar_subquery()
+        )
+        conds.append(tuple_(Review.created_at, Review.id) < tuple_(cursor_created, before))
+
+    rows = session.execute(
+        select(Review.id, Review.rating, Review.comment, Review.created_at, User.full_name)
+        .outerjoin(User, User.id == Review.user_id)
+        .where(*conds)
+        .order_by(Review.created_at.desc(), Review.id.desc())
+        .limit(limit + 1)
+    ).all()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    reviews = [
+        {
+            "id": review_id,
+            "rating": stars,
+            "comment": comment,
+            "created_at": created_at.isoformat() if created_at else None,
+            "author": (full_name or "").split(" ")[0] or None,   # first name only
+        }
+        for review_id, stars, comment, created_at, full_name in rows
+    ]
+    return reviews, (rows[-1][0] if more else None)
+
+
+def rating_summary(session, salon_id: int) -> dict:
+    """{"review_count", "average", "histogram": [{rating, count}, 5..1]} from the stored row."""
+    stats = session.get(SalonRatingStats, salon_id)
+    return {
+        "review_count": stats.review_count if stats else 0,
+        "average": stats.average if stats else 0,
+        "histogram": [
+            {"rating": r, "count": getattr(stats, f"count_{r}") if stats else 0}
+            for r in reversed(RATINGS)
+        ],
+    }
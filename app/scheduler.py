@@ -0,0 +1,223 @@
+"""
+Multi-service visit planning (e.g. cut + colour in one visit).
+
+Given a salon, a day and a set of services, finds back-to-back sequences:
+an order of the services, a capable staff member for each, and start
+times, all inside the salon's hours and each staff member's free time.
+
+Each staff member's free time for the day is a short list of minute
+intervals (salon hours minus their blocks, see app/availability.py). The
+first service starts on one of the booking page's hourly slots; each next
+service starts at the earliest minute its staff member is free after the
+previous one ends. Starting any later can only add waiting, so no other
+start times need trying.
+
+Search is a depth-first branch-and-bound, one run per first-slot:
+  - a branch stops as soon as its waiting reaches the best plan found for
+    that slot, or the limit-th best plan overall
+  - it stops when the remaining services can't fit before closing
+  - a gap longer than max_gap stops the branch
+  - (services left, time, last staff) states already reached with less
+    waiting are skipped
+The best plan per first-slot is kept, then plans are ranked by total wait,
+start time and fewest staff changes.
+"""
+import math
+from datetime import datetime
+
+from sqlalchemy import select
+
+from .availability import (
+    SLOT_TIMES, salon_day_masks, staff_day_block_masks, past_slots_mask
+)
+from .capabilities import SkillMatrix
+from .extensions import db
+from .models import Service, Staff
+
+MAX_SERVICES_PER_VISIT = 5
+MAX_SEARCH_NODES = 50000
+FIRST_SLOT_MINUTE = int(SLOT_TIMES[0][:2]) * 60
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def fmt_minute(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def free_intervals(mask: int) -> list:
+    """Free-slot bits -> [(start_minute, end_minute)] with adjacent hours merged."""
+    intervals = []
+    i = 0
+    while mask:
+        if mask & 1:
+            start = i
+            while mask & 1:
+                mask >>= 1
+                i += 1
+            intervals.append((FIRST_SLOT_MINUTE + start * 60, FIRST_SLOT_MINUTE + i * 60))
+        else:
+            mask >>= 1
+            i += 1
+    return intervals
+
+
+def earliest_fit(intervals, t: int, duration: int):
+    """Earliest start >= t where [start, start + duration) is inside one free interval."""
+    for a, b in intervals:
+        if b <= t:
+            continue
+        start = max(a, t)
+        if start + duration <= b:
+            return start
+    return None
+
+
+def plan_visit(salon_id: int, day, service_ids, limit: int = 5, max_gap: int = 60,
+               now: datetime = None) -> dict:
+    """
+    Returns {"options": [...], "truncated": bool, "explored": n}. Options are
+    ranked by total wait; each has start, end, total_wait and steps
+    (service, staff, start, end). Raises ValueError for services that
+    aren't this salon's.
+    """
+    now = now or datetime.now()
+    service_ids = list(dict.fromkeys(int(s) for s in service_ids))
+    if not service_ids or len(service_ids) > MAX_SERVICES_PER_VISIT:
+        raise ValueError(f"choose 1 to {MAX_SERVICES_PER_VISIT} services")
+
+    services = {
+        r.id: r for r in db.session.execute(
+            select(Service.id, Service.name, Service.duration)
+            .where(Service.salon_id == salon_id, Service.id.in_(service_ids))
+        )
+    }
+    if len(services) != len(service_ids):
+        raise ValueError("unknown service for this salon")
+
+    empty = {"options": [], "truncated": False, "explored": 0}
+    if day < now.date():
+        return empty
+
+    matrix = SkillMatrix.for_salon(salon_id)
+    open_mask = salon_day_masks([salon_id], [salon_id], [day])[(salon_id, day)]
+    if day == now.date():
+        open_mask &= ~past_slots_mask(now)
+    if not open_mask:
+        return empty
+
+    blocks = staff_day_block_masks(matrix.staff_ids, [day])
+    free = {
+        staff_id: free_intervals(open_mask & ~blocks.get((staff_id, day), 0))
+        for staff_id in matrix.staff_ids
+    }
+
+    # services as bit positions so "what's left" is a small int
+    durations = [int(services[s].duration or 60) for s in service_ids]
+    capable = [[st for st in matrix.staff_for_service(s) if free[st]] for s in service_ids]
+    if not all(capable):
+        return empty
+
+    close = max(b for intervals in free.values() for _, b in intervals) if any(free.values()) else 0
+    all_left = (1 << len(service_ids)) - 1
+    total_duration = sum(durations)
+    first_starts = [a for a in range(FIRST_SLOT_MINUTE, close, 60)
+                    if open_mask >> ((a - FIRST_SLOT_MINUTE) // 60) & 1]
+
+    found = []     # (wait, start, changes, steps)
+    nodes = [0]
+    truncated = False
+
+    def kth_best_wait():
+        if len(found) < limit:
+            return math.inf
+        return sorted(f[0] for f in found)[limit - 1]
+
+    for t0 in first_starts:
+        if t0 + total_duration > close:
+            break
+        best = [None]   # (wait, changes, steps) for this first slot
+        memo = {}
+        kth = kth_best_wait()
+
+        def dfs(left, t, wait, changes, last_staff, steps, gap_limit, left_duration):
+            nodes[0] += 1
+            if nodes[0] > MAX_SEARCH_NODES:
+                raise _BudgetExceeded()
+
+            if not left:
+                if best[0] is None or (wait, changes) < best[0][:2]:
+                    best[0] = (wait, changes, list(steps))
+                return
+
+            bound = kth
+            if best[0] is not None:
+                bound = min(bound, best[0][0] + (1 if best[0][1] > changes else 0))
+            if wait >= bound:
+                return
+            if t + left_duration > close:
+                return
+
+            key = (left, t, last_staff)
+            seen = memo.get(key)
+            if seen is not None and seen <= (wait, changes):
+                return
+            memo[key] = (wait, changes)
+
+            for i in range(len(service_ids)):
+                if not left >> i & 1:
+                    continue
+                dur = durations[i]
+                # same staff first: fewer handovers for equal waits
+                staff_order = sorted(capable[i], key=lambda st: st != last_staff)
+                for st in staff_order:
+                    start = earliest_fit(free[st], t, dur)
+                    if start is None or start - t > gap_limit:
+                        continue
+                    steps.append((service_ids[i], st, start, start + dur))
+                    dfs(
+                        left & ~(1 << i), start + dur, wait + (start - t),
+                        changes + (last_staff is not None and st != last_staff), st,
+                        steps, max_gap, left_duration - dur,
+                    )
+                    steps.pop()
+
+        try:
+            dfs(all_left, t0, 0, 0, None, [], 0, total_duration)
+        except _BudgetExceeded:
+            truncated = True
+        if best[0] is not None:
+            wait, changes, steps = best[0]
+            found.append((wait, t0, changes, steps))
+        if truncated:
+            break
+
+    found.sort(key=lambda f: (f[0], f[1], f[2]))
+    found = found[:limit]
+
+    staff_names = dict(db.session.execute(
+        select(Staff.id, Staff.name).where(Staff.salon_id == salon_id)
+    ).all())
+
+    options = []
+    for wait, start, changes, steps in found:
+        options.append({
+            "start": fmt_minute(start),
+            "end": fmt_minute(steps[-1][3]),
+            "total_wait": wait,
+            "staff_changes": changes,
+            "steps": [
+                {
+                    "service_id": svc,
+                    "service_name": services[svc].name,
+                    "staff_id": st,
+                    "staff_name": staff_names.get(st),
+                    "start": fmt_minute(a),
+                    "end": fmt_minute(b),
+                }
+                for svc, st, a, b in steps
+            ],
+        })
+    return {"options": options, "truncated": truncated, "explored": nodes[0]}
@@ -0,0 +1,266 @@
+"""
+Schema version bookkeeping.
+
+`create_all()` reflects every table on each call, which is slow to do in every
+worker. Instead we store SCHEMA_VERSION in a one-row table:
+
+- full startup: create_all(); when the stored version is behind, run
+  MIGRATIONS newer than it and stamp SCHEMA_VERSION
+- fast startup (FAST_STARTUP=1): one SELECT of the stored version; only when
+  it doesn't match do we fall back to the full path
+
+The version row is written only when it changes, so a boot against an
+up-to-date database does no writes. Under gunicorn the app is preloaded, so
+this runs once in the master before the workers are forked.
+
+Bump SCHEMA_VERSION whenever models change. New tables are picked up by
+create_all(); changes to existing tables (new columns, indexes) need an entry
+in MIGRATIONS. Migration steps must be idempotent because a fresh database
+already gets the latest tables from create_all().
+"""
+from sqlalchemy import MetaData, bindparam, inspect, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import AddConstraint, CreateIndex, CreateTable
+
+from .extensions import db
+from .analytics import rebuild_rollups
+from .facets import category_for, rebuild_facets
+from .models import Review, SalonPhoto, Service, Staff
+from .reviews import rebuild_review_stats
+
+SCHEMA_VERSION = 8
+
+schema_version_table = db.Table(
+    "stylio_schema_version",
+    db.Column("id", db.Integer, primary_key=True),
+    db.Column("version", db.Integer, nullable=False),
+)
+
+
+def stored_schema_version():
+    """Returns the stamped version, or None if the table/row doesn't exist."""
+    try:
+        return db.session.execute(
+            select(schema_version_table.c.version).where(schema_version_table.c.id == 1)
+        ).scalar()
+    except Exception:
+        db.session.rollback()
+        return None
+
+
+def add_column_if_missing(conn, table: str, column: str, ddl: str):
+    """Migration helper: ALTER TABLE ... ADD COLUMN unless it already exists."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in existing:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def create_index_if_missing(conn, table, *columns: str):
+    """Migration helper: CREATE INDEX for the model's index on these columns unless it exists."""
+    for index in table.indexes:
+        if [c.name for c in index.columns] == list(columns):
+            index.create(conn, checkfirst=True)
+            return
+    raise ValueError(f"no index on {table.name}({', '.join(columns)}) in the models")
+
+
+def _missing_cascades(conn, table) -> bool:
+    """True if one of the table's ON DELETE CASCADE foreign keys isn't in the database."""
+    wanted = {fk.parent.name for fk in table.foreign_keys if (fk.ondelete or "").upper() == "CASCADE"}
+    have = {
+        col
+        for fk in inspect(conn).get_foreign_keys(table.name)
+        if (fk.get("options") or {}).get("ondelete", "").upper() == "CASCADE"
+        for col in fk["constrained_columns"]
+    }
+    return bool(wanted - have)
+
+
+def _rebuild_sqlite_tables(conn, tables):
+    """
+    SQLite can't alter a constraint: copy each table into a new one with the
+    model's DDL, drop the old one, rename. Runs on its own connection with
+    foreign keys off (the pragma is ignored inside a transaction), as the
+    SQLite docs prescribe, and drops rows that were already orphaned.
+    """
+    md = MetaData()
+    for t in db.metadata.sorted_tables:
+        t.to_metadata(md)
+    quote = conn.dialect.identifier_preparer.quote
+
+    def ddl(element):
+        return str(element.compile(dialect=conn.dialect)).strip()
+
+    plans = []
+    for table in tables:
+        existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+        cols = ", ".join(quote(c.name) for c in table.columns if c.name in existing)
+        tmp = md.tables[table.name].to_metadata(md, name=f"_rebuild_{table.name}")
+        plans.append((table, tmp, cols))
+
+    raw = conn.engine.raw_connection()
+    dbapi_conn = raw.driver_connection
+    isolation = dbapi_conn.isolation_level
+    dbapi_conn.isolation_level = None   # we issue BEGIN / COMMIT ourselves
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute("PRAGMA foreign_keys=OFF")
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            for table, tmp, cols in plans:
+                cur.execute(ddl(CreateTable(tmp)))
+                cur.execute(f"INSERT INTO {quote(tmp.name)} ({cols}) SELECT {cols} FROM {quote(table.name)}")
+                cur.execute(f"DROP TABLE {quote(table.name)}")
+                cur.execute(f"ALTER TABLE {quote(tmp.name)} RENAME TO {quote(table.name)}")
+                for index in table.indexes:
+                    cur.execute(ddl(CreateIndex(index)))
+
+            # rows whose parent is already gone would have been cascaded away
+            for _ in range(len(plans) + 1):
+                orphans = cur.execute("PRAGMA foreign_key_check").fetchall()
+                if not orphans:
+                    break
+                for child, rowid, parent, _fkid in orphans:
+                    cur.execute(f"DELETE FROM {quote(child)} WHERE rowid = ?", (rowid,))
+                print(f"[schema] removed {len(orphans)} orphaned rows", flush=True)
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+    finally:
+        cur.execute("PRAGMA foreign_keys=ON")
+        cur.close()
+        dbapi_conn.isolation_level = isolation
+        raw.close()
+
+
+def cascade_foreign_keys(conn):
+    """Migration 3: ON DELETE CASCADE on the foreign keys of existing databases."""
+    tables = [t for t in db.metadata.sorted_tables if _missing_cascades(conn, t)]
+    if not tables:
+        return
+
+    if conn.dialect.name == "sqlite":
+        _rebuild_sqlite_tables(conn, tables)
+        return
+
+    drop = "DROP FOREIGN KEY" if conn.dialect.name in ("mysql", "mariadb") else "DROP CONSTRAINT"
+    quote = conn.dialect.identifier_preparer.quote
+    for table in tables:
+        reflected = inspect(conn).get_foreign_keys(table.name)
+        for fkc in table.foreign_key_constraints:
+            if (fkc.ondelete or "").upper() != "CASCADE":
+                continue
+            for fk in reflected:
+                if fk["constrained_columns"] == list(fkc.column_keys) and fk.get("name"):
+                    conn.execute(text(f"ALTER TABLE {quote(table.name)} {drop} {quote(fk['name'])}"))
+            conn.execute(AddConstraint(fkc))
+
+
+def backfill_service_categories(conn):
+    """service.category for rows written before the column existed."""
+    rows = conn.execute(select(Service.id, Service.name).where(Service.category == "other")).all()
+    updates = [{"b_id": sid, "b_category": category_for(name)} for sid, name in rows]
+    updates = [u for u in updates if u["b_category"] != "other"]
+    if updates:
+        conn.execute(
+            Service.__table__.update()
+            .where(Service.__table__.c.id == bindparam("b_id"))
+            .values(category=bindparam("b_category")),
+            updates,
+        )
+
+
+def rebuild_facet_tables(conn):
+    with Session(bind=conn) as session:
+        rebuild_facets(session)
+
+
+def rebuild_review_stat_table(conn):
+    with Session(bind=conn) as session:
+        rebuild_review_stats(session)
+
+
+def rebuild_analytics_rollups(conn):
+    with Session(bind=conn) as session:
+        rebuild_rollups(session)
+
+
+# version -> [fn(connection)] applied when upgrading to that version
+MIGRATIONS = {
+    2: [],  # change_log table (created by create_all)
+    3: [cascade_foreign_keys],
+    # upload GC looks files up by path
+    4: [
+        lambda conn: create_index_if_missing(conn, SalonPhoto.__table__, "file_path"),
+        lambda conn: create_index_if_missing(conn, Staff.__table__, "photo_path"),
+    ],
+    # image dimensions + inline placeholders (existing rows: `flask image-meta`)
+    5: [
+        lambda conn: add_column_if_missing(conn, "salon_photo", "width", "INTEGER"),
+        lambda conn: add_column_if_missing(conn, "salon_photo", "height", "INTEGER"),
+        lambda conn: add_column_if_missing(conn, "salon_photo", "lqip", "TEXT"),
+        lambda conn: add_column_if_missing(conn, "staff", "photo_width", "INTEGER"),
+        lambda conn: add_column_if_missing(conn, "staff", "photo_height", "INTEGER"),
+        lambda conn: add_column_if_missing(conn, "staff", "photo_lqip", "TEXT"),
+    ],
+    # faceted salon filter (salon_facet / facet_count are new tables)
+    6: [
+        lambda conn: add_column_if_missing(conn, "service", "category", "VARCHAR(40) NOT NULL DEFAULT 'other'"),
+        backfill_service_categories,
+        lambda conn: create_index_if_missing(conn, Service.__table__, "salon_id"),
+        lambda conn: create_index_if_missing(conn, Service.__table__, "category", "price", "duration", "salon_id"),
+        lambda conn: create_index_if_missing(conn, Service.__table__, "price", "duration", "salon_id"),
+        rebuild_facet_tables,
+    ],
+    # review listing + rating histogram (salon_rating_stats is a new table)
+    7: [
+        lambda conn: create_index_if_missing(conn, Review.__table__, "salon_id", "created_at", "id"),
+        lambda conn: create_index_if_missing(conn, Review.__table__, "salon_id", "rating", "created_at", "id"),
+        rebuild_review_stat_table,
+    ],
+    # owner analytics (salon_daily_stats / staff_daily_stats / rollup_state are new tables)
+    8: [rebuild_analytics_rollups],
+}
+
+
+def stamp_schema_version(conn):
+    """Writes SCHEMA_VERSION into the one-row table (UPDATE, or INSERT when empty)."""
+    result = conn.execute(
+        schema_version_table.update()
+        .where(schema_version_table.c.id == 1)
+        .values(version=SCHEMA_VERSION)
+    )
+    if result.rowcount == 0:
+        conn.execute(schema_version_table.insert().values(id=1, version=SCHEMA_VERSION))
+
+
+def upgrade_schema(current):
+    """create_all() + pending migrations + stamp. Returns the new version."""
+    db.create_all()
+
+    with db.engine.begin() as conn:
+        for version in sorted(MIGRATIONS):
+            if current is not None and version <= current:
+                continue
+            for step in MIGRATIONS[version]:
+                step(conn)
+
+        stamp_schema_version(conn)
+
+    return SCHEMA_VERSION
+
+
+def ensure_schema(fast: bool) -> str:
+    """
+    Returns which path ran: 'verified' (version matched, nothing written)
+    or 'upgraded' (migrations ran and the version was stamped).
+    """
+    current = stored_schema_version()
+    if current == SCHEMA_VERSION:
+        if not fast:
+            db.create_all()   # only creates tables that are missing
+        return "verified"
+
+    upgrade_schema(current)
+    return "upgraded"
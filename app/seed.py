@@ -0,0 +1,271 @@
+"""
+Synthetic data generator for local benchmarking / demos.
+
+Usage (CLI):
+    flask --app run seed --salons 200 --staff 8 --services 15 --reviews 40
+
+All rows are written with bulk INSERTs and explicit ids, so seeding tens of
+thousands of rows takes seconds. Every seeded account uses the password
+"password" (owners: owner<N>@stylio.test, customers: customer<N>@stylio.test).
+"""
+import hashlib
+import os
+import random
+import struct
+import tempfile
+import zlib
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func, insert
+
+from .extensions import db
+from .analytics import rebuild_rollups
+from .facets import category_for, rebuild_facets
+from .reviews import rebuild_review_stats
+from .storage import get_storage, shard_key
+from .models import (
+    User, Salon, Service, Staff, StaffService,
+    SalonPhoto, StaffAvailability, Review,
+    SalonWorkingHours, SalonSpecialHours
+)
+
+SEED_PASSWORD = "password"
+
+SALON_WORDS = ["Glow", "Velvet", "Urban", "Silk", "Bloom", "Luxe", "Studio", "Mirror", "Golden", "Fresh"]
+SALON_KINDS = ["Salon", "Beauty Bar", "Hair Studio", "Spa", "Barbers", "Nail Lounge"]
+CITIES = ["Tbilisi", "Batumi", "Kutaisi", "Rustavi", "Zugdidi", "Gori"]
+STREETS = ["Rustaveli Ave", "Chavchavadze Ave", "Pekini St", "Vazha-Pshavela Ave", "Aghmashenebeli Ave"]
+
+# (name, duration minutes, (min price, max price))
+SERVICE_CATALOG = [
+    ("Haircut", 45, (20, 60)), ("Men's haircut", 30, (15, 40)), ("Beard trim", 20, (10, 25)),
+    ("Hair colouring", 120, (80, 250)), ("Highlights", 150, (100, 300)), ("Blow dry", 30, (20, 45)),
+    ("Keratin treatment", 180, (150, 400)), ("Manicure", 45, (25, 60)), ("Pedicure", 60, (30, 70)),
+    ("Gel nails", 75, (40, 90)), ("Facial", 60, (50, 150)), ("Eyebrow shaping", 20, (10, 30)),
+    ("Lash extensions", 90, (60, 160)), ("Makeup", 60, (50, 200)), ("Waxing", 30, (20, 80)),
+    ("Massage", 60, (50, 120)), ("Hot towel shave", 30, (20, 45)), ("Scalp treatment", 45, (30, 80)),
+]
+SERVICE_TIERS = ["senior stylist", "express", "deluxe", "kids"]
+PROFESSIONS = ["Hair stylist", "Barber", "Colourist", "Nail technician", "Beautician", "Makeup artist", "Massage therapist"]
+FIRST_NAMES = ["Nino", "Giorgi", "Mariam", "Luka", "Ana", "Davit", "Salome", "Nika", "Tamar", "Levan", "Elene", "Saba"]
+LAST_NAMES = ["Beridze", "Kapanadze", "Gelashvili", "Maisuradze", "Lomidze", "Tsiklauri", "Abashidze", "Varsimashvili"]
+REVIEW_COMMENTS = [
+    "Great service, will come back!", "Friendly staff and clean place.", "A bit of a wait, but worth it.",
+    "Not happy with the result.", "Best haircut in town.", "", "Good value for money.", "Booked again for next month.",
+]
+
+
+def _tiny_png(rgb) -> bytes:
+    """Returns a valid 1x1 PNG of the given colour (no Pillow needed)."""
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    raw = b"\x00" + bytes(rgb)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _seed_photo_key(photo_id: int) -> str:
+    """Same key for the same id on every run, so re-seeding doesn't scatter files."""
+    return shard_key("salons", hashlib.md5(f"seed-{photo_id}".encode()).hexdigest(), "png")
+
+
+def _next_id(model) -> int:
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _bulk(model, rows, batch_size=5000):
+    for i in range(0, len(rows), batch_size):
+        db.session.execute(insert(model), rows[i:i + batch_size])
+
+
+def seed_database(
+    salons: int = 50,
+    owners: int = 10,
+    customers: int = 100,
+    services: int = 12,
+    staff: int = 6,
+    skills: int = 4,
+    photos: int = 3,
+    reviews: int = 30,
+    special_days: int = 4,
+    history_days: int = 90,
+    block_rate: float = 0.15,
+    photo_files: bool = False,
+    seed: int = 42,
+) -> dict:
+    """
+    Generates a realistic dataset. Per-salon counts (services/staff/photos/reviews/
+    special_days) are averages. Availability blocks are generated for the last
+    `history_days` and the next 30 days, `block_rate` = chance a staff/day has blocks.
+    Returns a dict of row counts.
+    """
+    rnd = random.Random(seed)
+    today = date.today()
+
+    # one hash for all seeded users (hashing is deliberately slow)
+    probe = User(full_name="x", email="x", role="customer")
+    probe.set_password(SEED_PASSWORD)
+    pw_hash = probe.password_hash
+
+    user_id = _next_id(User)
+    owner_ids = list(range(user_id, user_id + owners))
+    customer_ids = list(range(user_id + owners, user_id + owners + customers))
+    user_rows = [
+        {"id": uid, "full_name": f"Owner {n}", "email": f"owner{uid}@stylio.test",
+         "password_hash": pw_hash, "role": "owner"}
+        for n, uid in enumerate(owner_ids, start=1)
+    ] + [
+        {"id": uid, "full_name": f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+         "email": f"customer{uid}@stylio.test", "password_hash": pw_hash, "role": "customer"}
+        for uid in customer_ids
+    ]
+
+    salon_rows, service_rows, staff_rows, skill_rows = [], [], [], []
+    photo_rows, review_rows, weekly_rows, special_rows, block_rows = [], [], [], [], []
+
+    salon_id = _next_id(Salon)
+    service_id = _next_id(Service)
+    staff_id = _next_id(Staff)
+    photo_id = _next_id(SalonPhoto)
+    review_id = _next_id(Review)
+
+    def around(avg):
+        return max(0, int(rnd.gauss(avg, max(avg * 0.3, 1))))
+
+    for _ in range(salons):
+        city = rnd.choice(CITIES)
+        salon_rows.append({
+            "id": salon_id,
+            "owner_user_id": rnd.choice(owner_ids),
+            "name": f"{rnd.choice(SALON_WORDS)} {rnd.choice(SALON_KINDS)}",
+            "description": f"A friendly {city} salon.",
+            "location": f"{rnd.randint(1, 150)} {rnd.choice(STREETS)}, {city}",
+            "map_link": "https://maps.app.goo.gl/stylio",
+        })
+
+        # services
+        n_services = max(1, around(services))
+        catalog = rnd.sample(SERVICE_CATALOG, k=min(len(SERVICE_CATALOG), n_services))
+        # menus bigger than the catalog get tiered variants of the same services
+        for i in range(n_services - len(catalog)):
+            name, duration, price_range = SERVICE_CATALOG[i % len(SERVICE_CATALOG)]
+            tier = SERVICE_TIERS[(i // len(SERVICE_CATALOG)) % len(SERVICE_TIERS)]
+            catalog.append((f"{name} ({tier})", duration, price_range))
+        salon_service_ids = []
+        for name, duration, (lo, hi) in catalog:
+            service_rows.append({
+                "id": service_id, "salon_id": salon_id, "name": name,
+                "duration": duration, "price": rnd.randint(lo, hi), "category": category_for(name),
+            })
+            salon_service_ids.append(service_id)
+            service_id += 1
+
+        # staff + skills
+        salon_staff_ids = []
+        for _ in range(max(1, around(staff))):
+            staff_rows.append({
+                "id": staff_id, "salon_id": salon_id,
+                "name": f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+                "profession": rnd.choice(PROFESSIONS),
+            })
+            for sid in rnd.sample(salon_service_ids, k=min(len(salon_service_ids), max(1, around(skills)))):
+                skill_rows.append({"staff_id": staff_id, "service_id": sid})
+            salon_staff_ids.append(staff_id)
+            staff_id += 1
+
+        # photos (max 5 per salon, like the upload route)
+        for i in range(min(5, around(photos))):
+            photo_rows.append({
+                "id": photo_id, "salon_id": salon_id,
+                "file_path": _seed_photo_key(photo_id), "is_main": i == 0,
+            })
+            photo_id += 1
+
+        # weekly hours: most open Mon–Sat, some closed Sundays, a few late openers
+        start = rnd.choice(["08:00", "09:00", "09:00", "10:00"])
+        end = rnd.choice(["18:00", "19:00", "19:00", "20:00", "21:00"])
+        for wd in range(7):
+            closed = wd == 6 and rnd.random() < 0.6
+            weekly_rows.append({
+                "salon_id": salon_id, "weekday": wd, "is_closed": closed,
+                "start_time": None if closed else start, "end_time": None if closed else end,
+            })
+
+        # special days in the next 60 days
+        for day_offset in rnd.sample(range(1, 60), k=min(59, around(special_days))):
+            closed = rnd.random() < 0.5
+            special_rows.append({
+                "salon_id": salon_id, "day": today + timedelta(days=day_offset), "is_closed": closed,
+                "start_time": None if closed else "10:00", "end_time": None if closed else "15:00",
+            })
+
+        # reviews spread over the history window
+        for _ in range(around(reviews)):
+            review_rows.append({
+                "id": review_id, "salon_id": salon_id,
+                "user_id": rnd.choice(customer_ids) if customer_ids else None,
+                "rating": rnd.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 6, 9])[0],
+                "comment": rnd.choice(REVIEW_COMMENTS),
+                "created_at": _days_ago(rnd, today, history_days),
+            })
+            review_id += 1
+
+        # availability history: past `history_days` + next 30 days
+        for sid in salon_staff_ids:
+            for day_offset in range(-history_days, 31):
+                if rnd.random() >= block_rate:
+                    continue
+                day = today + timedelta(days=day_offset)
+                if rnd.random() < 0.3:
+                    block_rows.append({"staff_id": sid, "day": day, "time": None})
+                else:
+                    hours = rnd.sample(range(int(start[:2]), int(end[:2])), k=rnd.randint(1, 3))
+                    for h in sorted(hours):
+                        block_rows.append({"staff_id": sid, "day": day, "time": f"{h:02d}:00"})
+
+        salon_id += 1
+
+    _bulk(User, user_rows)
+    _bulk(Salon, salon_rows)
+    _bulk(Service, service_rows)
+    _bulk(Staff, staff_rows)
+    _bulk(StaffService, skill_rows)
+    _bulk(SalonPhoto, photo_rows)
+    _bulk(SalonWorkingHours, weekly_rows)
+    _bulk(SalonSpecialHours, special_rows)
+    _bulk(Review, review_rows)
+    _bulk(StaffAvailability, block_rows)
+    rebuild_facets(db.session)
+    rebuild_review_stats(db.session)
+    rebuild_rollups(db.session)
+    db.session.commit()
+
+    if photo_files:
+        storage = get_storage()
+        for row in photo_rows:
+            fd, tmp = tempfile.mkstemp(suffix=".png")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(_tiny_png((rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255))))
+            storage.put_file(row["file_path"], tmp, move=True)
+
+    return {
+        "users": len(user_rows),
+        "salons": len(salon_rows),
+        "services": len(service_rows),
+        "staff": len(staff_rows),
+        "staff_skills": len(skill_rows),
+        "photos": len(photo_rows),
+        "weekly_hours": len(weekly_rows),
+        "special_days": len(special_rows),
+        "reviews": len(review_rows),
+        "availability": len(block_rows),
+    }
+
+
+def _days_ago(rnd, today, max_days):
+    day = today - timedelta(days=rnd.randint(0, max_days))
+    return datetime.combine(day, time(rnd.randint(8, 21), rnd.randint(0, 59)))
@@ -0,0 +1,334 @@
+"""
+Upload storage: one key format, pluggable backends.
+
+Every stored file is addressed by a key relative to the storage root, with
+no "uploads/" or "static/" prefix. SalonPhoto.file_path and
+Staff.photo_path both hold keys:
+
+    <kind>/<aa>/<bb>/<32 hex>.<ext>        e.g. salons/3f/a2/3fa2…e1.webp
+
+kind is "salons" or "staff". The two hash-prefix levels spread files over
+65,536 directories, so no directory grows past a few dozen entries even
+at millions of files. normalize_key() also accepts the legacy flat paths
+("salons/x.webp", "uploads/staff/x.webp") so rows written before
+`flask migrate-uploads` keep working.
+
+Backends (STORAGE_BACKEND):
+  local        <UPLOAD_FOLDER>/<key>. Served by the static route when
+               UPLOAD_FOLDER is static/uploads, else by /media/<key>.
+  objectstore  local stand-in for an S3-style store: a flat namespace of
+               opaque keys in OBJECT_STORE_DIR. Objects are written whole
+               and atomically; there are no directories; listing is by key
+               prefix. Served by /media/<key>.
+Set MEDIA_BASE_URL to serve keys from a CDN / bucket URL instead.
+
+    flask --app run migrate-uploads --batch-size 200
+    flask --app run image-meta --batch-size 200
+"""
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+import uuid
+from urllib.parse import quote, unquote
+
+from flask import current_app, url_for
+
+from .extensions import db
+from .models import SalonPhoto, Staff
+
+UPLOAD_KINDS = ("salons", "staff")
+KEY_RE = re.compile(r"^(salons|staff)/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{32}\.[a-z0-9]+$")
+
+
+def shard_key(kind: str, name_hex: str, ext: str) -> str:
+    return f"{kind}/{name_hex[:2]}/{name_hex[2:4]}/{name_hex}.{ext.lower()}"
+
+
+def new_key(kind: str, ext: str) -> str:
+    if kind not in UPLOAD_KINDS:
+        raise ValueError(f"unknown upload kind {kind!r}")
+    return shard_key(kind, uuid.uuid4().hex, ext or "jpg")
+
+
+def normalize_key(path: str) -> str:
+    """Stored path (canonical or legacy) -> key relative to the storage root."""
+    path = (path or "").strip().lstrip("/")
+    for prefix in ("static/", "uploads/"):
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+    return path
+
+
+def is_canonical(key: str) -> bool:
+    return bool(KEY_RE.match(key or ""))
+
+
+def canonical_key_for(path: str) -> str:
+    """
+    Canonical key for a legacy path. Deterministic, so an interrupted
+    migration that re-runs picks the same key. uuid-hex file names keep
+    their hex; anything else is named by a hash of the old path.
+    """
+    key = normalize_key(path)
+    kind = key.split("/", 1)[0]
+    if kind not in UPLOAD_KINDS:
+        kind = "salons"
+    stem, _, ext = posixpath.basename(key).rpartition(".")
+    if not stem:
+        stem, ext = ext, "jpg"
+    name_hex = stem.lower() if re.fullmatch(r"[0-9a-fA-F]{32}", stem) else hashlib.sha1(key.encode()).hexdigest()[:32]
+    return shard_key(kind, name_hex, ext)
+
+
+def _check_key(key: str) -> str:
+    key = normalize_key(key)
+    parts = key.split("/")
+    if not key or any(p in ("", ".", "..") for p in parts):
+        raise ValueError(f"invalid storage key {key!r}")
+    return key
+
+
+class LocalStorage:
+    """Files on local disk, one directory level per key segment."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, *_check_key(key).split("/"))
+
+    def put_file(self, key: str, src_path: str, move: bool = False):
+        dest = self.local_path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+        if move:
+            shutil.move(src_path, tmp)
+        else:
+            shutil.copyfile(src_path, tmp)
+        os.replace(tmp, dest)
+
+    def open(self, key: str):
+        return open(self.local_path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.local_path(key))
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def iter_objects(self, prefix: str):
+        """(key, size, mtime) under prefix ("salons", "staff"), streamed with os.scandir."""
+        stack = [_check_key(prefix)]
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                it = os.scandir(os.path.join(self.root, *rel_dir.split("/")))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            with it:
+                for entry in it:
+                    key = f"{rel_dir}/{entry.name}"
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(key)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            yield key, st.st_size, st.st_mtime
+                    except FileNotFoundError:
+                        continue   # removed while we were looking
+
+
+class ObjectStoreStandIn:
+    """
+    Flat key -> object store kept in one local directory. Behaves like a
+    bucket (no directories, whole-object atomic writes, prefix listing), so
+    code written against it works unchanged on a real object store client.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self.root, quote(_check_key(key), safe=""))
+
+    def local_path(self, key: str):
+        return None   # a real bucket has no local path
+
+    def put_file(self, key: str, src_path: str, move: bool = False):
+        dest = self._object_path(key)
+        tmp = os.path.join(self.root, f".{uuid.uuid4().hex}.tmp")
+        if move:
+            shutil.move(src_path, tmp)
+        else:
+            shutil.copyfile(src_path, tmp)
+        os.replace(tmp, dest)
+
+    def open(self, key: str):
+        return open(self._object_path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._object_path(key))
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._object_path(key))
+        except FileNotFoundError:
+            pass
+
+    def iter_objects(self, prefix: str):
+        wanted = _check_key(prefix).rstrip("/") + "/"
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                key = unquote(entry.name)
+                if not key.startswith(wanted):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield key, st.st_size, st.st_mtime
+
+
+def init_storage(app):
+    backend = app.config.get("STORAGE_BACKEND", "local")
+    if backend == "objectstore":
+        storage = ObjectStoreStandIn(app.config["OBJECT_STORE_DIR"])
+    elif backend == "local":
+        storage = LocalStorage(app.config["UPLOAD_FOLDER"])
+    else:
+        raise RuntimeError(f"unknown STORAGE_BACKEND {backend!r}")
+    app.extensions["stylio_storage"] = storage
+
+    # under static/ the static route serves local files without a view function
+    static_uploads = os.path.abspath(os.path.join(app.static_folder, "uploads"))
+    app.extensions["stylio_storage_static"] = (
+        backend == "local" and os.path.abspath(app.config["UPLOAD_FOLDER"]) == static_uploads
+    )
+    app.jinja_env.globals["media_url"] = media_url
+
+
+def get_storage():
+    return current_app.extensions["stylio_storage"]
+
+
+def media_url(path):
+    """URL for a stored file (key or legacy path); None when there is none."""
+    key = normalize_key(path)
+    if not key:
+        return None
+    base = current_app.config.get("MEDIA_BASE_URL")
+    if base:
+        return f"{base.rstrip('/')}/{key}"
+    if current_app.extensions.get("stylio_storage_static"):
+        return url_for("static", filename=f"uploads/{key}")
+    return url_for("main.media", key=key)
+
+
+def migrate_legacy_uploads(storage, legacy_root: str, batch_size: int = 200) -> dict:
+    """
+    Rewrites legacy SalonPhoto/Staff paths to canonical keys and copies their
+    files from legacy_root into storage, one committed batch at a time.
+
+    Safe to interrupt and re-run: rows already canonical are skipped, the
+    target key is deterministic, and a legacy file is removed only after
+    the batch that points away from it has committed.
+    """
+    report = {"checked": 0, "rewritten": 0, "copied": 0, "missing": 0}
+
+    for model, attr in ((SalonPhoto, "file_path"), (Staff, "photo_path")):
+        column = getattr(model, attr)
+        last_id = 0
+        while True:
+            rows = (
+                model.query
+                .filter(model.id > last_id, column.isnot(None), column != "")
+                .order_by(model.id.asc())
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            copied_from = []
+            for row in rows:
+                report["checked"] += 1
+                old = getattr(row, attr)
+                if is_canonical(old):
+                    continue
+                key = canonical_key_for(old)
+                src = os.path.join(legacy_root, *normalize_key(old).split("/"))
+                if os.path.isfile(src):
+                    storage.put_file(key, src)
+                    copied_from.append(src)
+                    report["copied"] += 1
+                elif not storage.exists(key):
+                    report["missing"] += 1
+                    print(f"[migrate-uploads] {model.__name__} {row.id}: no file for {old}", flush=True)
+                setattr(row, attr, key)
+                report["rewritten"] += 1
+
+            db.session.commit()
+            for src in copied_from:
+                try:
+                    os.remove(src)
+                except OSError:
+                    pass   # gc-uploads picks it up later
+            db.session.expunge_all()
+
+    return report
+
+
+def backfill_image_meta(storage, batch_size: int = 200) -> dict:
+    """
+    Fills width/height/lqip for photos uploaded before they were computed
+    at upload time. Rows are visited once in id order; a missing or
+    unreadable file leaves its row as it was.
+    """
+    from .utils_uploads import image_meta
+
+    report = {"checked": 0, "updated": 0, "missing": 0}
+    targets = (
+        (SalonPhoto, SalonPhoto.file_path, SalonPhoto.width, ("width", "height", "lqip")),
+        (Staff, Staff.photo_path, Staff.photo_width, ("photo_width", "photo_height", "photo_lqip")),
+    )
+    for model, path_column, width_column, attrs in targets:
+        last_id = 0
+        while True:
+            rows = (
+                model.query
+                .filter(model.id > last_id, path_column.isnot(None), path_column != "", width_column.is_(None))
+                .order_by(model.id.asc())
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            for row in rows:
+                report["checked"] += 1
+                try:
+                    with storage.open(normalize_key(getattr(row, path_column.key))) as f:
+                        meta = image_meta(f)
+                except (OSError, ValueError):
+                    report["missing"] += 1
+                    continue
+                if meta["width"] is None:
+                    continue
+                for attr, field in zip(attrs, ("width", "height", "lqip")):
+                    setattr(row, attr, meta[field])
+                report["updated"] += 1
+
+            db.session.commit()
+            db.session.expunge_all()
+
+    return report
@@ -0,0 +1,91 @@
+"""
+Garbage collection of upload files no row refers to.
+
+Files leak when a process dies before the file reaper gets to them, when
+an upload or `flask migrate-uploads` is interrupted half way, or when a
+request fails between storing the file and committing its row. This job
+finds and removes them.
+
+How it stays bounded on millions of files:
+  - objects are listed with the storage backend's iter_objects() (a
+    streaming os.scandir walk for local storage), never collected up front
+  - files are checked GC_BATCH_SIZE at a time: one IN query per batch
+    against SalonPhoto.file_path and Staff.photo_path (both indexed), so
+    memory is one batch of paths, never the whole tree or table
+  - files younger than the grace period are never removed: their row may
+    not be committed yet
+
+    flask --app run gc-uploads --grace-hours 24 --dry-run
+"""
+import time
+
+from sqlalchemy import select
+
+from .extensions import db
+from .models import SalonPhoto, Staff
+from .storage import normalize_key
+
+GC_BATCH_SIZE = 1000
+DEFAULT_GRACE_HOURS = 24.0
+
+
+def referenced_keys(keys) -> set:
+    """The subset of storage keys that a row still points at."""
+    keys = list(keys)
+    # rows not yet rewritten by `flask migrate-uploads` may carry "uploads/"
+    candidates = keys + [f"uploads/{k}" for k in keys]
+    found = set()
+    for column in (SalonPhoto.file_path, Staff.photo_path):
+        found.update(
+            normalize_key(p) for p in db.session.scalars(select(column).where(column.in_(candidates)))
+        )
+    return found
+
+
+def collect_garbage(storage, prefixes, grace_hours: float = DEFAULT_GRACE_HOURS,
+                    batch_size: int = GC_BATCH_SIZE, dry_run: bool = False, now: float = None) -> dict:
+    """Removes unreferenced files older than grace_hours. Returns counts and reclaimed bytes."""
+    cutoff = (now or time.time()) - grace_hours * 3600.0
+    report = {
+        "scanned": 0, "referenced": 0, "recent": 0,
+        "orphans": 0, "deleted": 0, "reclaimed_bytes": 0, "errors": 0,
+        "dry_run": dry_run,
+    }
+
+    def sweep(batch):
+        referenced = referenced_keys(key for key, _, _ in batch)
+        for key, size, mtime in batch:
+            if key in referenced:
+                report["referenced"] += 1
+                continue
+            if mtime > cutoff:
+                report["recent"] += 1
+                continue
+            report["orphans"] += 1
+            if dry_run:
+                report["reclaimed_bytes"] += size
+                continue
+            try:
+                storage.delete(key)
+            except OSError as e:
+                report["errors"] += 1
+                print(f"[gc-uploads] failed to delete {key}: {e}", flush=True)
+                continue
+            report["deleted"] += 1
+            report["reclaimed_bytes"] += size
+
+    batch = []
+    for prefix in prefixes:
+        for item in storage.iter_objects(prefix):
+            report["scanned"] += 1
+            batch.append(item)
+            if len(batch) >= batch_size:
+                sweep(batch)
+                batch = []
+                # nothing is written: keep the session from holding a snapshot
+                db.session.rollback()
+    if batch:
+        sweep(batch)
+        db.session.rollback()
+
+    return report
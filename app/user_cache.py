@@ -0,0 +1,104 @@
+"""
+Short-TTL cache for the logged-in user.
+
+Flask-Login calls the user loader on every authenticated request. We keep the
+user's column values in process memory for USER_CACHE_TTL_SECONDS and rebuild
+a detached User from them, which the request session adopts without a query
+(merge(load=False)).
+
+Any UPDATE/DELETE of a user row through the ORM (role change, password change,
+...) drops the entry immediately in this process; other workers see the change
+once their entry expires. Bulk UPDATE/DELETE statements on the user table
+(query.update(), session.execute(update(User))) don't say which rows they
+hit, so they clear the whole cache, again after commit so a request that
+re-cached the old row in between doesn't keep it.
+"""
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+
+from .extensions import db
+from .models import User
+from .replicas import RoutingSession
+
+
+class UserCache:
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int):
+        entry = self._data.get(user_id)
+        if entry is None:
+            return None
+        expires, values = entry
+        if expires < time.monotonic():
+            self.invalidate(user_id)
+            return None
+        return values
+
+    def put(self, user_id: int, values: dict, ttl: float):
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + ttl, values)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = UserCache()
+
+_COLUMNS = [c.key for c in User.__table__.columns]
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _invalidate_bulk(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if orm_execute_state.bind_mapper is not User.__mapper__ and table is not User.__table__:
+        return
+    user_cache.clear()
+    orm_execute_state.session.info["stylio_clear_user_cache"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _clear_after_bulk_commit(session):
+    if session.info.pop("stylio_clear_user_cache", False):
+        user_cache.clear()
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_bulk_flag(session):
+    session.info.pop("stylio_clear_user_cache", None)
+
+
+def load_user_cached(user_id):
+    uid = int(user_id)
+    ttl = float(current_app.config.get("USER_CACHE_TTL_SECONDS", 0))
+    if ttl <= 0:
+        return db.session.get(User, uid)
+
+    values = user_cache.get(uid)
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    user = db.session.get(User, uid)
+    if user is not None:
+        user_cache.put(uid, {k: getattr(user, k) for k in _COLUMNS}, ttl)
+    return user
@@ -1,7 +1,12 @@
+import base64
+import io
 import os
-import uuid
+import struct
+import tempfile
 from werkzeug.utils import secure_filename
 
+from .storage import get_storage, new_key
+
 try:
     from PIL import Image
     PIL_AVAILABLE = True
@@ -9,6 +14,7 @@ except Exception:
     PIL_AVAILABLE = False
 
 ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "webp"}
+IMAGE_HEADER_BYTES = 256 * 1024   # JPEG frame headers can sit behind large EXIF blocks
 
 def allowed_file(filename: str) -> bool:
     if "." not in filename:
@@ -16,64 +22,123 @@ def allowed_file(filename: str) -> bool:
     ext = filename.rsplit(".", 1)[1].lower()
     return ext in ALLOWED_EXTENSIONS
 
-def save_image(file_storage, base_dir: str, subdir: str, max_side: int = 1600, quality: int = 80) -> str:
+LQIP_SIDE = 16   # placeholder thumbnail, a few hundred bytes as a data URI
+
+
+def image_size(data: bytes):
+    """(width, height) read from a PNG / GIF / WEBP / JPEG header, or None."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        return struct.unpack("<HH", data[6:10])
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            w, h = struct.unpack("<HH", data[26:30])
+            return w & 0x3FFF, h & 0x3FFF
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+        return None
+    if data[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            if marker == 0xFF or marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                i += 1 if marker == 0xFF else 2   # fill byte / markers without a length
+                continue
+            # SOFn frame header: length, precision, height, width
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                h, w = struct.unpack(">HH", data[i + 5:i + 9])
+                return w, h
+            i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+    return None
+
+
+def _lqip(img) -> str:
+    thumb = img.copy()
+    thumb.thumbnail((LQIP_SIDE, LQIP_SIDE))
+    buf = io.BytesIO()
+    thumb.save(buf, "WEBP", quality=40)
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def image_meta(src) -> dict:
     """
-    Saves image into base_dir/subdir.
-    Returns relative path like: 'salons/abc.webp'
-    If Pillow is available -> resize + convert to WEBP for storage savings.
+    {"width", "height", "lqip"} for an image (path or binary file object).
+    lqip is a tiny inline data URI shown while the real image loads; it
+    needs Pillow (None without it). Dimensions come from the file header
+    either way.
     """
-    filename = secure_filename(file_storage.filename or "")
-    ext = filename.rsplit(".", 1)[1].lower() if "." in filename else ""
-    new_name = f"{uuid.uuid4().hex}.{ext if ext else 'jpg'}"
-
-    abs_folder = os.path.join(base_dir, subdir)
-    os.makedirs(abs_folder, exist_ok=True)
-
-    abs_path_original = os.path.join(abs_folder, new_name)
-    file_storage.save(abs_path_original)
-
-    # If no Pillow, keep as-is
-    if not PIL_AVAILABLE:
-        return f"{subdir}/{new_name}"
-
-    # Convert to WEBP + resize for big savings
-    try:
-        img = Image.open(abs_path_original)
-        img = img.convert("RGB")
-
-        w, h = img.size
-        scale = min(max_side / max(w, h), 1.0)
-        if scale < 1.0:
-            img = img.resize((int(w * scale), int(h * scale)))
-
-        webp_name = f"{uuid.uuid4().hex}.webp"
-        abs_path_webp = os.path.join(abs_folder, webp_name)
-
-        img.save(abs_path_webp, "WEBP", quality=quality, method=6)
-
-        # delete original
+    meta = {"width": None, "height": None, "lqip": None}
+    if PIL_AVAILABLE:
         try:
-            os.remove(abs_path_original)
+            with Image.open(src) as img:
+                meta["width"], meta["height"] = img.size
+                meta["lqip"] = _lqip(img.convert("RGB"))
+            return meta
         except Exception:
-            pass
-
-        return f"{subdir}/{webp_name}"
-    except Exception:
-        # fallback: keep original if processing fails
-        return f"{subdir}/{new_name}"
-
-def safe_delete_file(base_dir: str, rel_path: str) -> None:
+            if hasattr(src, "seek"):
+                src.seek(0)
+    if hasattr(src, "read"):
+        size = image_size(src.read(IMAGE_HEADER_BYTES))
+    else:
+        with open(src, "rb") as f:
+            size = image_size(f.read(IMAGE_HEADER_BYTES))
+    if size:
+        meta["width"], meta["height"] = size
+    return meta
+
+
+def save_image(file_storage, kind: str, max_side: int = 1600, quality: int = 80):
     """
-    Deletes a file safely only if it's inside base_dir.
-    rel_path should be like 'salons/xxx.webp' or 'staff/yyy.webp'
+    Stores an uploaded image under a new storage key (see app/storage.py).
+    Returns (key, meta): key e.g. 'salons/3f/a2/3fa2....webp', meta as from
+    image_meta() for the stored file, so width/height/lqip are computed
+    once here and saved on the row.
+    If Pillow is available -> resize + convert to WEBP for storage savings.
+    The file is prepared in a temp file, so the backend only ever gets the
+    finished image.
     """
-    if not rel_path:
-        return
-    abs_path = os.path.abspath(os.path.join(base_dir, rel_path))
-    abs_base = os.path.abspath(base_dir)
-
-    if not abs_path.startswith(abs_base):
-        return  # safety: never delete outside uploads folder
+    filename = secure_filename(file_storage.filename or "")
+    ext = filename.rsplit(".", 1)[1].lower() if "." in filename else ""
+    ext = ext or "jpg"
 
-    if os.path.exists(abs_path):
-        os.remove(abs_path)
+    fd, tmp_original = tempfile.mkstemp(prefix="stylio-upload-", suffix=f".{ext}")
+    os.close(fd)
+    tmp_webp = None
+    try:
+        file_storage.save(tmp_original)
+        src = tmp_original
+
+        # Convert to WEBP + resize for big savings (if no Pillow, keep as-is)
+        if PIL_AVAILABLE:
+            try:
+                img = Image.open(tmp_original)
+                img = img.convert("RGB")
+
+                w, h = img.size
+                scale = min(max_side / max(w, h), 1.0)
+                if scale < 1.0:
+                    img = img.resize((int(w * scale), int(h * scale)))
+
+                tmp_webp = f"{tmp_original}.webp"
+                img.save(tmp_webp, "WEBP", quality=quality, method=6)
+                src, ext = tmp_webp, "webp"
+            except Exception:
+                # fallback: keep original if processing fails
+                pass
+
+        meta = image_meta(src)
+        key = new_key(kind, ext)
+        get_storage().put_file(key, src, move=True)
+        return key, meta
+    finally:
+        for path in (tmp_original, tmp_webp):
+            if path and os.path.exists(path):
+                os.remove(path)
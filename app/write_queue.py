@@ -0,0 +1,170 @@
+"""
+Optional single-writer path for SQLite.
+
+With WRITE_QUEUE_ENABLED, mutations are not committed by the request thread.
+They are handed to one writer thread per process which runs them with group
+commit: it waits up to WRITE_QUEUE_WINDOW_MS for more work, runs up to
+WRITE_QUEUE_MAX_BATCH write functions in one transaction and commits once.
+Only one connection ever writes, so writers don't fight over the SQLite lock,
+and (with WAL) readers are never blocked.
+
+Write functions:
+  - get the writer's session: fn(session) -> result
+  - must only use ids / plain values, never ORM objects from the request session
+  - must be safe to re-run: if a batch fails, it is rolled back and each
+    function is retried alone so one bad write can't fail its neighbours
+
+Routes call run_write(fn), which falls back to "fn + commit" inline when
+the queue is disabled. WRITE_QUEUE_TIMEOUT bounds the wait for the writer
+to pick a write up, not the write itself: a write still queued at the
+timeout is cancelled and never runs (WriteQueueBusy: a 503 for JSON
+clients, a flash + redirect back for form posts), one already running is
+waited for, so an error never hides a committed write.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+from flask import current_app, flash, jsonify, redirect, request, url_for
+
+from .extensions import db
+
+
+class WriteQueueBusy(Exception):
+    """The writer didn't pick the write up in time; it was cancelled and nothing was written."""
+
+
+class WriteQueue:
+    def __init__(self, app, max_batch: int = 64, window_ms: float = 2.0, timeout: float = 10.0):
+        self.app = app
+        self.max_batch = max_batch
+        self.window = window_ms / 1000.0
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+
+    def _ensure_started(self):
+        # started lazily and re-created after fork (threads don't survive fork)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            thread = threading.Thread(target=self._run, name="stylio-writer", daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+
+    def submit(self, fn) -> Future:
+        self._ensure_started()
+        fut = Future()
+        self._queue.put((fut, fn))
+        return fut
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return [(fut, fn) for fut, fn in batch if fut.set_running_or_notify_cancel()]
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                batch = self._collect_batch()
+                if not batch:
+                    continue
+                try:
+                    self._commit_batch(batch)
+                finally:
+                    db.session.remove()
+
+    def _commit_batch(self, batch):
+        session = db.session
+        try:
+            results = [fn(session) for _, fn in batch]
+            session.commit()
+        except Exception:
+            session.rollback()
+            self._commit_one_by_one(batch)
+            return
+
+        for (fut, _), res in zip(batch, results):
+            fut.set_result(res)
+
+    def _commit_one_by_one(self, batch):
+        session = db.session
+        for fut, fn in batch:
+            try:
+                res = fn(session)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                fut.set_exception(e)
+            else:
+                fut.set_result(res)
+
+
+def init_write_queue(app):
+    if not app.config.get("WRITE_QUEUE_ENABLED"):
+        return
+    app.extensions["stylio_write_queue"] = WriteQueue(
+        app,
+        max_batch=int(app.config.get("WRITE_QUEUE_MAX_BATCH", 64)),
+        window_ms=float(app.config.get("WRITE_QUEUE_WINDOW_MS", 2.0)),
+        timeout=float(app.config.get("WRITE_QUEUE_TIMEOUT", 10.0)),
+    )
+    app.register_error_handler(WriteQueueBusy, _busy_response)
+
+
+def _wants_json() -> bool:
+    # browsers list text/html explicitly; API clients send JSON, */* or no Accept at all
+    if request.is_json or request.headers.get("X-Requested-With"):
+        return True
+    return request.accept_mimetypes.best_match(["application/json", "text/html"]) != "text/html"
+
+
+def _busy_response(e):
+    message = "Server busy, nothing was saved. Please try again."
+    if _wants_json():
+        return jsonify({"ok": False, "message": message}), 503, {"Retry-After": "1"}
+
+    flash(message, "warning")
+    # back to the form, but only on this site
+    referrer = request.referrer or ""
+    if not referrer or urlparse(referrer).netloc != request.host:
+        referrer = url_for("main.home_page")
+    return redirect(referrer)
+
+
+def run_write(fn):
+    """
+    Runs fn(session) and commits it, through the writer thread when enabled.
+    Returns fn's result; exceptions raised by fn propagate to the caller.
+    Raises WriteQueueBusy if the write was still queued after WRITE_QUEUE_TIMEOUT.
+    """
+    wq = current_app.extensions.get("stylio_write_queue")
+    if wq is None:
+        result = fn(db.session)
+        db.session.commit()
+        return result
+
+    fut = wq.submit(fn)
+    try:
+        result = fut.result(timeout=wq.timeout)
+    except TimeoutError:
+        if fut.cancel():
+            raise WriteQueueBusy()   # never started: the writer skips cancelled futures
+        result = fut.result()        # running or done: its outcome is the answer
+    # the request session may hold rows the writer just changed
+    db.session.expire_all()
+    return result
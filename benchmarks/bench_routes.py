@@ -0,0 +1,195 @@
+"""
+End-to-end route benchmark through the Flask test client.
+
+    python -m benchmarks.bench_routes --salons 200 --iterations 200
+    python -m benchmarks.bench_routes --compare benchmarks/results/routes-<ts>.json
+
+Seeds a synthetic dataset (see app/seed.py), then drives the main user and
+owner routes. Per route it reports p50/p95/p99 latency, SQL queries per
+request and peak Python memory allocated while serving one request.
+"""
+import argparse
+import io
+import random
+import resource
+import time
+import tracemalloc
+
+from app import create_app
+from app.extensions import db
+from app.models import Salon, SalonPhoto, Staff, User
+from app.seed import SEED_PASSWORD, _tiny_png, seed_database
+
+from .common import QueryCounter, load_results, summarize, temp_app_config, write_results
+
+
+def _login(client, email):
+    resp = client.post("/auth/login", data={"email": email, "password": SEED_PASSWORD})
+    assert resp.status_code in (200, 302), resp.status_code
+
+
+def _png_upload():
+    return {"photo": (io.BytesIO(_tiny_png((200, 120, 90))), "bench.png")}
+
+
+def build_scenarios(app, rnd):
+    """Returns [(name, fn, prep)]: fn() performs one request and returns the response."""
+    with app.app_context():
+        salon_ids = [sid for (sid,) in db.session.query(Salon.id).all()]
+        owner_salon = db.session.query(Salon).order_by(Salon.id).first()
+        owner_email = db.session.get(User, owner_salon.owner_user_id).email
+        staff_id = db.session.query(Staff.id).filter_by(salon_id=owner_salon.id).order_by(Staff.id).first()[0]
+        customer_email = db.session.query(User.email).filter_by(role="customer").order_by(User.id).first()[0]
+        owner_salon_id = owner_salon.id
+
+    anon = app.test_client()
+    owner = app.test_client()
+    customer = app.test_client()
+    _login(owner, owner_email)
+    _login(customer, customer_email)
+
+    def trim_salon_photos():
+        # keep the salon under the 5-photo limit so uploads take the full path
+        with app.app_context():
+            extra = (
+                db.session.query(SalonPhoto)
+                .filter_by(salon_id=owner_salon_id)
+                .order_by(SalonPhoto.id.desc())
+                .offset(3)
+                .all()
+            )
+            for p in extra:
+                db.session.delete(p)
+            db.session.commit()
+
+    def add_salon_photo_row():
+        with app.app_context():
+            db.session.add(SalonPhoto(salon_id=owner_salon_id, file_path="salons/bench-missing.png"))
+            db.session.commit()
+
+    def delete_newest_salon_photo():
+        with app.app_context():
+            photo_id = (
+                db.session.query(SalonPhoto.id)
+                .filter_by(salon_id=owner_salon_id)
+                .order_by(SalonPhoto.id.desc())
+                .first()[0]
+            )
+        return owner.post(f"/owner/manage-businesses/salon/{owner_salon_id}/photos/{photo_id}/delete")
+
+    # (name, timed request, untimed prep run before each request or None)
+    return [
+        ("home_page", lambda: anon.get("/"), None),
+        ("book_a_visit", lambda: anon.get(f"/book/{rnd.choice(salon_ids)}"), None),
+        ("edit_salon", lambda: owner.get(f"/owner/manage-businesses/salon/{owner_salon_id}/edit"), None),
+        ("owner_analytics", lambda: owner.get("/owner/manage-businesses/analytics.json?days=365"), None),
+        ("add_review", lambda: customer.post(
+            f"/salon/{rnd.choice(salon_ids)}/review",
+            data={"rating": str(rnd.randint(1, 5)), "comment": "bench"}
+        ), None),
+        ("upload_salon_photo", lambda: owner.post(
+            f"/owner/manage-businesses/salon/{owner_salon_id}/photos/upload",
+            data=_png_upload(), content_type="multipart/form-data"
+        ), trim_salon_photos),
+        ("delete_salon_photo", delete_newest_salon_photo, add_salon_photo_row),
+        ("upload_staff_photo", lambda: owner.post(
+            f"/owner/manage-businesses/salon/{owner_salon_id}/staff/{staff_id}/photo/upload",
+            data=_png_upload(), content_type="multipart/form-data"
+        ), None),
+    ]
+
+
+def run(args):
+    rnd = random.Random(args.seed)
+    app = create_app(temp_app_config(args.database_url))
+
+    with app.app_context():
+        if not args.database_url:
+            counts = seed_database(
+                salons=args.salons, owners=max(1, args.salons // 5), customers=args.salons * 2,
+                reviews=args.reviews, seed=args.seed,
+            )
+        else:
+            counts = None
+        counter = QueryCounter(db.engine)
+
+    scenarios = build_scenarios(app, rnd)
+    results = {}
+
+    for name, fn, prep in scenarios:
+        if args.only and name not in args.only:
+            continue
+        prep = prep or (lambda: None)
+
+        for _ in range(args.warmup):
+            prep()
+            fn()
+
+        latencies, queries, errors = [], [], 0
+        for _ in range(args.iterations):
+            prep()
+            counter.reset()
+            t0 = time.perf_counter()
+            resp = fn()
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            queries.append(counter.count)
+            if resp.status_code >= 400:
+                errors += 1
+
+        # memory: separate pass, tracemalloc distorts timings
+        peaks = []
+        tracemalloc.start()
+        for _ in range(args.memory_iterations):
+            prep()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            fn()
+            peaks.append((tracemalloc.get_traced_memory()[1] - base) / 1024.0)
+        tracemalloc.stop()
+
+        row = summarize(latencies)
+        row.update({
+            "queries_per_request": round(sum(queries) / len(queries), 2),
+            "queries_max": max(queries),
+            "peak_alloc_kb": round(max(peaks), 1) if peaks else None,
+            "errors": errors,
+        })
+        results[name] = row
+
+    payload = {
+        "dataset": counts,
+        "iterations": args.iterations,
+        "routes": results,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+    }
+    path = write_results("routes", payload, args.out)
+
+    baseline = load_results(args.compare)["routes"] if args.compare else {}
+    print(f"{'route':<22}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'peakKB':>9}{'err':>5}")
+    for name, r in results.items():
+        line = (f"{name:<22}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                f"{r['queries_per_request']:>9}{r['peak_alloc_kb']:>9}{r['errors']:>5}")
+        if name in baseline and baseline[name]["p50_ms"]:
+            delta = (r["p50_ms"] - baseline[name]["p50_ms"]) / baseline[name]["p50_ms"] * 100.0
+            line += f"   p50 {delta:+.1f}% vs baseline"
+        print(line)
+    print(f"max RSS {payload['max_rss_mb']} MB -> results written to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--salons", type=int, default=100)
+    parser.add_argument("--reviews", type=int, default=30, help="avg reviews per salon")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--memory-iterations", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="run only these route names")
+    parser.add_argument("--database-url", help="benchmark an existing database instead of seeding a temp one")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="results file (default: benchmarks/results/routes-<ts>.json)")
+    parser.add_argument("--compare", help="previous results file to compare p50 against")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
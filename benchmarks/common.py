@@ -0,0 +1,99 @@
+"""
+Shared helpers for the benchmark scripts in this folder.
+
+Benchmarks build the app against a throwaway SQLite database + upload folder
+(unless --database-url is given) and write their results as JSON into
+benchmarks/results/ so runs can be compared with --compare.
+"""
+import json
+import os
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import event
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def temp_app_config(database_url=None, **extra):
+    """Config overrides pointing the app at a temp DB and upload folder."""
+    tmp = tempfile.mkdtemp(prefix="stylio-bench-")
+    cfg = {
+        "SQLALCHEMY_DATABASE_URI": database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        "UPLOAD_FOLDER": os.path.join(tmp, "uploads"),
+        "LIVE_SPOOL_DIR": os.path.join(tmp, "live"),
+    }
+    cfg.update(extra)
+    return cfg
+
+
+class QueryCounter:
+    """Counts SQL statements sent through an engine."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile (pct in 0..100)."""
+    if not values:
+        return 0.0
+    data = sorted(values)
+    k = (len(data) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(data) - 1)
+    return data[lo] + (data[hi] - data[lo]) * (k - lo)
+
+
+def summarize(samples_ms):
+    return {
+        "n": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "mean_ms": round(sum(samples_ms) / len(samples_ms), 3) if samples_ms else 0.0,
+    }
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def write_results(name, payload, out_path=None) -> Path:
+    """Writes payload + run metadata to JSON and returns the file path."""
+    payload = dict(payload)
+    payload["meta"] = {
+        "benchmark": name,
+        "git_rev": _git_rev(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "finished_at": datetime.utcnow().isoformat() + "Z",
+    }
+    if out_path:
+        path = Path(out_path)
+    else:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f"{name}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    return path
+
+
+def load_results(path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
@@ -0,0 +1,65 @@
+"""
+Cross-salon earliest-slot search (app/availability.py) at scale.
+
+    python -m benchmarks.earliest_search --salons 1000 --staff 6 --days 1 7 14
+
+Seeds a large synthetic dataset, then times earliest_slots() for a few
+service queries and window sizes: total latency, plus how much of it is SQL
+vs the bitset scan.
+"""
+import argparse
+import time
+from datetime import date
+
+from app import create_app
+from app.availability import earliest_slots
+from app.extensions import db
+from app.models import Staff
+from app.seed import seed_database
+
+from .common import QueryCounter, summarize, temp_app_config, write_results
+
+QUERIES = ["haircut", "nails", "massage", "a"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--salons", type=int, default=1000)
+    parser.add_argument("--staff", type=int, default=6, help="avg staff per salon")
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 7, 14])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    app = create_app(temp_app_config())
+    with app.app_context():
+        counts = seed_database(salons=args.salons, owners=max(1, args.salons // 10), customers=10,
+                               staff=args.staff, reviews=0)
+        staff_total = db.session.query(Staff).count()
+        counter = QueryCounter(db.engine)
+        start = date.today()
+
+        runs = []
+        for days in args.days:
+            for q in QUERIES:
+                latencies, queries = [], []
+                for _ in range(args.iterations):
+                    db.session.expire_all()
+                    counter.reset()
+                    t0 = time.perf_counter()
+                    results = earliest_slots(q, start, days=days, limit=args.limit)
+                    latencies.append((time.perf_counter() - t0) * 1000.0)
+                    queries.append(counter.count)
+                row = summarize(latencies)
+                row.update({"query": q, "days": days, "results": len(results), "queries": max(queries)})
+                runs.append(row)
+                print(f"days={days:<3} service={q!r:<10} p50={row['p50_ms']}ms p95={row['p95_ms']}ms "
+                      f"queries={row['queries']} results={row['results']}", flush=True)
+
+    path = write_results("earliest_search", {"dataset": counts, "staff": staff_total, "runs": runs}, args.out)
+    print(f"{staff_total} staff -> results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+HTTP load test against the production server (gunicorn.conf.py + wsgi.py).
+
+    python -m benchmarks.load_test --workers 1 2 4 8 --duration 20
+
+For every worker count a fresh gunicorn is started on a seeded temp database,
+then client processes hammer a mix of public GET routes (home page + booking
+pages) over keep-alive connections. Reports requests/s, p50/p95/p99 latency
+and scaling efficiency: rps(n) / (n * per-worker rps of the smallest worker
+count run), so include --workers 1 to compare against a single worker.
+
+Run the client on a separate machine (--url) for clean numbers on large core
+counts. Nothing is seeded then: the paths come from --paths (one per line)
+or from the booking links on the target's home page.
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import random
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .common import summarize, temp_app_config, write_results
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _seed(cfg, salons):
+    from app import create_app
+    from app.extensions import db
+    from app.models import Salon
+    from app.seed import seed_database
+
+    app = create_app(cfg)
+    with app.app_context():
+        seed_database(salons=salons, owners=max(1, salons // 5), customers=salons)
+        return [sid for (sid,) in db.session.query(Salon.id).all()]
+
+
+def _remote_paths(base_url, limit=50):
+    """"/" plus the booking pages linked from the target's home page."""
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    try:
+        conn.request("GET", "/")
+        resp = conn.getresponse()
+        html = resp.read().decode("utf-8", "replace")
+    finally:
+        conn.close()
+    if resp.status != 200:
+        raise RuntimeError(f"GET {base_url}/ returned {resp.status}")
+    links = list(dict.fromkeys(re.findall(r'href="(/book/\d+)"', html)))
+    if not links:
+        raise RuntimeError(f"no booking links on {base_url}/; pass --paths")
+    return ["/"] + links[:limit]
+
+
+def _read_paths(filename):
+    with open(filename, encoding="utf-8") as f:
+        paths = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not paths:
+        raise SystemExit(f"{filename}: no paths")
+    return paths
+
+
+def _wait_for_port(host, port, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on {host}:{port} did not come up")
+
+
+def _client_proc(base_url, paths, duration, concurrency, seed, out_q):
+    """One client process: `concurrency` threads, each with a keep-alive connection."""
+    import threading
+
+    parts = urlsplit(base_url)
+    stop_at = time.time() + duration
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker(n):
+        rnd = random.Random(seed * 1000 + n)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        local = []
+        while time.time() < stop_at:
+            path = rnd.choice(paths)
+            t0 = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status >= 400:
+                    with lock:
+                        errors[0] += 1
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+                continue
+            local.append((time.perf_counter() - t0) * 1000.0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    out_q.put((latencies, errors[0]))
+
+
+def run_load(base_url, paths, duration, clients, concurrency):
+    q = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=_client_proc, args=(base_url, paths, duration, concurrency, i, q))
+        for i in range(clients)
+    ]
+    for p in procs:
+        p.start()
+    latencies, errors = [], 0
+    for _ in procs:
+        lat, err = q.get()
+        latencies.extend(lat)
+        errors += err
+    for p in procs:
+        p.join()
+    row = summarize(latencies)
+    row["rps"] = round(len(latencies) / duration, 1)
+    row["errors"] = errors
+    return row
+
+
+def start_server(cfg, workers, threads, port):
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": cfg["SQLALCHEMY_DATABASE_URI"],
+        "UPLOAD_FOLDER": cfg["UPLOAD_FOLDER"],
+        "LIVE_SPOOL_DIR": cfg["LIVE_SPOOL_DIR"],
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_WORKERS": str(workers),
+        "GUNICORN_THREADS": str(threads),
+        "GUNICORN_ACCESSLOG": "",
+        "GUNICORN_LOGLEVEL": "warning",
+    })
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        cwd=ROOT, env=env,
+    )
+    _wait_for_port("127.0.0.1", port)
+    return proc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, max(1, (os.cpu_count() or 1) // 2), os.cpu_count() or 1}))
+    parser.add_argument("--threads", type=int, default=4, help="threads per gunicorn worker")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per run")
+    parser.add_argument("--clients", type=int, default=2, help="client processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="connections per client process")
+    parser.add_argument("--salons", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="load an already running server instead of starting gunicorn")
+    parser.add_argument("--paths", help="file with one request path per line (default: seeded / discovered)")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    cfg = None
+    if args.paths:
+        paths = _read_paths(args.paths)
+    elif args.url:
+        paths = _remote_paths(args.url)
+    if not args.url:
+        cfg = temp_app_config()
+        salon_ids = _seed(cfg, args.salons)
+        if not args.paths:
+            paths = ["/"] + [f"/book/{sid}" for sid in salon_ids[:50]]
+
+    runs = []
+    for n in ([0] if args.url else sorted(set(args.workers))):
+        proc = None
+        base_url = args.url
+        if not args.url:
+            proc = start_server(cfg, n, args.threads, args.port)
+            base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            run_load(base_url, paths, min(3.0, args.duration), args.clients, args.concurrency)  # warm-up
+            row = run_load(base_url, paths, args.duration, args.clients, args.concurrency)
+        finally:
+            if proc:
+                proc.send_signal(signal.SIGTERM)
+                proc.wait(timeout=60)
+        row["workers"] = n
+        runs.append(row)
+        print(f"workers={n:<3} rps={row['rps']:<9} p50={row['p50_ms']}ms p95={row['p95_ms']}ms "
+              f"p99={row['p99_ms']}ms errors={row['errors']}", flush=True)
+
+    # per-worker throughput of the smallest run; unknown for a remote server (workers=0)
+    per_worker = runs[0]["rps"] / runs[0]["workers"] if runs[0]["workers"] else 0.0
+    for row in runs:
+        row["scaling_efficiency"] = round(row["rps"] / (per_worker * row["workers"]), 3) if per_worker else None
+
+    path = write_results("load", {
+        "threads_per_worker": args.threads,
+        "clients": args.clients,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "runs": runs,
+    }, args.out)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Password hashing cost: logins/second per core for candidate settings.
+
+    python -m benchmarks.login_throughput
+    python -m benchmarks.login_throughput --methods scrypt:32768:8:1 pbkdf2:sha256:600000 --threads 8
+
+For each PASSWORD_HASH_METHOD it measures
+  - raw verifications/second on one thread (= logins/s per core)
+  - end-to-end POST /auth/login throughput with --threads concurrent clients
+    going through the bounded hashing pool, plus how many were turned away busy
+"""
+import argparse
+import threading
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app import create_app
+from app.extensions import db
+from app.models import User
+from app.seed import SEED_PASSWORD, seed_database
+
+from .common import summarize, temp_app_config, write_results
+
+DEFAULT_METHODS = ["scrypt:32768:8:1", "scrypt:16384:8:1", "pbkdf2:sha256:600000", "pbkdf2:sha256:260000"]
+
+
+def raw_verify_rate(method, seconds):
+    pw_hash = generate_password_hash(SEED_PASSWORD, method=method)
+    n = 0
+    stop_at = time.perf_counter() + seconds
+    while time.perf_counter() < stop_at:
+        check_password_hash(pw_hash, SEED_PASSWORD)
+        n += 1
+    return n / seconds
+
+
+def route_login_rate(method, args):
+    app = create_app(temp_app_config(
+        PASSWORD_HASH_METHOD=method,
+        PASSWORD_HASH_WORKERS=args.pool_workers,
+        PASSWORD_HASH_MAX_PENDING=args.pool_pending,
+    ))
+    with app.app_context():
+        seed_database(salons=1, owners=1, customers=args.threads)
+        emails = [e for (e,) in db.session.query(User.email).filter_by(role="customer").all()]
+
+    stop_at = time.time() + args.seconds
+    latencies, outcomes = [], {"ok": 0, "busy": 0}
+    lock = threading.Lock()
+
+    def client(email):
+        c = app.test_client()
+        local = []
+        while time.time() < stop_at:
+            t0 = time.perf_counter()
+            resp = c.post("/auth/login", data={"email": email, "password": SEED_PASSWORD})
+            local.append((time.perf_counter() - t0) * 1000.0)
+            busy = resp.headers.get("Location", "").endswith("/auth/login")
+            with lock:
+                outcomes["busy" if busy else "ok"] += 1
+            c.get("/auth/logout")
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(e,)) for e in emails]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    row = summarize(latencies)
+    row["logins_per_s"] = round(outcomes["ok"] / args.seconds, 1)
+    row["busy_rejected"] = outcomes["busy"]
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--methods", nargs="+", default=DEFAULT_METHODS)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=8, help="concurrent login clients")
+    parser.add_argument("--pool-workers", type=int, default=2)
+    parser.add_argument("--pool-pending", type=int, default=16)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    results = {}
+    for method in args.methods:
+        per_core = raw_verify_rate(method, args.seconds)
+        route = route_login_rate(method, args)
+        results[method] = {"verify_per_s_per_core": round(per_core, 1), "route": route}
+        print(f"{method:<24} verify/s/core={per_core:<8.1f} login route: {route['logins_per_s']}/s "
+              f"p95={route['p95_ms']}ms busy={route['busy_rejected']}", flush=True)
+
+    path = write_results("login_throughput", {
+        "threads": args.threads, "pool_workers": args.pool_workers, "pool_pending": args.pool_pending,
+        "methods": results,
+    }, args.out)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
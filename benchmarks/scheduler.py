@@ -0,0 +1,127 @@
+"""
+Multi-service visit planner (app/scheduler.py) on big salons.
+
+    python -m benchmarks.scheduler --salons 10 --staff 24 --services 60 --visit-sizes 2 3 4
+
+Seeds salons with 20+ staff and 50+ services, then plans random visits of
+2..N services on upcoming days. Reports latency, search nodes and plans
+found per visit size. With --check (default for sizes <= 3) the result is
+compared against brute-force enumeration of every order x staff
+assignment x first slot, which is also timed as the baseline.
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import date, timedelta
+
+from app import create_app
+from app.availability import salon_day_masks, staff_day_block_masks
+from app.capabilities import SkillMatrix
+from app.extensions import db
+from app.models import Salon, Service
+from app.scheduler import FIRST_SLOT_MINUTE, earliest_fit, free_intervals, plan_visit
+from app.seed import seed_database
+
+from .common import summarize, temp_app_config, write_results
+
+
+def brute_force(salon_id, day, service_ids, max_gap, limit):
+    """Every order x staff assignment x first slot; best wait per first slot."""
+    matrix = SkillMatrix.for_salon(salon_id)
+    open_mask = salon_day_masks([salon_id], [salon_id], [day])[(salon_id, day)]
+    blocks = staff_day_block_masks(matrix.staff_ids, [day])
+    free = {st: free_intervals(open_mask & ~blocks.get((st, day), 0)) for st in matrix.staff_ids}
+    durations = dict(db.session.query(Service.id, Service.duration).filter(Service.id.in_(service_ids)).all())
+
+    best, tried = {}, 0
+    for bit in range(open_mask.bit_length()):
+        if not open_mask >> bit & 1:
+            continue
+        t0 = FIRST_SLOT_MINUTE + bit * 60
+        for order in itertools.permutations(service_ids):
+            for staff in itertools.product(*(matrix.staff_for_service(s) for s in order)):
+                tried += 1
+                t, wait, ok = t0, 0, True
+                for n, (svc, st) in enumerate(zip(order, staff)):
+                    start = earliest_fit(free[st], t, durations[svc])
+                    if start is None or start - t > (0 if n == 0 else max_gap):
+                        ok = False
+                        break
+                    wait += start - t
+                    t = start + durations[svc]
+                if ok and (t0 not in best or wait < best[t0]):
+                    best[t0] = wait
+    ranked = sorted((w, t0) for t0, w in best.items())[:limit]
+    return ranked, tried
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--salons", type=int, default=10)
+    parser.add_argument("--staff", type=int, default=24)
+    parser.add_argument("--services", type=int, default=60)
+    parser.add_argument("--skills", type=int, default=12, help="avg services per staff member")
+    parser.add_argument("--visit-sizes", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--visits", type=int, default=30, help="planned visits per size")
+    parser.add_argument("--max-gap", type=int, default=60)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--check", type=int, default=3, help="brute-force check up to this visit size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    app = create_app(temp_app_config())
+    with app.app_context():
+        counts = seed_database(salons=args.salons, owners=1, customers=1, staff=args.staff,
+                               services=args.services, skills=args.skills, reviews=0, seed=args.seed)
+        salon_ids = [sid for (sid,) in db.session.query(Salon.id).all()]
+        menus = {sid: [s for (s,) in db.session.query(Service.id).filter_by(salon_id=sid)] for sid in salon_ids}
+
+        runs = []
+        for size in args.visit_sizes:
+            latencies, nodes, found, brute_ms, mismatches, truncated = [], [], [], [], 0, 0
+            for _ in range(args.visits):
+                sid = rnd.choice(salon_ids)
+                services = rnd.sample(menus[sid], k=min(size, len(menus[sid])))
+                day = date.today() + timedelta(days=rnd.randint(1, 14))
+
+                t0 = time.perf_counter()
+                plan = plan_visit(sid, day, services, limit=args.limit, max_gap=args.max_gap)
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+                nodes.append(plan["explored"])
+                found.append(len(plan["options"]))
+                truncated += plan["truncated"]
+
+                if size <= args.check:
+                    t0 = time.perf_counter()
+                    expected, _ = brute_force(sid, day, services, args.max_gap, args.limit)
+                    brute_ms.append((time.perf_counter() - t0) * 1000.0)
+                    got = [(o["total_wait"], int(o["start"][:2]) * 60 + int(o["start"][3:])) for o in plan["options"]]
+                    if not plan["truncated"] and got != expected:
+                        mismatches += 1
+
+            row = summarize(latencies)
+            row.update({
+                "visit_size": size,
+                "avg_nodes": round(sum(nodes) / len(nodes), 1),
+                "avg_options": round(sum(found) / len(found), 2),
+                "truncated": truncated,
+            })
+            if brute_ms:
+                row["brute_force"] = summarize(brute_ms)
+                row["mismatches"] = mismatches
+            runs.append(row)
+            line = (f"services={size} p50={row['p50_ms']}ms p95={row['p95_ms']}ms nodes={row['avg_nodes']} "
+                    f"options={row['avg_options']} truncated={truncated}")
+            if brute_ms:
+                line += f" | brute p50={row['brute_force']['p50_ms']}ms mismatches={mismatches}"
+            print(line, flush=True)
+
+    path = write_results("scheduler", {"dataset": counts, "runs": runs}, args.out)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
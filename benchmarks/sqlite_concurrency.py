@@ -0,0 +1,131 @@
+"""
+Concurrent read/write throughput on SQLite: untuned vs tuned (WAL + pragmas)
+vs tuned + single-writer queue (app/write_queue.py).
+
+    python -m benchmarks.sqlite_concurrency --readers 8 --writers 4 --duration 10
+
+Readers load booking pages, writers save weekly hours (owner) and post
+reviews (customers), all through the Flask test client from separate
+threads. Each mode runs on its own fresh database file. Reports reads/s,
+writes/s, p95 latency and failed requests (e.g. "database is locked").
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+
+from flask import got_request_exception
+
+from app import create_app
+from app.extensions import db
+from app.models import Salon, User
+from app.seed import SEED_PASSWORD, seed_database
+
+from .common import summarize, temp_app_config, write_results
+
+WEEKLY_FORM = {**{f"start_{wd}": "09:00" for wd in range(7)}, **{f"end_{wd}": "19:00" for wd in range(7)}}
+
+
+def _client(app, email=None):
+    c = app.test_client()
+    if email:
+        c.post("/auth/login", data={"email": email, "password": SEED_PASSWORD})
+    return c
+
+
+def run_mode(tuned, write_queue, args):
+    app = create_app(temp_app_config(SQLITE_TUNING=tuned, WRITE_QUEUE_ENABLED=write_queue))
+    app.logger.disabled = True
+    logging.getLogger("werkzeug").disabled = True
+
+    with app.app_context():
+        seed_database(salons=args.salons, owners=1, customers=args.writers, reviews=10)
+        salon_ids = [sid for (sid,) in db.session.query(Salon.id).all()]
+        owner_email = db.session.query(User.email).filter_by(role="owner").first()[0]
+        customer_emails = [e for (e,) in db.session.query(User.email).filter_by(role="customer").all()]
+
+    failures = {"locked": 0, "other": 0}
+    lock = threading.Lock()
+
+    def on_exception(sender, exception, **extra):
+        with lock:
+            failures["locked" if "locked" in str(exception) else "other"] += 1
+
+    got_request_exception.connect(on_exception, app)
+
+    stop_at = time.time() + args.duration
+    reads, writes = [], []
+
+    def reader(n):
+        rnd = random.Random(n)
+        c = _client(app)
+        local = []
+        while time.time() < stop_at:
+            t0 = time.perf_counter()
+            c.get(f"/book/{rnd.choice(salon_ids)}")
+            local.append((time.perf_counter() - t0) * 1000.0)
+        with lock:
+            reads.extend(local)
+
+    def writer(n):
+        rnd = random.Random(1000 + n)
+        # half the writers are the owner saving hours, half are customers posting reviews
+        owner = n % 2 == 0
+        c = _client(app, owner_email if owner else customer_emails[n % len(customer_emails)])
+        local = []
+        while time.time() < stop_at:
+            sid = rnd.choice(salon_ids)
+            t0 = time.perf_counter()
+            if owner:
+                c.post(f"/owner/manage-businesses/salon/{sid}/hours/weekly/save", data=WEEKLY_FORM)
+            else:
+                c.post(f"/salon/{sid}/review", data={"rating": str(rnd.randint(1, 5)), "comment": "bench"})
+            local.append((time.perf_counter() - t0) * 1000.0)
+        with lock:
+            writes.extend(local)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    got_request_exception.disconnect(on_exception, app)
+
+    return {
+        "reads_per_s": round(len(reads) / args.duration, 1),
+        "writes_per_s": round(len(writes) / args.duration, 1),
+        "read_latency": summarize(reads),
+        "write_latency": summarize(writes),
+        "failed_locked": failures["locked"],
+        "failed_other": failures["other"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--salons", type=int, default=50)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    results = {}
+    for label, tuned, write_queue in (("untuned", False, False), ("tuned", True, False), ("queued", True, True)):
+        r = run_mode(tuned, write_queue, args)
+        results[label] = r
+        print(f"{label:<8} reads/s={r['reads_per_s']:<8} writes/s={r['writes_per_s']:<8} "
+              f"read p95={r['read_latency']['p95_ms']}ms write p95={r['write_latency']['p95_ms']}ms "
+              f"locked={r['failed_locked']} other_failures={r['failed_other']}", flush=True)
+
+    path = write_results("sqlite_concurrency", {
+        "readers": args.readers, "writers": args.writers, "duration_s": args.duration, "modes": results,
+    }, args.out)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
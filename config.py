@@ -13,6 +13,47 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Engine tuning (see app/db_tuning.py)
+    SQLITE_TUNING = os.environ.get("SQLITE_TUNING", "1") == "1"
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "synchronous": "NORMAL",
+        "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB (64MB)
+        "temp_store": "MEMORY",
+    }
+    # PostgreSQL / MySQL pool sizing (ignored for SQLite)
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+
+    # Read replicas (see app/replicas.py), e.g. "sqlite:////path/replica.db"
+    SQLALCHEMY_REPLICA_URLS = [
+        u.strip() for u in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if u.strip()
+    ]
+    REPLICA_STICKY_SECONDS = float(os.environ.get("REPLICA_STICKY_SECONDS", "10"))
+    REPLICA_EXCLUDED_ENDPOINTS = set()  # GET endpoints that must always read the primary
+
+    # Single-writer queue with group commit (see app/write_queue.py)
+    WRITE_QUEUE_ENABLED = os.environ.get("WRITE_QUEUE_ENABLED", "0") == "1"
+    WRITE_QUEUE_MAX_BATCH = int(os.environ.get("WRITE_QUEUE_MAX_BATCH", "64"))
+    WRITE_QUEUE_WINDOW_MS = float(os.environ.get("WRITE_QUEUE_WINDOW_MS", "2"))
+    WRITE_QUEUE_TIMEOUT = float(os.environ.get("WRITE_QUEUE_TIMEOUT", "10"))
+
+    # Auth: logged-in user is cached per process (0 disables)
+    USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "30"))
+
+    # Passwords (see app/passwords.py). Changing the method/salt length makes
+    # existing hashes get upgraded on the user's next login.
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_SALT_LENGTH = int(os.environ.get("PASSWORD_SALT_LENGTH", "16"))
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))  # 0 = hash inline
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "16"))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", "10"))
+
     # Uploads (stored in: app/static/uploads/)
     UPLOAD_FOLDER = os.environ.get(
         "UPLOAD_FOLDER",
@@ -20,9 +61,65 @@ class Config:
     )
     SALON_UPLOAD_SUBDIR = "salons"
     STAFF_UPLOAD_SUBDIR = "staff"
+    # "local" = sharded tree under UPLOAD_FOLDER, "objectstore" = flat key store
+    # in OBJECT_STORE_DIR (see app/storage.py)
+    STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local")
+    OBJECT_STORE_DIR = os.environ.get("OBJECT_STORE_DIR", str(BASE_DIR / "instance" / "objects"))
+    MEDIA_BASE_URL = os.environ.get("MEDIA_BASE_URL", "")  # e.g. a CDN in front of the bucket
+    # files of deleted rows are removed by a background thread (see app/file_reaper.py)
+    FILE_REAPER_ENABLED = os.environ.get("FILE_REAPER_ENABLED", "1") == "1"
 
     # Security / limits
     MAX_CONTENT_LENGTH = 4 * 1024 * 1024  # 4MB max upload (adjust if needed)
 
+    # Chunked photo uploads (see app/chunked_uploads.py): each chunk request stays
+    # under MAX_CONTENT_LENGTH, the whole file may be up to UPLOAD_MAX_BYTES
+    UPLOAD_CHUNK_DIR = os.environ.get("UPLOAD_CHUNK_DIR", str(BASE_DIR / "instance" / "upload_chunks"))
+    UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+    UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(40 * 1024 * 1024)))
+    UPLOAD_SESSION_TTL_HOURS = float(os.environ.get("UPLOAD_SESSION_TTL_HOURS", "24"))
+
     # Optional: restrict file types (your helper will use this too)
     ALLOWED_IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "webp"}
+
+    # Profiling (opt-in, see app/profiling.py)
+    PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "0") == "1"
+    PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")  # required for header trigger
+    PROFILE_HEADER = "X-Stylio-Profile"
+    PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))  # 0.0..1.0
+    PROFILE_SAMPLE_ENDPOINTS = {
+        e.strip() for e in os.environ.get("PROFILE_SAMPLE_ENDPOINTS", "").split(",") if e.strip()
+    }  # e.g. "owner.edit_salon"; empty = all endpoints
+    PROFILE_MAX_PER_MINUTE = int(os.environ.get("PROFILE_MAX_PER_MINUTE", "6"))
+    PROFILE_DIR = os.environ.get("PROFILE_DIR", str(BASE_DIR / "instance" / "profiles"))
+
+    # Startup
+    # FAST_STARTUP: verify the stored schema version (one SELECT) instead of
+    # create_all(), and skip the upload dir checks. Falls back to the full path
+    # when the version doesn't match.
+    FAST_STARTUP = os.environ.get("FAST_STARTUP", "0") == "1"
+    STARTUP_LOG_TIMINGS = os.environ.get("STARTUP_LOG_TIMINGS", "0") == "1"
+
+    # Live availability push to open booking pages (see app/live.py)
+    # Off by default: every open stream holds a worker thread. Enable it with
+    # threads to spare (GUNICORN_THREADS well above LIVE_MAX_STREAMS).
+    # LIVE_BROKER: "spool" fans events out across worker processes through
+    # LIVE_SPOOL_DIR, "local" only reaches streams in the same process.
+    LIVE_UPDATES_ENABLED = os.environ.get("LIVE_UPDATES_ENABLED", "0") == "1"
+    LIVE_BROKER = os.environ.get("LIVE_BROKER", "spool")
+    LIVE_SPOOL_DIR = os.environ.get("LIVE_SPOOL_DIR", str(BASE_DIR / "instance" / "live"))
+    LIVE_POLL_INTERVAL_MS = float(os.environ.get("LIVE_POLL_INTERVAL_MS", "250"))
+    LIVE_RETENTION_SECONDS = float(os.environ.get("LIVE_RETENTION_SECONDS", "120"))
+    LIVE_KEEPALIVE_SECONDS = float(os.environ.get("LIVE_KEEPALIVE_SECONDS", "15"))
+    LIVE_MAX_STREAM_SECONDS = float(os.environ.get("LIVE_MAX_STREAM_SECONDS", "300"))
+    # every open stream holds a server thread: keep this below GUNICORN_THREADS
+    LIVE_MAX_STREAMS = int(os.environ.get("LIVE_MAX_STREAMS", "2"))  # per process
+    LIVE_BUSY_RETRY_SECONDS = float(os.environ.get("LIVE_BUSY_RETRY_SECONDS", "30"))  # reconnect hint when full
+
+    # Change feed (see app/changes.py)
+    CHANGES_TOKEN = os.environ.get("CHANGES_TOKEN", "")  # /changes is off (404) until set; then "Authorization: Bearer <token>"
+    CHANGES_SETTLE_SECONDS = float(os.environ.get("CHANGES_SETTLE_SECONDS", "0"))  # >0 with concurrent writers
+
+    # Owner analytics rollups (see app/analytics.py)
+    ANALYTICS_REFRESH_SECONDS = float(os.environ.get("ANALYTICS_REFRESH_SECONDS", "60"))  # 0 = only `flask refresh-analytics`
+    ANALYTICS_SETTLE_SECONDS = float(os.environ.get("ANALYTICS_SETTLE_SECONDS", "0"))  # >0 with concurrent writers
@@ -0,0 +1,53 @@
+"""
+Gunicorn settings for production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is imported once in the master (preload_app) and then forked, so
+workers boot instantly and share the loaded code pages. It also means
+create_app()'s schema check (app/schema.py) runs once, in the master, before
+any worker exists; workers never run create_all or migrations. Our routes
+spend most of their time waiting on the database, so we use threaded workers (gthread):
+one process per core, several threads each. Workers are recycled after
+`max_requests` (+ jitter so they don't all restart at once) and are given
+`graceful_timeout` seconds to finish in-flight requests.
+
+Every setting can be overridden with an env var (see below).
+"""
+import multiprocessing
+import os
+
+CPU_COUNT = multiprocessing.cpu_count()
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+preload_app = True
+
+worker_class = "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS", CPU_COUNT))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-") or None  # "" disables
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOGLEVEL", "info")
+
+
+def post_fork(server, worker):
+    """
+    The preloaded app may already hold pooled DB connections (create_app runs
+    queries). Sockets must not be shared across processes, so every worker
+    drops the inherited pool and opens its own connections lazily.
+    """
+    from app.extensions import db
+
+    flask_app = server.app.wsgi()
+    with flask_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -3,4 +3,5 @@ from app import create_app
 app = create_app()
 
 if __name__ == "__main__":
+    # dev server only, production: gunicorn -c gunicorn.conf.py wsgi:app
     app.run(debug=True, host='0.0.0.0')
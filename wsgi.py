@@ -0,0 +1,10 @@
+"""
+Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+(run.py is the Werkzeug dev server, use it only locally.)
+"""
+from app import create_app
+
+app = create_app()